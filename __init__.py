@@ -3,7 +3,7 @@ _needs_reload = "bpy" in locals()
 import bpy
 
 from .tracking_toolkit import operators, preferences, properties, ui, utils
-from .tracking_toolkit.xr_core import actions, tracking, core
+from .tracking_toolkit.xr_core import actions, tracking, core, instrumentation
 
 if _needs_reload:
     import importlib
@@ -21,22 +21,34 @@ if _needs_reload:
 
 
 @bpy.app.handlers.persistent
-def scene_update_callback(scene, _):
+def scene_update_callback(scene, depsgraph):
     """
     When a tracker object is selected in the scene, make it active in the list too.
     This does not work with bones.
     """
+    instrumentation.record_evaluated()
+    utils.check_armature_edit_mode()
+
     xr_context = tracking.get_context()
     if xr_context.use_bones:
         return
 
-    selected = [obj for obj in scene.objects if obj.select_get()]
-    if not selected:
+    # Only the active object is looked at, so this doesn't depend on the size of the scene.
+    active = depsgraph.view_layer.objects.active
+    if not active or not active.select_get():
+        return
+
+    role_string = active.get("role_string")
+    if role_string is None:
+        return
+
+    # Offsets belong to the same tracker.
+    tracker_ref, offset_ref = utils.get_references(role_string)
+    if active != tracker_ref and active != offset_ref:
         return
 
-    active = selected[-1]
     for tracker in xr_context.trackers:
-        if tracker.naming.role_string == active.get("role_string"):
+        if tracker.naming.role_string == role_string:
             if xr_context.selected_tracker != tracker.index:
                 xr_context["selected_tracker"] = tracker.index
 
@@ -44,9 +56,21 @@ def scene_update_callback(scene, _):
 @bpy.app.handlers.persistent
 def load_post_callback(*_):
     """
-    Stop XR whenever a new file is loaded.
+    Stop XR whenever a new file is loaded, and look for takes that can be recovered.
     """
     tracking.stop_preview()
+    utils.invalidate_reference_index()
+    tracking.refresh_orphaned_journals()
+    utils.refresh_pending_conversions()
+
+
+@bpy.app.handlers.persistent
+def undo_redo_callback(*_):
+    """
+    Undo and redo replace scene data, so cached references can't be trusted afterward.
+    """
+    utils.invalidate_reference_index()
+    utils.refresh_pending_conversions()
 
 
 def register():
@@ -68,6 +92,11 @@ def register():
     bpy.utils.register_class(operators.ToggleActiveOperator)
     bpy.utils.register_class(operators.CreateRefsOperator)
     bpy.utils.register_class(operators.ToggleRecordOperator)
+    bpy.utils.register_class(operators.RecoverTakeOperator)
+    bpy.utils.register_class(operators.RebakeTakeOperator)
+    bpy.utils.register_class(operators.CancelCommitOperator)
+    bpy.utils.register_class(operators.ExportTimingsOperator)
+    bpy.utils.register_class(operators.ResetTimingsOperator)
 
     # Contexts
     bpy.types.WindowManager.XRState = bpy.props.PointerProperty(type=properties.XRState)
@@ -82,6 +111,10 @@ def register():
         bpy.app.handlers.depsgraph_update_post.append(scene_update_callback)
     if load_post_callback not in bpy.app.handlers.depsgraph_update_post:
         bpy.app.handlers.load_post.append(load_post_callback)
+    if undo_redo_callback not in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.append(undo_redo_callback)
+    if undo_redo_callback not in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.append(undo_redo_callback)
 
     print("Loaded Tracking Toolkit")
 
@@ -90,6 +123,7 @@ def unregister():
     print("Unloading Tracking Toolkit...")
 
     tracking.stop_preview()
+    utils.stop_pending_conversions()
 
     # UI
     bpy.utils.unregister_class(ui.PANEL_UL_TrackerList)
@@ -100,6 +134,11 @@ def unregister():
     del bpy.types.WindowManager.XRState
 
     # Classes
+    bpy.utils.unregister_class(operators.ResetTimingsOperator)
+    bpy.utils.unregister_class(operators.ExportTimingsOperator)
+    bpy.utils.unregister_class(operators.CancelCommitOperator)
+    bpy.utils.unregister_class(operators.RebakeTakeOperator)
+    bpy.utils.unregister_class(operators.RecoverTakeOperator)
     bpy.utils.unregister_class(operators.ToggleRecordOperator)
     bpy.utils.unregister_class(operators.CreateRefsOperator)
     bpy.utils.unregister_class(operators.ToggleActiveOperator)
@@ -120,6 +159,10 @@ def unregister():
         bpy.app.handlers.depsgraph_update_post.remove(scene_update_callback)
     if load_post_callback in bpy.app.handlers.depsgraph_update_post:
         bpy.app.handlers.depsgraph_update_post.remove(load_post_callback)
+    if undo_redo_callback in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.remove(undo_redo_callback)
+    if undo_redo_callback in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.remove(undo_redo_callback)
 
     print("Unloaded Tracking Toolkit")
 
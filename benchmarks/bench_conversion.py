@@ -0,0 +1,184 @@
+"""
+Benchmark of converting references between bones and empties on a file with many takes.
+
+The file is built with synthetic trackers through the normal recording pipeline.
+Each round converts bones to empties and back, checking that no keys are lost, and measures:
+  - convert_bones_to_empties
+  - convert_empties_to_bones
+
+Run inside Blender on a machine without a headset:
+    blender -b --factory-startup --python benchmarks/bench_conversion.py -- \\
+        --trackers 20 --takes 50 --seconds 30 --output results.json
+
+Results use the same format as bench_pipeline.py, so they can be compared with benchmarks/compare.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from harness import (
+    addon_module,
+    configure_preferences,
+    get_environment,
+    load_addon,
+    measure,
+    reset_scene,
+)
+
+
+def _count_keys() -> int:
+    return sum(
+        len(fcurve.keyframe_points)
+        for action in bpy.data.actions
+        for layer in action.layers
+        for strip in layer.strips
+        for channelbag in strip.channelbags
+        for fcurve in channelbag.fcurves
+    )
+
+
+def build_file(num_trackers: int, num_takes: int, seconds: float, rate: float):
+    """
+    Record takes of synthetic trackers onto bone references.
+    """
+    tracking = addon_module("tracking_toolkit.xr_core.tracking")
+    sources = addon_module("tracking_toolkit.xr_core.sources")
+    utils = addon_module("tracking_toolkit.utils")
+
+    source = sources.SyntheticSource(num_trackers, rate, realtime=False)
+    tracking.start_preview(source)
+    tracking._update_tracker_list(source.roles)
+
+    # Skip the update callback, which would convert references.
+    utils.get_context()["use_bones"] = True
+    utils.create_bone_references()
+
+    xr_state = utils.get_state()
+    for _ in range(num_takes):
+        xr_state.recording = True
+        xr_state.countdown = 0
+
+        for _ in range(round(seconds * rate)):
+            sample_time, poses, valid, velocities = source.tick()
+            tracking._append_sample(sample_time / 1e9, poses, valid, velocities)
+
+        tracking.stop_recording()
+
+    tracking.stop_preview()
+
+
+def run_case(
+    num_trackers: int,
+    num_takes: int,
+    seconds: float,
+    rounds: int,
+    rate: float,
+    scene_fps: int,
+    lazy: bool,
+) -> dict:
+    utils = addon_module("tracking_toolkit.utils")
+    xr_context = utils.get_context()
+
+    reset_scene(scene_fps)
+    build_file(num_trackers, num_takes, seconds, rate)
+    keys_before = _count_keys()
+
+    case = {
+        "references": "bones",
+        "trackers": num_trackers,
+        "minutes": seconds / 60,
+        "takes": num_takes,
+        "rate": rate,
+        "scene_fps": scene_fps,
+        "lazy": lazy,
+        "keys": keys_before,
+        "steps": {},
+    }
+    steps = case["steps"]
+
+    for name in ("convert_bones_to_empties", "convert_empties_to_bones"):
+        steps[name] = {"wall_time": 0.0, "peak_memory": 0, "rounds": rounds}
+
+    for _ in range(rounds):
+        for name, convert, converted_use_bones in (
+            ("convert_bones_to_empties", utils.convert_bones_to_empties, False),
+            ("convert_empties_to_bones", utils.convert_empties_to_bones, True),
+        ):
+            step = {}
+            measure(step, lambda: convert(lazy))
+            xr_context["use_bones"] = converted_use_bones
+
+            # Finish lazily converted takes outside the measurement.
+            utils.convert_all_pending()
+
+            steps[name]["wall_time"] += step["wall_time"]
+            steps[name]["peak_memory"] = max(
+                steps[name]["peak_memory"], step["peak_memory"] or 0
+            )
+
+            # Bones hold every tracker in one action, so only compare after a full round.
+            if converted_use_bones and _count_keys() != keys_before:
+                raise RuntimeError(
+                    f"Conversion changed the number of keys: {keys_before} -> {_count_keys()}"
+                )
+
+    return case
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trackers", type=int, nargs="+", default=[20])
+    parser.add_argument("--takes", type=int, nargs="+", default=[50])
+    parser.add_argument("--seconds", type=float, default=30, help="Length of each take")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Only measure converting the active take, leaving the rest pending",
+    )
+    parser.add_argument("--rate", type=float, default=90, help="Samples per second")
+    parser.add_argument("--scene-fps", type=int, default=60)
+    parser.add_argument("--output", help="JSON file to write. Defaults to stdout.")
+    args = parser.parse_args(argv)
+
+    load_addon()
+    configure_preferences()
+
+    results = {"environment": get_environment(), "cases": []}
+
+    for num_trackers in args.trackers:
+        for num_takes in args.takes:
+            print(
+                f"Benchmarking conversion of {num_trackers} trackers x {num_takes} takes",
+                file=sys.stderr,
+            )
+            results["cases"].append(
+                run_case(
+                    num_trackers,
+                    num_takes,
+                    args.seconds,
+                    args.rounds,
+                    args.rate,
+                    args.scene_fps,
+                    args.lazy,
+                )
+            )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
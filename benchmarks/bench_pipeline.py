@@ -0,0 +1,196 @@
+"""
+Benchmark of the whole recording pipeline, driven by synthetic trackers.
+
+For every combination of tracker count, take length, and take count, this measures:
+  - capture: feeding samples into the recorder
+  - commit: stop_recording(), which resamples the take and writes keyframes
+  - preview: applying the latest poses to the references
+  - references: create_bone_references/create_empty_references, and both conversions
+Each step reports wall time, peak memory growth, and keys written where it applies.
+
+Run inside Blender on a machine without a headset:
+    blender -b --factory-startup --python benchmarks/bench_pipeline.py -- \\
+        --trackers 4 20 64 --minutes 1 10 60 --takes 1 50 --output results.json
+
+Compare two runs with benchmarks/compare.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from harness import (
+    addon_module,
+    configure_preferences,
+    get_environment,
+    load_addon,
+    measure,
+    reset_scene,
+)
+
+PREVIEW_CALLS = 200
+
+
+def run_case(
+    num_trackers: int,
+    minutes: float,
+    num_takes: int,
+    use_bones: bool,
+    rate: float,
+    scene_fps: int,
+) -> dict:
+    tracking = addon_module("tracking_toolkit.xr_core.tracking")
+    sources = addon_module("tracking_toolkit.xr_core.sources")
+    utils = addon_module("tracking_toolkit.utils")
+
+    reset_scene(scene_fps)
+
+    source = sources.SyntheticSource(num_trackers, rate, realtime=False)
+    tracking.start_preview(source)
+    tracking._update_tracker_list(source.roles)
+
+    xr_context = utils.get_context()
+    xr_state = utils.get_state()
+
+    # Skip the update callback, which would convert references.
+    xr_context["use_bones"] = use_bones
+
+    case = {
+        "trackers": num_trackers,
+        "minutes": minutes,
+        "takes": num_takes,
+        "references": "bones" if use_bones else "empties",
+        "rate": rate,
+        "scene_fps": scene_fps,
+        "steps": {},
+    }
+    steps = case["steps"]
+
+    steps["create_references"] = {}
+    measure(
+        steps["create_references"],
+        (utils.create_bone_references if use_bones else utils.create_empty_references),
+    )
+
+    num_samples = round(minutes * 60 * rate)
+
+    def capture():
+        for _ in range(num_samples):
+            sample_time, poses, valid, velocities = source.tick()
+            tracking._append_sample(sample_time / 1e9, poses, valid, velocities)
+
+    takes = []
+    for _ in range(num_takes):
+        xr_state.recording = True
+        xr_state.countdown = 0
+
+        take = {"samples": num_samples, "capture": {}, "commit": {}}
+        measure(take["capture"], capture)
+        keys_written, _ = measure(take["commit"], tracking.stop_recording)
+        take["keys_written"] = keys_written
+
+        takes.append(take)
+
+    steps["takes"] = takes
+    steps["capture"] = {
+        "wall_time": sum(take["capture"]["wall_time"] for take in takes),
+        "peak_memory": max(take["capture"]["peak_memory"] or 0 for take in takes),
+    }
+    steps["commit"] = {
+        "wall_time": sum(take["commit"]["wall_time"] for take in takes),
+        "peak_memory": max(take["commit"]["peak_memory"] or 0 for take in takes),
+        "keys_written": sum(take["keys_written"] for take in takes),
+    }
+
+    # Preview, using the last captured sample.
+    index = utils.get_reference_index()
+    apply_poses = (
+        tracking._apply_bone_poses if use_bones else tracking._apply_empty_poses
+    )
+
+    def preview():
+        for _ in range(PREVIEW_CALLS):
+            apply_poses(index)
+
+    steps["preview"] = {"calls": PREVIEW_CALLS}
+    measure(steps["preview"], preview)
+    steps["preview"]["wall_time_per_call"] = (
+        steps["preview"]["wall_time"] / PREVIEW_CALLS
+    )
+
+    tracking.stop_preview()
+
+    # Convert there and back, copying every take's animation each way.
+    if use_bones:
+        conversions = [
+            ("convert_bones_to_empties", utils.convert_bones_to_empties, False),
+            ("convert_empties_to_bones", utils.convert_empties_to_bones, True),
+        ]
+    else:
+        conversions = [
+            ("convert_empties_to_bones", utils.convert_empties_to_bones, True),
+            ("convert_bones_to_empties", utils.convert_bones_to_empties, False),
+        ]
+
+    for name, convert, converted_use_bones in conversions:
+        steps[name] = {}
+        measure(steps[name], convert)
+        xr_context["use_bones"] = converted_use_bones
+
+    return case
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trackers", type=int, nargs="+", default=[4, 20, 64])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--takes", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--references", choices=["bones", "empties"], nargs="+", default=["bones"]
+    )
+    parser.add_argument("--rate", type=float, default=90, help="Samples per second")
+    parser.add_argument("--scene-fps", type=int, default=60)
+    parser.add_argument("--output", help="JSON file to write. Defaults to stdout.")
+    args = parser.parse_args(argv)
+
+    load_addon()
+    configure_preferences()
+
+    results = {"environment": get_environment(), "cases": []}
+
+    for references in args.references:
+        for num_trackers in args.trackers:
+            for minutes in args.minutes:
+                for num_takes in args.takes:
+                    print(
+                        f"Benchmarking {num_trackers} trackers, {minutes} min x {num_takes} takes, {references}",
+                        file=sys.stderr,
+                    )
+                    results["cases"].append(
+                        run_case(
+                            num_trackers,
+                            minutes,
+                            num_takes,
+                            references == "bones",
+                            args.rate,
+                            args.scene_fps,
+                        )
+                    )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
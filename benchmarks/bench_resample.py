@@ -0,0 +1,160 @@
+"""
+Benchmark of resampling fidelity of each kernel, with and without velocities.
+
+Synthetic trackers are captured at each rate, then resampled to the scene FPS with every kernel.
+The Hermite kernel is run both with the recorded velocities, and without them as for older takes.
+Frames are compared against the exact synthetic poses at the frame times.
+
+Run inside Blender, since the addon's modules are imported:
+    blender -b --python benchmarks/bench_resample.py -- --rates 90 45 --seconds 60
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tracking_toolkit.xr_core.buffer import PoseBuffer
+from tracking_toolkit.xr_core.resample import (
+    KERNEL_CATMULL_ROM,
+    KERNEL_HERMITE,
+    KERNEL_LINEAR,
+    resample,
+)
+from tracking_toolkit.xr_core.sources import SyntheticSource
+
+
+def capture(source: SyntheticSource, seconds: float) -> PoseBuffer:
+    source.start()
+
+    buffer = PoseBuffer(source.roles)
+    for _ in range(round(seconds * source.rate)):
+        sample_time, poses, valid, velocities = source.tick()
+        buffer.append(sample_time / 1e9, poses, valid, velocities)
+
+    return buffer
+
+
+def ground_truth(source: SyntheticSource, frame_times: np.ndarray) -> np.ndarray:
+    """
+    Get the exact synthetic poses at the frame times.
+    """
+    # Frame 0 is at the first sample, which may be jittered.
+    start = source.sample_time(0)
+
+    truth = np.empty((len(frame_times), len(source.roles), 7))
+    for i, t in enumerate(frame_times):
+        truth[i], _ = source.evaluate(start + t)
+
+    return truth
+
+
+def errors(locs: np.ndarray, rots: np.ndarray, truth: np.ndarray) -> dict:
+    position_error = np.linalg.norm(locs - truth[..., :3], axis=-1)
+
+    # Angle between the rotations, from the chord between the quaternions on the same hemisphere.
+    chord = np.minimum(
+        np.linalg.norm(rots - truth[..., 3:], axis=-1),
+        np.linalg.norm(rots + truth[..., 3:], axis=-1),
+    )
+    rotation_error = np.degrees(4 * np.arcsin(np.clip(chord / 2, 0, 1)))
+
+    return {
+        "position_mean_mm": float(position_error.mean() * 1e3),
+        "position_max_mm": float(position_error.max() * 1e3),
+        "rotation_mean_deg": float(rotation_error.mean()),
+        "rotation_max_deg": float(rotation_error.max()),
+    }
+
+
+def run_case(
+    num_trackers: int, rate: float, seconds: float, scene_fps: float, jitter: float
+) -> dict:
+    source = SyntheticSource(num_trackers, rate, jitter=jitter, realtime=False)
+    buffer = capture(source, seconds)
+
+    timestamps = buffer.timestamps - buffer.timestamps[0]
+    frame_times = np.arange(0, timestamps[-1], 1 / scene_fps)
+    truth = ground_truth(source, frame_times)
+
+    case = {
+        "trackers": num_trackers,
+        "rate": rate,
+        "scene_fps": scene_fps,
+        "seconds": seconds,
+        "buffer_bytes": int(
+            buffer.timestamps.nbytes
+            + buffer.poses.nbytes
+            + buffer.valid.nbytes
+            + buffer.velocities.nbytes
+        ),
+        "methods": {},
+    }
+
+    for method, kernel, velocities in (
+        ("linear", KERNEL_LINEAR, None),
+        ("hermite", KERNEL_HERMITE, buffer.velocities),
+        ("hermite_estimated", KERNEL_HERMITE, None),
+        ("catmull_rom", KERNEL_CATMULL_ROM, None),
+    ):
+        start = time.perf_counter()
+        locs, rots, _ = resample(
+            timestamps,
+            buffer.poses,
+            buffer.valid_mask(),
+            frame_times,
+            velocities,
+            kernel,
+        )
+        wall_time = time.perf_counter() - start
+
+        case["methods"][method] = {
+            "wall_time": wall_time,
+            **errors(locs, rots, truth),
+        }
+
+    return case
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trackers", type=int, default=20)
+    parser.add_argument("--rates", type=float, nargs="+", default=[90, 45])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--scene-fps", type=float, default=60)
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Sample timing jitter in seconds"
+    )
+    parser.add_argument("--output", help="JSON file to write. Defaults to stdout.")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for rate in args.rates:
+        case = run_case(args.trackers, rate, args.seconds, args.scene_fps, args.jitter)
+        cases.append(case)
+
+        for method, result in case["methods"].items():
+            print(
+                f"{rate:g} Hz {method}: "
+                f"position {result['position_mean_mm']:.3f} mm mean, {result['position_max_mm']:.3f} mm max, "
+                f"rotation {result['rotation_mean_deg']:.4f} deg mean, {result['rotation_max_deg']:.4f} deg max",
+                file=sys.stderr,
+            )
+
+    output = json.dumps({"cases": cases}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark of publishing live poses to shared memory, with a reader polling from another process.
+
+Synthetic samples are published at each rate, and measures:
+  - the cost of each publish, which is added to the capture tick
+  - samples the reader got, missed, and found torn (poses not matching the sample)
+  - latency from publishing a sample to the reader seeing it
+
+Runs without Blender, since the publisher and reader don't need it:
+    python benchmarks/bench_shared_memory.py --trackers 20 --rates 90 1000 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "tracking_toolkit"
+    ),
+)
+
+from xr_core.pose_publisher import PosePublisher
+from xr_core.pose_reader import PoseReader
+from xr_core.sources import SyntheticSource
+
+NAME = "tracking_toolkit_bench"
+
+
+def read(num_trackers: int, rate: float, poll_interval: float) -> dict:
+    """
+    Poll the publisher until it closes, checking every sample against the synthetic source.
+    """
+    reader = PoseReader(NAME)
+    reference = SyntheticSource(num_trackers, rate, realtime=False)
+
+    received = 0
+    torn = 0
+    latencies = []
+    last_index = -1
+    missed = 0
+
+    while not reader.closed:
+        for sample in reader.read_since(last_index):
+            latencies.append(time.time() - sample.wall_time)
+            missed += sample.index - last_index - 1
+            last_index = sample.index
+            received += 1
+
+            _, poses, _, _ = reference.sample(sample.index)
+            if not np.allclose(np.array(sample.poses), poses):
+                torn += 1
+
+        time.sleep(poll_interval)
+
+    reader.close()
+
+    latencies = np.array(latencies) * 1e3
+    return {
+        "received": received,
+        "missed": missed,
+        "torn": torn,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_case(num_trackers: int, rate: float, seconds: float, poll_rate: float) -> dict:
+    source = SyntheticSource(num_trackers, rate, realtime=False)
+    source.start()
+
+    publisher = PosePublisher(source.roles, NAME)
+
+    # The reader is a separate program, like the tools that would read the poses.
+    reader = subprocess.Popen(
+        [
+            sys.executable,
+            __file__,
+            "--reader",
+            f"--trackers={num_trackers}",
+            f"--rates={rate}",
+            f"--poll-rate={poll_rate}",
+        ],
+        stdout=subprocess.PIPE,
+    )
+
+    # Give the reader time to attach, so it sees every sample.
+    time.sleep(1)
+
+    publish_times = []
+    start = time.perf_counter()
+    for _ in range(round(seconds * rate)):
+        tick_start = time.perf_counter()
+
+        sample_time, poses, valid, velocities = source.tick()
+        publish_start = time.perf_counter()
+        publisher.publish(sample_time, poses, valid, velocities, time.time())
+        publish_times.append(time.perf_counter() - publish_start)
+
+        remaining = 1 / rate - (time.perf_counter() - tick_start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    wall_time = time.perf_counter() - start
+    published = publisher.write_count
+
+    # Let the reader catch up before telling it to stop.
+    time.sleep(0.1)
+    publisher.close()
+
+    output, _ = reader.communicate()
+    reader_results = json.loads(output)
+
+    publish_times = np.array(publish_times) * 1e6
+    return {
+        "trackers": num_trackers,
+        "rate": rate,
+        "achieved_rate": published / wall_time,
+        "published": published,
+        "publish_p50_us": float(np.percentile(publish_times, 50)),
+        "publish_p99_us": float(np.percentile(publish_times, 99)),
+        "publish_max_us": float(publish_times.max()),
+        **reader_results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trackers", type=int, default=20)
+    parser.add_argument("--rates", type=float, nargs="+", default=[90, 1000])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument(
+        "--poll-rate", type=float, default=1000, help="Reader polls per second"
+    )
+    parser.add_argument("--output", help="JSON file to write. Defaults to stdout.")
+    parser.add_argument("--reader", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reader:
+        print(json.dumps(read(args.trackers, args.rates[0], 1 / args.poll_rate)))
+        return
+
+    cases = []
+    for rate in args.rates:
+        case = run_case(args.trackers, rate, args.seconds, args.poll_rate)
+        cases.append(case)
+
+        print(
+            f"{rate:g} Hz: {case['achieved_rate']:.1f} Hz achieved, "
+            f"publish {case['publish_p50_us']:.1f} us p50, {case['publish_p99_us']:.1f} us p99, "
+            f"reader got {case['received']}/{case['published']} ({case['missed']} missed, {case['torn']} torn), "
+            f"latency {case['latency_p50_ms']:.2f} ms p50",
+            file=sys.stderr,
+        )
+
+    output = json.dumps({"cases": cases}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
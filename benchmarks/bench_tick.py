@@ -0,0 +1,116 @@
+"""
+Micro-benchmark of the per-tick work in tick_xr(), without the runtime calls themselves.
+
+Compares the previous path (new sync structs, a SpaceLocation per space, and a mathutils
+Matrix per pose) against the prepared TickContext path.
+
+Run inside Blender, since the previous path needs mathutils:
+    blender -b --python benchmarks/bench_tick.py -- --trackers 20 --ticks 10000
+"""
+
+import argparse
+import ctypes
+import os
+import sys
+import time
+
+import bpy_extras
+import mathutils
+import numpy as np
+import xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tracking_toolkit.xr_core.actions import all_role_strings
+from tracking_toolkit.xr_core.core import POSE_CONVERSION, location_dtype
+from tracking_toolkit.xr_core.buffer import POSE_SIZE
+
+
+def _legacy_pose_to_mat(pose):
+    loc = mathutils.Vector(pose.position.as_numpy())
+    rot = mathutils.Quaternion(
+        (pose.orientation.w, pose.orientation.x, pose.orientation.y, pose.orientation.z)
+    )
+    mat = mathutils.Matrix.LocRotScale(loc, rot, (1, 1, 1))
+    mat_world = bpy_extras.io_utils.axis_conversion("-Z", "Y", "Y", "Z").to_4x4()
+    return mat_world @ mat
+
+
+def _random_pose(rng) -> xr.Posef:
+    q = rng.normal(size=4)
+    q /= np.linalg.norm(q)
+    return xr.Posef(xr.Quaternionf(*q), xr.Vector3f(*rng.normal(size=3)))
+
+
+def bench_legacy(names, source, ticks) -> float:
+    start = time.perf_counter()
+
+    for _ in range(ticks):
+        active_action_set = xr.ActiveActionSet(
+            subaction_path=ctypes.c_uint64(xr.NULL_PATH),
+        )
+        xr.ActionsSyncInfo(
+            count_active_action_sets=1,
+            active_action_sets=[active_action_set],
+        )
+
+        poses = {}
+        for name, location_data in zip(names, source):
+            # xr.locate_space() allocates a new struct for every call.
+            location = xr.SpaceLocation()
+            location.location_flags = location_data.location_flags
+            location.pose = location_data.pose
+
+            if location.location_flags & xr.SPACE_LOCATION_POSITION_VALID_BIT:
+                poses[name] = _legacy_pose_to_mat(location.pose)
+
+    return (time.perf_counter() - start) / ticks
+
+
+def bench_prepared(names, source, ticks) -> float:
+    raw = np.frombuffer(source, dtype=location_dtype(xr.SpaceLocationData))
+    raw_flags = raw["flags"]
+    raw_poses = raw["pose"]
+
+    columns = np.array([all_role_strings.index(name) for name in names])
+    converted = np.zeros((len(names), POSE_SIZE), dtype=np.float32)
+    poses = np.zeros((len(all_role_strings), POSE_SIZE), dtype=np.float32)
+    valid = np.zeros(len(all_role_strings), dtype=bool)
+
+    start = time.perf_counter()
+
+    for _ in range(ticks):
+        np.matmul(raw_poses, POSE_CONVERSION, out=converted)
+        poses[columns] = converted
+        valid[columns] = (raw_flags & xr.SPACE_LOCATION_POSITION_VALID_BIT) != 0
+
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trackers", type=int, default=len(all_role_strings))
+    parser.add_argument("--ticks", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    names = all_role_strings[: args.trackers]
+    rng = np.random.default_rng(0)
+
+    # Stand-in for what the runtime writes during location.
+    source = (xr.SpaceLocationData * len(names))()
+    for location in source:
+        location.location_flags = xr.SPACE_LOCATION_POSITION_VALID_BIT
+        location.pose = _random_pose(rng)
+
+    legacy = bench_legacy(names, source, args.ticks)
+    prepared = bench_prepared(names, source, args.ticks)
+
+    print(f"Trackers: {len(names)}, ticks: {args.ticks}")
+    print(f"Before: {legacy * 1e6:.1f} us/tick")
+    print(f"After:  {prepared * 1e6:.1f} us/tick ({legacy / prepared:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Check that the vectorized linear kernel matches the per-pose conversion it replaced.
+
+The old conversion walked every frame in Python. Each pose was split with Matrix.decompose(), which
+normalizes the rotation and returns it with w >= 0, then lerped and slerped, and decomposed again.
+It is kept here, and both are run on random takes with jitter, duplicate stamps, dropouts and flipped signs.
+Exits with an error if any frame differs by more than the tolerance.
+
+Inside Blender (or wherever mathutils imports) the old conversion runs on mathutils itself.
+mathutils works in single precision, so pass a looser tolerance there, e.g. --tolerance 1e-5:
+    blender --background --python benchmarks/check_resample.py -- --tolerance 1e-5
+
+Elsewhere it runs on a plain Python copy of the mathutils functions it used:
+    python benchmarks/check_resample.py --takes 20 --trackers 8 --seconds 10
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "tracking_toolkit"
+    ),
+)
+
+from xr_core.resample import KERNEL_LINEAR, count_frames, resample
+
+try:
+    import mathutils
+except ImportError:
+    mathutils = None
+
+# Below this, Blender's quaternion interpolation falls back to a plain lerp.
+BLENDER_SLERP_EPSILON = 0.0001
+
+
+def _decompose(pose: list[float]) -> tuple[list[float], list[float]]:
+    """
+    Split a pose like Matrix.LocRotScale(...).decompose(): the rotation comes back normalized, with w >= 0.
+    :returns: Tuple of (location, rotation).
+    """
+    if mathutils is not None:
+        matrix = mathutils.Matrix.LocRotScale(
+            pose[:3], mathutils.Quaternion(pose[3:]), (1, 1, 1)
+        )
+        loc, rot, _ = matrix.decompose()
+        return list(loc), list(rot)
+
+    norm = math.sqrt(sum(c * c for c in pose[3:]))
+    rot = [c / norm for c in pose[3:]]
+    if rot[0] < 0:
+        rot = [-c for c in rot]
+    return pose[:3], rot
+
+
+def _slerp(q0: list[float], q1: list[float], factor: float) -> list[float]:
+    """
+    Slerp of (w, x, y, z) quaternions with mathutils.Quaternion.slerp, or a plain Python copy of it.
+    """
+    if mathutils is not None:
+        return list(mathutils.Quaternion(q0).slerp(mathutils.Quaternion(q1), factor))
+
+    cos_half = sum(a * b for a, b in zip(q0, q1))
+    if cos_half < 0:
+        cos_half = -cos_half
+        q1 = [-b for b in q1]
+
+    if 1 - cos_half > BLENDER_SLERP_EPSILON:
+        angle = math.acos(cos_half)
+        sin_angle = math.sin(angle)
+        w0 = math.sin((1 - factor) * angle) / sin_angle
+        w1 = math.sin(factor * angle) / sin_angle
+    else:
+        w0 = 1 - factor
+        w1 = factor
+
+    return [a * w0 + b * w1 for a, b in zip(q0, q1)]
+
+
+def convert_scalar(
+    timestamps: np.ndarray, poses: np.ndarray, valid: np.ndarray, record_fps: float
+) -> dict[int, dict[int, list[float]]]:
+    """
+    The per-pose conversion from before the vectorized kernel, without the F-Curve writing.
+    :returns: Dictionary of tracker index to {frame: (x, y, z, qw, qx, qy, qz)}.
+    """
+    total_duration = float(timestamps[-1] - timestamps[0])
+    source_times = (timestamps - timestamps[0]).tolist()
+
+    animation_data = {}
+    current_time = 0
+    frame = 0
+    min_index = 0
+
+    while current_time <= total_duration:
+        closest_idx = None
+        for i in range(min_index, len(source_times)):
+            if source_times[i] >= current_time:
+                closest_idx = i
+                min_index = i
+                break
+
+        if closest_idx is None:
+            break
+
+        factor = 0
+        if closest_idx == 0:
+            prev_idx = 0
+            next_idx = 0
+        else:
+            prev_time = source_times[closest_idx - 1]
+            next_time = source_times[closest_idx]
+
+            if prev_time != next_time:
+                factor = (current_time - prev_time) / (next_time - prev_time)
+
+            prev_idx = closest_idx - 1
+            next_idx = closest_idx
+
+        for tracker in range(poses.shape[1]):
+            if not valid[next_idx, tracker] or not valid[prev_idx, tracker]:
+                continue
+
+            loc0, rot0 = _decompose(poses[prev_idx, tracker].tolist())
+            loc1, rot1 = _decompose(poses[next_idx, tracker].tolist())
+
+            loc = [a + (b - a) * factor for a, b in zip(loc0, loc1)]
+            rot = _slerp(rot0, rot1, factor)
+
+            # The lerped pose was rebuilt into a matrix and decomposed again.
+            animation_data.setdefault(tracker, {})[frame] = sum(
+                _decompose(loc + rot), []
+            )
+
+        current_time += 1 / record_fps
+        frame += 1
+
+    return animation_data
+
+
+def random_take(
+    rng: np.random.Generator, num_trackers: int, seconds: float, rate: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build a take of smoothly moving trackers, sampled with jitter, duplicate stamps and dropouts.
+    """
+    num_samples = round(seconds * rate)
+
+    intervals = rng.uniform(0.5, 1.5, num_samples) / rate
+    intervals[rng.random(num_samples) < 0.01] = 0
+    timestamps = 1000 + np.cumsum(intervals)
+
+    locations = np.cumsum(rng.normal(0, 0.01, (num_samples, num_trackers, 3)), axis=0)
+    rotations = np.cumsum(rng.normal(0, 0.05, (num_samples, num_trackers, 4)), axis=0)
+    rotations /= np.linalg.norm(rotations, axis=-1, keepdims=True)
+
+    # Each sample is a random sign of its quaternion, like runtimes may report.
+    rotations *= rng.choice((-1, 1), (num_samples, num_trackers, 1))
+
+    poses = np.concatenate((locations, rotations), axis=-1).astype(np.float32)
+    valid = rng.random((num_samples, num_trackers)) > 0.05
+
+    return timestamps, poses, valid
+
+
+def compare(
+    timestamps: np.ndarray, poses: np.ndarray, valid: np.ndarray, record_fps: float
+) -> float:
+    """
+    Run both conversions on a take.
+    :returns: Largest difference of any pose component. Infinite if different frames were converted.
+    """
+    expected = convert_scalar(timestamps, poses, valid, record_fps)
+
+    num_frames = count_frames(float(timestamps[-1] - timestamps[0]), record_fps)
+    frame_times = np.arange(num_frames) / record_fps
+    locs, rots, frame_valid = resample(
+        timestamps - timestamps[0], poses, valid, frame_times, kernel=KERNEL_LINEAR
+    )
+
+    error = 0.0
+    for tracker in range(poses.shape[1]):
+        frames = np.flatnonzero(frame_valid[:, tracker])
+        expected_frames = expected.get(tracker, {})
+        if frames.tolist() != list(expected_frames):
+            return math.inf
+
+        if not len(frames):
+            continue
+
+        actual = np.concatenate((locs[frames, tracker], rots[frames, tracker]), axis=-1)
+        error = max(
+            error,
+            float(np.abs(actual - np.array(list(expected_frames.values()))).max()),
+        )
+
+    return error
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--takes", type=int, default=20)
+    parser.add_argument("--trackers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=float, default=90, help="Samples per second")
+    parser.add_argument("--fps", type=float, nargs="+", default=[24, 30, 60, 90])
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(
+        sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else None
+    )
+
+    rng = np.random.default_rng(args.seed)
+
+    worst = 0.0
+    for take in range(args.takes):
+        timestamps, poses, valid = random_take(
+            rng, args.trackers, args.seconds, args.rate
+        )
+        for record_fps in args.fps:
+            error = compare(timestamps, poses, valid, record_fps)
+            worst = max(worst, error)
+
+            if error > args.tolerance:
+                print(
+                    f"Take {take} at {record_fps:g} FPS differs by {error:g}",
+                    file=sys.stderr,
+                )
+
+    print(f"Largest difference: {worst:g}")
+    if worst > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
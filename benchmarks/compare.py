@@ -0,0 +1,73 @@
+"""
+Compare two bench_pipeline.py results, eg. from the previous and the current release.
+
+    python benchmarks/compare.py before.json after.json
+"""
+
+import argparse
+import json
+
+CASE_KEYS = ("references", "trackers", "minutes", "takes")
+STEPS = (
+    "create_references",
+    "capture",
+    "commit",
+    "preview",
+    "convert_empties_to_bones",
+    "convert_bones_to_empties",
+)
+
+
+def _load_cases(path: str) -> dict[tuple, dict]:
+    with open(path) as f:
+        results = json.load(f)
+
+    return {tuple(case[key] for key in CASE_KEYS): case for case in results["cases"]}
+
+
+def _format_change(before: float | None, after: float | None) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{after / before:.2f}x"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    before_cases = _load_cases(args.before)
+    after_cases = _load_cases(args.after)
+
+    for key in sorted(before_cases.keys() & after_cases.keys()):
+        print(", ".join(f"{name}={value}" for name, value in zip(CASE_KEYS, key)))
+
+        before_steps = before_cases[key]["steps"]
+        after_steps = after_cases[key]["steps"]
+
+        for step in STEPS:
+            if step not in before_steps or step not in after_steps:
+                continue
+
+            before = before_steps[step]
+            after = after_steps[step]
+            print(
+                f"  {step:<26}"
+                f" time {before['wall_time']:9.3f}s -> {after['wall_time']:9.3f}s"
+                f" ({_format_change(before['wall_time'], after['wall_time'])})"
+                f"  memory {_format_change(before.get('peak_memory'), after.get('peak_memory'))}"
+            )
+
+        before_keys = before_steps.get("commit", {}).get("keys_written")
+        after_keys = after_steps.get("commit", {}).get("keys_written")
+        if before_keys != after_keys:
+            print(f"  keys written changed: {before_keys} -> {after_keys}")
+
+    missing = before_cases.keys() ^ after_cases.keys()
+    if missing:
+        print(f"{len(missing)} case(s) only ran in one of the files.")
+
+
+if __name__ == "__main__":
+    main()
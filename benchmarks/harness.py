@@ -0,0 +1,161 @@
+"""
+Shared helpers for benchmarks that run the whole addon inside Blender.
+"""
+
+import importlib
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tomllib
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# The repository directory isn't a valid module name, so the addon is loaded through a link.
+ADDON_NAME = "tracking_toolkit_bench"
+
+
+def load_addon():
+    """
+    Enable the addon from this checkout.
+    :returns: The addon's root module.
+    """
+    import addon_utils
+
+    link_dir = tempfile.mkdtemp(prefix="ttk_bench_")
+    os.symlink(REPO_DIR, os.path.join(link_dir, ADDON_NAME), target_is_directory=True)
+    sys.path.insert(0, link_dir)
+
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    return importlib.import_module(ADDON_NAME)
+
+
+def addon_module(name: str):
+    """
+    Import a module of the loaded addon, eg. "tracking_toolkit.utils".
+    """
+    return importlib.import_module(f"{ADDON_NAME}.{name}")
+
+
+def get_environment() -> dict:
+    """
+    Describe the build being measured, so results from different versions can be told apart.
+    """
+    import bpy
+
+    with open(os.path.join(REPO_DIR, "blender_manifest.toml"), "rb") as f:
+        manifest = tomllib.load(f)
+
+    return {
+        "addon_version": manifest["version"],
+        "blender_version": bpy.app.version_string,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _read_rss() -> int | None:
+    """
+    Resident memory of this process in bytes, or None if it can't be read.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class PeakMemory:
+    """
+    Samples resident memory on a thread, to find the peak growth during a block.
+    This covers Blender's own allocations too, which tracemalloc can't see.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.baseline: int | None = None
+        self.peak: int | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def growth(self) -> int | None:
+        """
+        Peak memory above the baseline, in bytes.
+        """
+        if self.baseline is None or self.peak is None:
+            return None
+        return max(0, self.peak - self.baseline)
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _read_rss())
+
+    def __enter__(self):
+        self.baseline = _read_rss()
+        self.peak = self.baseline
+
+        if self.baseline is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self.peak = max(self.peak, _read_rss())
+
+
+class Timer:
+    """
+    Wall time of a block, in seconds.
+    """
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def reset_scene(scene_fps: int):
+    """
+    Start from an empty file with the given frame rate.
+    """
+    import bpy
+
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.context.scene.render.fps = scene_fps
+    bpy.context.scene.render.fps_base = 1
+
+
+def configure_preferences():
+    """
+    Only measure the pipeline itself, not the disk.
+    """
+    preferences = addon_module("tracking_toolkit.preferences").get_preferences()
+    preferences.record_at_scene_fps = True
+    preferences.use_keyframe_reduction = False
+    preferences.use_streaming_commit = False
+    preferences.use_take_journal = False
+    preferences.save_raw_takes = False
+
+
+def measure(step: dict, fn):
+    """
+    Run a function, storing its wall time and peak memory growth in the step.
+    :returns: What the function returned.
+    """
+    with PeakMemory() as memory, Timer() as timer:
+        result = fn()
+
+    step["wall_time"] = timer.elapsed
+    step["peak_memory"] = memory.growth
+    return result
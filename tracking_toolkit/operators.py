@@ -1,5 +1,7 @@
 import bpy
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 
+from .preferences import get_preferences
 from .utils import (
     check_refs,
     create_bone_references,
@@ -12,7 +14,12 @@ from .xr_core.tracking import (
     stop_recording,
     start_preview,
     stop_preview,
+    recover_take,
+    refresh_orphaned_journals,
+    rebake_take,
 )
+from .xr_core.raw_take import RAW_TAKE_EXTENSION
+from .xr_core import instrumentation, tracking
 
 
 class ToggleRecordOperator(bpy.types.Operator):
@@ -27,8 +34,17 @@ class ToggleRecordOperator(bpy.types.Operator):
             return {"FINISHED"}
 
         if xr_state.recording:
-            stop_recording()
+            key_stats = stop_recording(get_preferences().use_background_commit)
+
+            # Takes written in the background are reported in the panel when they finish.
+            if key_stats:
+                for report_type, message in tracking.last_take_report:
+                    self.report({report_type}, message)
         else:
+            if tracking.commit_job:
+                self.report({"WARNING"}, "Wait for the last take to be written.")
+                return {"CANCELLED"}
+
             if not check_refs():
                 self.report({"WARNING"}, "Not all references exist. Expect data loss.")
 
@@ -37,6 +53,19 @@ class ToggleRecordOperator(bpy.types.Operator):
         return {"FINISHED"}
 
 
+class CancelCommitOperator(bpy.types.Operator):
+    bl_idname = "id.cancel_commit"
+    bl_label = "Stop writing the take. Its samples are kept for recovery or re-baking"
+
+    @classmethod
+    def poll(cls, context):
+        return tracking.commit_job is not None
+
+    def execute(self, context):
+        tracking.cancel_commit()
+        return {"FINISHED"}
+
+
 class ToggleActiveOperator(bpy.types.Operator):
     bl_idname = "id.toggle_active"
     bl_label = "Toggle OpenXR's tracking state"
@@ -75,3 +104,90 @@ class CreateRefsOperator(bpy.types.Operator):
 
         print("Done")
         return {"FINISHED"}
+
+
+class RecoverTakeOperator(bpy.types.Operator):
+    bl_idname = "id.recover_take"
+    bl_label = "Recover the newest take left behind by a crash"
+    bl_options = {"UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        # Writing another take while one is committed in the background would interleave them.
+        return not get_state().recording and not tracking.commit_job
+
+    def execute(self, context):
+        refresh_orphaned_journals()
+        if not tracking.orphaned_journals:
+            self.report({"INFO"}, "No takes to recover.")
+            return {"CANCELLED"}
+
+        path = tracking.orphaned_journals[0]
+
+        try:
+            keys_written, _ = recover_take(path)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not recover take: {e}")
+            return {"CANCELLED"}
+
+        self.report({"INFO"}, f"Recovered take with {keys_written} keys.")
+        return {"FINISHED"}
+
+
+class RebakeTakeOperator(bpy.types.Operator, ImportHelper):
+    bl_idname = "id.rebake_take"
+    bl_label = "Re-bake a raw take into new actions"
+    bl_options = {"UNDO"}
+
+    filename_ext = RAW_TAKE_EXTENSION
+    filter_glob: bpy.props.StringProperty(
+        default=f"*{RAW_TAKE_EXTENSION}", options={"HIDDEN"}
+    )
+
+    use_scene_fps: bpy.props.BoolProperty(name="Use Scene FPS", default=True)
+    fps: bpy.props.FloatProperty(name="FPS", default=60, min=1, soft_max=240)
+
+    @classmethod
+    def poll(cls, context):
+        # Writing another take while one is committed in the background would interleave them.
+        return not get_state().recording and not tracking.commit_job
+
+    def execute(self, context):
+        record_fps = self.fps
+        if self.use_scene_fps:
+            record_fps = context.scene.render.fps / context.scene.render.fps_base
+
+        try:
+            keys_written, _ = rebake_take(self.filepath, record_fps)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not re-bake take: {e}")
+            return {"CANCELLED"}
+
+        self.report({"INFO"}, f"Re-baked take with {keys_written} keys.")
+        return {"FINISHED"}
+
+
+class ExportTimingsOperator(bpy.types.Operator, ExportHelper):
+    bl_idname = "id.export_timings"
+    bl_label = "Export stage timings to CSV"
+
+    filename_ext = ".csv"
+    filter_glob: bpy.props.StringProperty(default="*.csv", options={"HIDDEN"})
+
+    def execute(self, context):
+        try:
+            instrumentation.export_csv(self.filepath)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not export timings: {e}")
+            return {"CANCELLED"}
+
+        return {"FINISHED"}
+
+
+class ResetTimingsOperator(bpy.types.Operator):
+    bl_idname = "id.reset_timings"
+    bl_label = "Reset stage timings"
+
+    def execute(self, context):
+        instrumentation.reset()
+        return {"FINISHED"}
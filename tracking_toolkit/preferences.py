@@ -1,6 +1,8 @@
 import bpy
 
 from .xr_core.actions import all_role_strings, reformat_role_string
+from .xr_core.pose_reader import DEFAULT_NAME as DEFAULT_PUBLISHER_NAME
+from .xr_core.remote import DEFAULT_PORT
 from .. import __package__ as base_package
 
 
@@ -95,6 +97,80 @@ class Preferences(bpy.types.AddonPreferences):
     record_at_scene_fps: bpy.props.BoolProperty(default=True)
     record_custom_fps: bpy.props.IntProperty(default=24, min=1, max=120, soft_max=90)
 
+    use_capture_thread: bpy.props.BoolProperty(default=True)
+    use_pose_prediction: bpy.props.BoolProperty(default=False)
+    prediction_horizon: bpy.props.FloatProperty(
+        default=0.05, min=0.0, soft_max=0.1, precision=3, unit="TIME_ABSOLUTE"
+    )
+    headless_capture_rate: bpy.props.IntProperty(
+        default=90, min=1, max=1000, soft_max=240
+    )
+
+    resample_kernel: bpy.props.EnumProperty(
+        items=[
+            ("LINEAR", "Linear", "Straight lines between samples"),
+            (
+                "HERMITE",
+                "Hermite (Velocities)",
+                "Curves through the velocities reported by the runtime. Without them, such as in replays, older takes "
+                "and runtimes that don't report velocities, positions are the same as Catmull-Rom",
+            ),
+            (
+                "CATMULL_ROM",
+                "Catmull-Rom",
+                "Splines through neighbouring samples, ignoring reported velocities",
+            ),
+        ],
+        default="HERMITE",
+    )
+    use_keyframe_reduction: bpy.props.BoolProperty(default=False)
+    keyframe_reduction_tolerance: bpy.props.FloatProperty(
+        default=0.001, min=0.0, soft_max=0.01, precision=4
+    )
+    use_streaming_commit: bpy.props.BoolProperty(default=False)
+    use_background_commit: bpy.props.BoolProperty(default=True)
+    use_lazy_conversion: bpy.props.BoolProperty(default=True)
+    use_take_journal: bpy.props.BoolProperty(default=False)
+    pose_source: bpy.props.EnumProperty(
+        items=[
+            ("OPENXR", "OpenXR", "Live poses from the OpenXR runtime"),
+            (
+                "SYNTHETIC",
+                "Synthetic",
+                "Generated trackers, for testing without a headset",
+            ),
+            ("REPLAY", "Replay", "Play back a raw take or journal"),
+            (
+                "REMOTE",
+                "Remote",
+                "Poses streamed from a capture host in another process or on another machine",
+            ),
+        ],
+        default="OPENXR",
+    )
+    synthetic_trackers: bpy.props.IntProperty(default=8, min=1, soft_max=64)
+    synthetic_rate: bpy.props.FloatProperty(default=90, min=1, soft_max=1000)
+    synthetic_jitter: bpy.props.FloatProperty(
+        default=0.0, min=0.0, soft_max=0.005, precision=4, unit="TIME_ABSOLUTE"
+    )
+    synthetic_dropout: bpy.props.FloatProperty(
+        default=0.0, min=0.0, max=1.0, subtype="FACTOR"
+    )
+    replay_path: bpy.props.StringProperty(subtype="FILE_PATH")
+    replay_loop: bpy.props.BoolProperty(default=True)
+    remote_address: bpy.props.StringProperty(default="127.0.0.1")
+    remote_port: bpy.props.IntProperty(default=DEFAULT_PORT, min=1, max=65535)
+    use_pose_publisher: bpy.props.BoolProperty(default=False)
+    pose_publisher_name: bpy.props.StringProperty(default=DEFAULT_PUBLISHER_NAME)
+    save_raw_takes: bpy.props.BoolProperty(default=False)
+    raw_take_directory: bpy.props.StringProperty(default="//takes", subtype="DIR_PATH")
+    health_min_rate: bpy.props.FloatProperty(
+        default=0.9, min=0.0, max=1.0, subtype="FACTOR"
+    )
+    health_max_invalid: bpy.props.FloatProperty(
+        default=0.05, min=0.0, max=1.0, subtype="FACTOR"
+    )
+
     naming: bpy.props.CollectionProperty(
         name="Default Tracker Nicknames", type=PreferenceNaming
     )
@@ -110,6 +186,112 @@ class Preferences(bpy.types.AddonPreferences):
             layout.label(text="Warning: Using custom FPS. Subframes may be created.")
         layout.label(text="High scene or custom FPS can cause performance issues.")
 
+        layout.prop(self, "use_capture_thread", text="Capture in Background Thread")
+        layout.label(
+            text="On by default, so heavy scenes don't cause dropped samples. Turn off to sample from Blender's timers."
+        )
+        if self.use_capture_thread:
+            layout.prop(
+                self, "headless_capture_rate", text="Headless Capture Rate (Hz)"
+            )
+            layout.label(
+                text="Samples are taken at the runtime's rate and resampled when recording stops."
+            )
+
+        layout.prop(self, "use_pose_prediction", text="Predict Preview Poses")
+        if self.use_pose_prediction:
+            layout.prop(self, "prediction_horizon", text="Maximum Prediction")
+            layout.label(
+                text="The live preview is extrapolated with the runtime's velocities. Recorded data is not changed."
+            )
+
+        layout.prop(
+            self, "use_pose_publisher", text="Share Live Poses With Other Programs"
+        )
+        if self.use_pose_publisher:
+            layout.prop(self, "pose_publisher_name", text="Shared Memory Name")
+            layout.label(
+                text="Each sample is written to shared memory for xr_core/pose_reader.py. Reconnect to apply."
+            )
+
+        layout.prop(self, "resample_kernel", text="Resampling")
+        layout.label(
+            text="How recorded frames between samples are filled in. Cubic kernels keep lower capture rates smooth."
+        )
+
+        layout.prop(self, "use_keyframe_reduction", text="Reduce Keyframes")
+        if self.use_keyframe_reduction:
+            layout.prop(self, "keyframe_reduction_tolerance", text="Tolerance")
+            layout.label(
+                text="Keys are removed if the linear curve stays within the tolerance (meters or quaternion units)."
+            )
+
+        layout.prop(
+            self, "use_streaming_commit", text="Write Keyframes While Recording"
+        )
+        layout.label(
+            text="Completed seconds of the take are written as it records, so stopping is nearly instant."
+        )
+        layout.label(
+            text="Only the first 18000 frames are written while recording. The rest of longer takes is written on stop."
+        )
+
+        layout.prop(self, "use_background_commit", text="Write Keyframes In Background")
+        layout.label(
+            text="On by default. Stopping doesn't block Blender, and the preview keeps running while the take is written."
+        )
+
+        layout.prop(self, "use_take_journal", text="Journal Takes To Disk")
+        layout.label(
+            text="Samples are saved next to the blend file while recording, so a take can be recovered after a crash."
+        )
+        layout.label(
+            text="Unsaved blend files journal to the temporary directory. The journal is removed once the take is written."
+        )
+
+        layout.prop(self, "save_raw_takes", text="Save Raw Takes")
+        if self.save_raw_takes:
+            layout.prop(self, "raw_take_directory", text="Directory")
+            layout.label(
+                text="The original samples of every take are written to this directory, so takes can be re-baked at any frame rate."
+            )
+
+        layout.prop(self, "health_min_rate", text="Minimum Sample Rate")
+        layout.prop(self, "health_max_invalid", text="Maximum Invalid Samples")
+        layout.label(
+            text="Takes below these are flagged. Each take's quality is stored in its action's capture_quality property."
+        )
+
+        layout.prop(
+            self, "use_lazy_conversion", text="Convert Muted Takes In Background"
+        )
+        layout.label(
+            text="On by default. When switching between bones and empties, only the active take is converted right away."
+        )
+
+        layout.separator_spacer()
+
+        # Pose source options.
+
+        layout.label(text="Pose Source")
+        layout.prop(self, "pose_source", text="Source")
+        if self.pose_source == "SYNTHETIC":
+            layout.prop(self, "synthetic_trackers", text="Trackers")
+            layout.prop(self, "synthetic_rate", text="Rate (Hz)")
+            layout.prop(self, "synthetic_jitter", text="Timing Jitter")
+            layout.prop(self, "synthetic_dropout", text="Dropout Chance")
+        elif self.pose_source == "REPLAY":
+            layout.prop(self, "replay_path", text="Take")
+            layout.prop(self, "replay_loop", text="Loop")
+        elif self.pose_source == "REMOTE":
+            layout.prop(self, "remote_address", text="Listen Address")
+            layout.prop(self, "remote_port", text="Port")
+            layout.label(
+                text="Use 0.0.0.0 to receive from other machines. Reconnect to apply."
+            )
+        if self.pose_source in {"SYNTHETIC", "REPLAY"}:
+            layout.label(text="For testing without a headset. Reconnect to apply.")
+
         layout.separator_spacer()
 
         # Tracker nickname options.
@@ -1,6 +1,12 @@
 import bpy
 
-from .utils import convert_bones_to_empties, convert_empties_to_bones
+from .preferences import get_preferences
+from .utils import (
+    convert_bones_to_empties,
+    convert_empties_to_bones,
+    get_references,
+)
+from .xr_core import instrumentation
 from .xr_core.actions import all_role_strings, reformat_role_string
 
 
@@ -30,12 +36,20 @@ def tracker_nickname_change(self, _):
                 "You cannot use the real name of different tracker as a nickname."
             )
 
-    def _prevent_conflict(items):
-        """
-        Function that errors when renaming to an existing nickname.
-        """
-        existing_names = [i.name for i in items]
-        if new_nickname in existing_names:
+    tracker_ref, offset_ref = get_references(role_string)
+
+    # Bones are named within the armature, and empties within all objects.
+    if bpy.context.scene.XRContext.use_bones:
+        armature = bpy.data.objects.get("XR Trackers")
+        existing = armature.pose.bones if armature else None
+    else:
+        existing = bpy.data.objects
+
+    # Prevent renaming to an existing nickname.
+    # Lookups by name are hashed, so this doesn't depend on the size of the scene.
+    if existing is not None:
+        conflict = existing.get(new_nickname)
+        if conflict and conflict != tracker_ref:
             # Revert to previous nickname (or role string).
             self["nickname"] = self.prev_nickname or self.role_string
 
@@ -43,34 +57,11 @@ def tracker_nickname_change(self, _):
                 f"Cannot rename {role_string} to an existing nickname or object: {new_nickname}."
             )
 
-    if bpy.context.scene.XRContext.use_bones:
-        armature = bpy.data.objects.get("XR Trackers")
-        if armature:
-            bones = armature.pose.bones
-            _prevent_conflict(bones)
-
-            # Find and rename bones.
-            for bone in bones:
-                if bone.get("role_string") != role_string:
-                    continue
-
-                if bone.get("ref_type") == "tracker":
-                    bone.name = new_nickname
-                elif bone.get("ref_type") == "offset":
-                    bone.name = f"{new_nickname} Offset"
-
-    else:
-        _prevent_conflict(bpy.data.objects)
-
-        # Find and rename empties.
-        for obj in bpy.data.objects:
-            if not obj.get("role_string") == role_string:
-                continue
-
-            if obj.get("ref_type") == "tracker":
-                obj.name = new_nickname
-            elif obj.get("ref_type") == "offset":
-                obj.name = f"{new_nickname} Offset"
+    # Rename references. The registry holds them by role string, so it stays valid.
+    if tracker_ref:
+        tracker_ref.name = new_nickname
+    if offset_ref:
+        offset_ref.name = f"{new_nickname} Offset"
 
     print(f"Set nickname of {role_string} to {new_nickname}")
     self.prev_nickname = new_nickname
@@ -87,29 +78,15 @@ class XRTrackerNaming(bpy.types.PropertyGroup):
 def tracker_visible_change(self, _):
     # Apply tracker visibility settings.
 
-    nickname = self.naming.nickname
-
-    # Try with bones.
-    armature = bpy.data.objects.get("XR Trackers")
-    if armature:
-        bones = armature.pose.bones
-
-        tracker_point = bones.get(nickname)
-        if tracker_point:
-            tracker_point.hide = self.hidden
-
-        tracker_offset = bones.get(f"{nickname} Offset")
-        if tracker_offset:
-            tracker_offset.hide = self.hidden
+    for ref in get_references(self.naming.role_string):
+        if not ref:
+            continue
 
-    # Try with empties.
-    tracker_point = bpy.data.objects.get(nickname)
-    if tracker_point:
-        tracker_point.hide_viewport = self.hidden
-
-    tracker_offset = bpy.data.objects.get(f"{nickname} Offset")
-    if tracker_offset:
-        tracker_offset.hide_viewport = self.hidden
+        # Bones and empties hide differently.
+        if isinstance(ref, bpy.types.PoseBone):
+            ref.hide = self.hidden
+        else:
+            ref.hide_viewport = self.hidden
 
 
 class XRTracker(bpy.types.PropertyGroup):
@@ -131,7 +108,7 @@ def selected_tracker_change_callback(self: "XRContext", context):
 
     selected_tracker = self.trackers[self.selected_tracker]
 
-    obj = bpy.data.objects.get(selected_tracker.naming.nickname)
+    obj, _ = get_references(selected_tracker.naming.role_string)
     if not obj:
         return
 
@@ -141,13 +118,15 @@ def selected_tracker_change_callback(self: "XRContext", context):
 
 
 def use_bones_change_callback(self: "XRContext", _):
+    lazy = get_preferences().use_lazy_conversion
+
     # Convert empties to bones.
     if self.use_bones:
-        convert_empties_to_bones()
+        convert_empties_to_bones(lazy)
 
     # Convert bones to empties.
     else:
-        convert_bones_to_empties()
+        convert_bones_to_empties(lazy)
 
 
 def get_timer_items():
@@ -160,11 +139,20 @@ def get_timer_items():
     ]
 
 
+def instrumentation_change_callback(self: "XRState", _):
+    instrumentation.set_enabled(self.instrumentation)
+
+
 class XRState(bpy.types.PropertyGroup):
     enabled: bpy.props.BoolProperty(name="OpenXR active", default=False)
     recording: bpy.props.BoolProperty(name="OpenXR recording", default=False)
     countdown: bpy.props.IntProperty(name="Countdown value")
     runtime: bpy.props.StringProperty(name="OpenXR runtime name", default="Unknown")
+    instrumentation: bpy.props.BoolProperty(
+        name="Measure stage timings",
+        default=False,
+        update=instrumentation_change_callback,
+    )
 
 
 class XRContext(bpy.types.PropertyGroup):
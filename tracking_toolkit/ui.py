@@ -1,8 +1,20 @@
 import bpy
 from bl_ui.space_view3d_toolbar import View3DPanel
 
+from .preferences import get_preferences
 from .utils import get_context, get_state
-from .operators import ToggleActiveOperator, CreateRefsOperator, ToggleRecordOperator
+from .operators import (
+    ToggleActiveOperator,
+    CreateRefsOperator,
+    ToggleRecordOperator,
+    CancelCommitOperator,
+    RecoverTakeOperator,
+    RebakeTakeOperator,
+    ExportTimingsOperator,
+    ResetTimingsOperator,
+)
+from .xr_core import instrumentation, tracking
+from .xr_core.tracking import get_buffer_usage, get_live_health
 
 
 class PANEL_UL_TrackerList(bpy.types.UIList):
@@ -30,6 +42,64 @@ class PANEL_UL_TrackerList(bpy.types.UIList):
             layout.prop(item, "hidden", icon="HIDE_OFF", icon_only=True, emboss=False)
 
 
+def draw_health(layout: bpy.types.UILayout):
+    health = get_live_health()
+    if not health:
+        layout.label(text="Waiting for samples.")
+        return
+
+    col = layout.column(align=True)
+    col.alert = health["flagged"]
+    col.label(
+        text=f"Rate: {health['achieved_rate']:.1f} / {health['expected_rate']:.1f} Hz"
+    )
+    col.label(
+        text=f"Jitter: {health['jitter_ms']:.2f} ms, longest gap: {health['max_interval_ms']:.1f} ms"
+    )
+    col.label(
+        text=f"Dropped: {health['dropped_samples']} samples, late ticks: {health['late_ticks']}"
+    )
+
+    for role_string, fraction in health["invalid"].items():
+        if fraction:
+            row = layout.row()
+            row.alert = fraction > get_preferences().health_max_invalid
+            row.label(text=f"{role_string}: {fraction:.0%} invalid")
+
+    quality = tracking.last_take_quality
+    if quality:
+        layout.label(
+            text=(
+                f"Last take: {quality['problems']}"
+                if quality["flagged"]
+                else "Last take: OK"
+            ),
+            icon="ERROR" if quality["flagged"] else "CHECKMARK",
+        )
+
+
+def draw_timings(layout: bpy.types.UILayout, xr_state):
+    layout.prop(data=xr_state, property="instrumentation", text="Measure Timings")
+
+    measured = instrumentation.sorted_stages()
+    if not measured:
+        layout.label(text="No timings yet.")
+    else:
+        grid = layout.grid_flow(columns=4, even_columns=False, align=True)
+        for text in ("Stage", "p50 ms", "p95 ms", "max ms"):
+            grid.label(text=text)
+
+        for stage, stats in measured:
+            summary = stats.summary()
+            grid.label(text=stage)
+            for key in ("p50", "p95", "max"):
+                grid.label(text=f"{summary[key] * 1e3:.3f}")
+
+    row = layout.row(align=True)
+    row.operator(ExportTimingsOperator.bl_idname, text="Export CSV", icon="EXPORT")
+    row.operator(ResetTimingsOperator.bl_idname, text="Reset", icon="TRASH")
+
+
 class RecorderPanel(View3DPanel, bpy.types.Panel):
     bl_idname = "VIEW3D_PT_openxr_recorder_menu"
     bl_label = "Tracking Toolkit Recorder"
@@ -82,6 +152,19 @@ class RecorderPanel(View3DPanel, bpy.types.Panel):
         )
         layout.operator(CreateRefsOperator.bl_idname, text="Create References")
 
+        layout.operator(
+            RebakeTakeOperator.bl_idname, text="Re-bake Raw Take", icon="FILE_REFRESH"
+        )
+
+        # Takes left behind by a crash.
+        if tracking.orphaned_journals:
+            layout.label(
+                text=f"{len(tracking.orphaned_journals)} unfinished take(s) found."
+            )
+            layout.operator(
+                RecoverTakeOperator.bl_idname, text="Recover Take", icon="RECOVER_LAST"
+            )
+
         # Show the rest if OpenXr is running
         if not xr_state.enabled:
             return
@@ -111,13 +194,49 @@ class RecorderPanel(View3DPanel, bpy.types.Panel):
             stop_record_icon if xr_state.recording else start_record_icon
         )
 
-        record_btn_row.operator(
-            ToggleRecordOperator.bl_idname,
-            text=active_record_label,
-            icon=active_record_icon,
-            depress=True,
-        )
+        # The last take is still being written.
+        if tracking.commit_job:
+            progress = tracking.commit_job.progress
+            record_btn_row.alert = False
+            record_btn_row.progress(
+                factor=progress, type="BAR", text=f"Writing take... {progress:.0%}"
+            )
+            record_btn_row.operator(
+                CancelCommitOperator.bl_idname, text="", icon="CANCEL"
+            )
+        else:
+            record_btn_row.operator(
+                ToggleRecordOperator.bl_idname,
+                text=active_record_label,
+                icon=active_record_icon,
+                depress=True,
+            )
+
+        # Background commits have no operator to report to when they finish.
+        if not xr_state.recording and not tracking.commit_job:
+            for report_type, message in tracking.last_take_report:
+                layout.label(
+                    text=message, icon="ERROR" if report_type == "WARNING" else "INFO"
+                )
 
         layout.prop(data=xr_context, property="timer", text="Delay")
         if xr_context.timer == "CUSTOM":
             layout.prop(data=xr_context, property="timer_custom", text="Seconds")
+
+        # Buffer memory usage.
+        num_samples, num_bytes = get_buffer_usage()
+        layout.label(
+            text=f"Buffer: {num_samples} samples ({num_bytes / (1024 * 1024):.1f} MB)"
+        )
+
+        # Capture health.
+        header, body = layout.panel("ttk_health", default_closed=True)
+        header.label(text="Capture Health")
+        if body:
+            draw_health(body)
+
+        # Timings.
+        header, body = layout.panel("ttk_instrumentation", default_closed=True)
+        header.label(text="Timings")
+        if body:
+            draw_timings(body, xr_state)
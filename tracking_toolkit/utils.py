@@ -1,9 +1,12 @@
 import os
 import re
+import time
+from dataclasses import dataclass
 
 import bpy
+import numpy as np
 from bpy_extras import anim_utils
-from mathutils import Vector
+from mathutils import Matrix, Vector
 
 
 def get_context() -> "XRContext":
@@ -26,32 +29,182 @@ def check_refs() -> bool:
     """
     Check if references exist for all trackers.
     """
+    # Rebuild in case references were removed without going through the addon.
+    invalidate_reference_index()
+    index = get_reference_index()
 
-    xr_context = get_context()
+    for tracker in get_context().trackers:
+        role_string = tracker.naming.role_string
+        if role_string not in index.trackers or role_string not in index.offsets:
+            return False
 
-    # Check for armature or empty root.
-    if xr_context.use_bones:
-        root = bpy.data.objects.get("XR Trackers")
+    return True
+
+
+@dataclass
+class ReferenceIndex:
+    """
+    Registry of tracker references by role string, so previews and callbacks don't have to scan the scene.
+    """
+
+    use_bones: bool
+    armature: bpy.types.Object | None
+
+    # Tracking point and offset bone or empty for each role string.
+    trackers: dict[str, "bpy.types.PoseBone | bpy.types.Object"]
+    offsets: dict[str, "bpy.types.PoseBone | bpy.types.Object"]
+
+    # For bones, the position in armature.pose.bones,
+    # and the bone's rest matrix relative to its parent's rest matrix.
+    bone_indices: dict[str, int]
+    rest_offsets: dict[str, Matrix]
+
+
+_reference_index: ReferenceIndex | None = None
+
+# Whether the tracker armature was in edit mode at the last depsgraph update.
+_armature_editing = False
+
+
+def invalidate_reference_index():
+    """
+    Forget cached references. Call this whenever references are created, renamed, converted or deleted.
+    References are found by name when the index is rebuilt, so this is cheap even in large scenes.
+    """
+    global _reference_index
+    _reference_index = None
+
+
+def check_armature_edit_mode():
+    """
+    Forget cached bone indices and rest offsets once the tracker armature leaves edit mode, since bones may have changed.
+    Called on every depsgraph update, so only the armature is looked up.
+    """
+    global _armature_editing
+
+    armature = bpy.data.objects.get("XR Trackers")
+    editing = bool(armature) and armature.mode == "EDIT"
+
+    if _armature_editing and not editing:
+        invalidate_reference_index()
+    _armature_editing = editing
+
+
+def get_reference_index() -> ReferenceIndex:
+    """
+    Get the cached reference index, rebuilding it if needed.
+    """
+    global _reference_index
+
+    use_bones = get_context().use_bones
+    if _reference_index is None or _reference_index.use_bones != use_bones:
+        _reference_index = _build_reference_index(use_bones)
+
+    return _reference_index
+
+
+def get_references(
+    role_string: str,
+) -> tuple[
+    "bpy.types.PoseBone | bpy.types.Object | None",
+    "bpy.types.PoseBone | bpy.types.Object | None",
+]:
+    """
+    Get a tracker's references from the registry.
+    :returns: Tuple of (tracking point, offset). Either is None if it doesn't exist.
+    """
+    index = get_reference_index()
+    tracker = index.trackers.get(role_string)
+    offset = index.offsets.get(role_string)
+
+    # References were removed without going through the addon.
+    try:
+        for ref in (tracker, offset):
+            if ref:
+                _ = ref.name
+    except ReferenceError:
+        invalidate_reference_index()
+        index = get_reference_index()
+        tracker = index.trackers.get(role_string)
+        offset = index.offsets.get(role_string)
+
+    return tracker, offset
+
+
+def _find_reference_empties(root: bpy.types.Object) -> list[bpy.types.Object]:
+    """
+    Get the tracker and offset empties under the root.
+    They are looked up by the names the addon gives them, which are hashed, so the rest of the scene isn't visited.
+    Object.children and children_recursive search every object in the file,
+    so the hierarchy is only searched if a reference is missing or was renamed outside the addon.
+    """
+    empties = []
+    for tracker in get_context().trackers:
+        role_string = tracker.naming.role_string
+        nickname = tracker.naming.nickname
+
+        tracker_empty = bpy.data.objects.get(nickname)
+        offset_empty = bpy.data.objects.get(f"{nickname} Offset")
+
+        if not (
+            tracker_empty
+            and tracker_empty.parent == root
+            and tracker_empty.get("role_string") == role_string
+            and offset_empty
+            and offset_empty.parent == tracker_empty
+            and offset_empty.get("role_string") == role_string
+        ):
+            return list(root.children_recursive)
+
+        empties += [tracker_empty, offset_empty]
+
+    return empties
+
+
+def _build_reference_index(use_bones: bool) -> ReferenceIndex:
+    trackers = {}
+    offsets = {}
+    bone_indices = {}
+    rest_offsets = {}
+    armature = None
+
+    if use_bones:
+        armature = bpy.data.objects.get("XR Trackers")
+        references = enumerate(armature.pose.bones) if armature else []
 
     else:
         root = bpy.data.objects.get("XR Root")
+        references = enumerate(_find_reference_empties(root)) if root else []
 
-    if not root:
-        return False
+    for i, ref in references:
+        role_string = ref.get("role_string")
+        ref_type = ref.get("ref_type")
 
-    for tracker in xr_context.trackers:
-        if xr_context.use_bones:
-            bone = root.pose.bones.get(tracker.naming.nickname)
-            if not bone:
-                return False
+        if ref_type == "offset":
+            offsets[role_string] = ref
+            continue
 
-        else:
-            empty_tracker = bpy.data.objects.get(tracker.naming.nickname)
-            empty_offset = bpy.data.objects.get(f"{tracker.naming.nickname} Offset")
-            if not empty_tracker or not empty_offset:
-                return False
+        if ref_type != "tracker":
+            continue
 
-    return True
+        trackers[role_string] = ref
+
+        if use_bones:
+            bone_indices[role_string] = i
+
+            rest = ref.bone.matrix_local
+            if ref.parent:
+                rest = ref.parent.bone.matrix_local.inverted_safe() @ rest
+            rest_offsets[role_string] = rest
+
+    return ReferenceIndex(
+        use_bones=use_bones,
+        armature=armature,
+        trackers=trackers,
+        offsets=offsets,
+        bone_indices=bone_indices,
+        rest_offsets=rest_offsets,
+    )
 
 
 class TempModeContext:
@@ -209,6 +362,8 @@ def ensure_empty(name):
 def create_bone_references():
     print("Creating bone references.")
 
+    invalidate_reference_index()
+
     xr_context = get_context()
 
     with TempModeContext("OBJECT"):
@@ -264,6 +419,8 @@ def create_bone_references():
 def create_empty_references():
     print("Creating empty references.")
 
+    invalidate_reference_index()
+
     xr_context = get_context()
 
     with TempModeContext("OBJECT"):
@@ -295,27 +452,196 @@ def create_empty_references():
             offset_empty["ref_type"] = "offset"
 
 
-def convert_bones_to_empties():
+# Keyframe properties copied between F-Curves, with their number of components and foreach_get type.
+KEYFRAME_PROPERTIES = [
+    ("co", 2, np.float32),
+    ("handle_left", 2, np.float32),
+    ("handle_right", 2, np.float32),
+    ("interpolation", 1, np.int32),
+    ("handle_left_type", 1, np.int32),
+    ("handle_right_type", 1, np.int32),
+]
+
+# Matches armature F-Curve paths, capturing the bone name and the property.
+BONE_PATH_PATTERN = re.compile(r'^pose\.bones\["(.+)"\]\.([^.]+)$')
+
+# Custom property of takes that haven't been converted yet.
+# Holds the reference type being converted to, and the action to convert each tracker's channels from.
+PENDING_PROPERTY = "ttk_pending_conversion"
+
+# Custom property of actions that pending takes are converted from.
+SOURCE_PROPERTY = "ttk_conversion_source"
+
+# Pending takes are converted in the background for at most the budget per tick.
+PENDING_TIME_BUDGET = 0.02
+PENDING_TICK_INTERVAL = 0.1
+
+# Names of takes waiting to be converted, and how many of them use each source action.
+pending_conversions: list[str] = []
+_source_users: dict[str, int] = {}
+
+
+def copy_fcurve(source: bpy.types.FCurve, fcurves, data_path: str) -> bpy.types.FCurve:
     """
-    Converts bones to empties. Animation data is copied.
+    Copy an F-Curve's keys into a new F-Curve with a different data path.
+    An existing F-Curve with the same path is replaced.
+    Keys are copied in bulk through preallocated arrays.
     """
-    print("Converting bones to empties.")
+    target = fcurves.find(data_path, index=source.array_index)
+    if target:
+        fcurves.remove(target)
 
-    xr_context = get_context()
+    target = fcurves.new(data_path=data_path, index=source.array_index)
 
-    arm = bpy.data.objects.get("XR Trackers")
-    if not arm:
-        print("Armature not found. Conversion cannot proceed.")
-        return
+    source_points = source.keyframe_points
+    target_points = target.keyframe_points
+    num_keys = len(source_points)
+    target_points.add(num_keys)
 
-    # Create empties to convert data to.
-    create_empty_references()
+    for prop, num_components, dtype in KEYFRAME_PROPERTIES:
+        values = np.empty(num_keys * num_components, dtype=dtype)
+        source_points.foreach_get(prop, values)
+        target_points.foreach_set(prop, values)
 
-    animation_data = arm.animation_data
-    if not animation_data:
-        print(f"Armature does have animation data. Conversion cannot proceed.")
-        return
+    target.update()
+    return target
+
+
+def copy_custom_properties(source: bpy.types.ID, target: bpy.types.ID):
+    """
+    Copy custom properties, such as a take's capture quality, from one data-block to another.
+    """
+    for key in source.keys():
+        if key in (PENDING_PROPERTY, SOURCE_PROPERTY):
+            continue
+
+        value = source[key]
+        target[key] = value.to_dict() if hasattr(value, "to_dict") else value
+
+
+def _new_reference_action(name: str) -> bpy.types.Action:
+    """
+    Create an empty action with the slot references use, replacing a leftover one with the same name.
+    """
+    # Ensure this action doesn't already exist,
+    # since a user might have deleted a track leaving dirty references.
+    action = bpy.data.actions.get(name)
+    if action:
+        print(f"Overwriting existing action: {name}")
+        bpy.data.actions.remove(action)
+
+    action = bpy.data.actions.new(name=name)
+    action.slots.new("OBJECT", "MOCAP")
+    return action
+
+
+def _get_fcurves(action: bpy.types.Action):
+    return anim_utils.action_ensure_channelbag_for_slot(action, action.slots[0]).fcurves
+
+
+def _group_bone_fcurves(
+    arm_action: bpy.types.Action,
+) -> dict[str, list[tuple[bpy.types.FCurve, str]]]:
+    """
+    Group an armature action's F-Curves by bone, so each tracker only gets its own channels.
+    :returns: Dictionary of bone name to (F-Curve, property name).
+    """
+    bone_fcurves = {}
+    channelbag = anim_utils.action_get_channelbag_for_slot(
+        arm_action, arm_action.slots[0]
+    )
+    for fcurve in channelbag.fcurves if channelbag else []:
+        match = BONE_PATH_PATTERN.match(fcurve.data_path)
+        if match:
+            bone_name, prop = match.groups()
+            bone_fcurves.setdefault(bone_name, []).append((fcurve, prop))
+
+    return bone_fcurves
+
+
+def _copy_bone_channels(
+    bone_fcurves: dict[str, list[tuple[bpy.types.FCurve, str]]],
+    empty_action: bpy.types.Action,
+    nickname: str,
+):
+    """
+    Copy one tracker's channels from a grouped armature action into an empty's action.
+    """
+    empty_fcurves = _get_fcurves(empty_action)
+    for arm_fcurve, prop in bone_fcurves.get(nickname, []):
+        copy_fcurve(arm_fcurve, empty_fcurves, prop)
+
+
+def _copy_empty_channels(
+    empty_action: bpy.types.Action, arm_action: bpy.types.Action, nickname: str
+):
+    """
+    Copy an empty's channels into its tracker's bone in an armature action.
+    """
+    arm_fcurves = _get_fcurves(arm_action)
+
+    empty_channelbag = anim_utils.action_get_channelbag_for_slot(
+        empty_action, empty_action.slots[0]
+    )
+    for empty_fcurve in empty_channelbag.fcurves if empty_channelbag else []:
+        copy_fcurve(
+            empty_fcurve,
+            arm_fcurves,
+            f'pose.bones["{nickname}"].{empty_fcurve.data_path}',
+        )
+
+
+def _push_down(
+    animation_data: bpy.types.AnimData, action: bpy.types.Action
+) -> bpy.types.NlaStrip:
+    """
+    Put a take on a new muted NLA track.
+    """
+    # Push onto new track.
+    track = animation_data.nla_tracks.new()
+    track.name = action.name
+    track.mute = True  # Assume all are muted.
+
+    # Create new strip.
+    strip = track.strips.new(action.name, int(action.frame_range[0]), action)
+
+    # New tracks and strips start selected, which would look like the user asking for the take.
+    track.select = False
+    strip.select = False
+
+    return strip
+
+
+def _defer_conversion(
+    action: bpy.types.Action,
+    target: str,
+    nickname: str,
+    source: bpy.types.Action,
+):
+    """
+    Mark an empty take to be filled with a tracker's channels later.
+    The source action is kept alive until every take using it is converted.
+    """
+    pending = action.get(PENDING_PROPERTY)
+    if pending is None:
+        action[PENDING_PROPERTY] = {"target": target, "sources": {}}
+        pending = action[PENDING_PROPERTY]
+
+        # Strips get their length from the action, so give the empty take the source's.
+        action.use_frame_range = True
+        action.frame_start, action.frame_end = source.frame_range
+
+    pending["sources"][nickname] = source.name
 
+    source[SOURCE_PROPERTY] = True
+    source.use_fake_user = True
+
+
+def _get_actions_to_process(animation_data: bpy.types.AnimData) -> tuple[list, bool]:
+    """
+    Get the active action followed by every strip's action.
+    :returns: Tuple of (actions, whether the first one is the active action).
+    """
     # Convert all strips on all tracks.
 
     had_active_action = False
@@ -335,67 +661,80 @@ def convert_bones_to_empties():
 
             actions_to_process.append(strip.action)
 
-    for i, arm_action in enumerate(actions_to_process):
-        for tracker in xr_context.trackers:
-            nickname = tracker.naming.nickname
+    return actions_to_process, had_active_action
 
-            bone = arm.pose.bones.get(nickname)
-            if not bone:
-                print(f"Bone {nickname} does not exist. Skipping.")
-                continue
 
-            empty = bpy.data.objects.get(nickname)
-            if not empty:
-                print(f"Empty {nickname} does not exist.. Skipping.")
-                continue
+def convert_bones_to_empties(lazy: bool = False):
+    """
+    Converts bones to empties. Animation data is copied.
+    :param lazy: Only convert the active take now. The rest are converted when used, or in the background.
+    """
+    print("Converting bones to empties.")
+
+    # Takes still waiting from the last conversion are in the wrong format to convert from.
+    convert_all_pending()
 
-            empty.animation_data_create()
+    xr_context = get_context()
 
-            # Copy action and rename channels.
+    arm = bpy.data.objects.get("XR Trackers")
+    if not arm:
+        print("Armature not found. Conversion cannot proceed.")
+        return
 
-            empty_action_name = f"{nickname}_{arm_action.name}"
+    # Create empties to convert data to.
+    create_empty_references()
 
-            # Ensure this action doesn't already exist,
-            # since a user might have deleted a track leaving dirty references.
-            empty_action = bpy.data.actions.get(empty_action_name)
-            if empty_action:
-                print(f"Overwriting existing action: {empty_action_name}")
-                bpy.data.actions.remove(empty_action)
+    animation_data = arm.animation_data
+    if not animation_data:
+        print(f"Armature does have animation data. Conversion cannot proceed.")
+        return
 
-            empty_action = arm_action.copy()
-            empty_action.name = empty_action_name
+    actions_to_process, had_active_action = _get_actions_to_process(animation_data)
 
-            fcurves = anim_utils.action_get_channelbag_for_slot(
-                empty_action, empty_action.slots[0]
-            ).fcurves
-            for fcurve in fcurves:
-                # Only get the fcurve for the current tracker's bone.
-                if not fcurve.data_path.startswith(f'pose.bones["{nickname}"].'):
-                    fcurves.remove(fcurve)
-                    continue
+    # Find each tracker's bone and empty once, instead of for every action.
+    targets = []
+    for tracker in xr_context.trackers:
+        nickname = tracker.naming.nickname
 
-                new_path = re.sub(r".+\.([^.]+)$", r"\1", fcurve.data_path)
-                fcurve.data_path = new_path
+        bone = arm.pose.bones.get(nickname)
+        if not bone:
+            print(f"Bone {nickname} does not exist. Skipping.")
+            continue
+
+        empty = bpy.data.objects.get(nickname)
+        if not empty:
+            print(f"Empty {nickname} does not exist.. Skipping.")
+            continue
+
+        empty.animation_data_create()
+        targets.append((nickname, empty))
+
+    for i, arm_action in enumerate(actions_to_process):
+        is_active = had_active_action and i == 0
+        deferred = lazy and not is_active
+        bone_fcurves = None if deferred else _group_bone_fcurves(arm_action)
+
+        for nickname, empty in targets:
+            empty_action = _new_reference_action(f"{nickname}_{arm_action.name}")
+            copy_custom_properties(arm_action, empty_action)
+
+            if deferred:
+                _defer_conversion(empty_action, "EMPTIES", nickname, arm_action)
+            else:
+                _copy_bone_channels(bone_fcurves, empty_action, nickname)
 
             # If the armature had an active (non-strip) action, set it as active.
-            if had_active_action and i == 0:
+            if is_active:
                 empty.animation_data.action = empty_action
                 empty.animation_data.action_slot = empty_action.slots[0]
 
             # Otherwise, push it down.
             else:
-                # Push onto new track.
-                empty_track = empty.animation_data.nla_tracks.new()
-                empty_track.name = empty_action.name
-                empty_track.mute = True  # Assume all are muted.
+                _push_down(empty.animation_data, empty_action)
 
-                # Create new strip.
-                empty_track.strips.new(
-                    empty_action.name, int(empty_action.frame_range[0]), empty_action
-                )
-
-        # Clean up.
-        bpy.data.actions.remove(arm_action)
+        # Clean up. Deferred takes keep their source until they are converted.
+        if not deferred:
+            bpy.data.actions.remove(arm_action)
 
     # Delete bones.
     with TempModeContext("OBJECT"):
@@ -403,13 +742,20 @@ def convert_bones_to_empties():
         if root:
             delete_recursive(root)
 
+    invalidate_reference_index()
+    refresh_pending_conversions()
+
 
-def convert_empties_to_bones():
+def convert_empties_to_bones(lazy: bool = False):
     """
     Converts empties to bones. Animation data is copied.
+    :param lazy: Only convert the active take now. The rest are converted when used, or in the background.
     """
     print("Converting empties to bones.")
 
+    # Takes still waiting from the last conversion are in the wrong format to convert from.
+    convert_all_pending()
+
     xr_context = get_context()
 
     # Create empties to convert data to.
@@ -422,6 +768,9 @@ def convert_empties_to_bones():
 
     arm.animation_data_create()
 
+    # Empty actions that were fully copied, and can be removed afterward.
+    converted_actions = []
+
     for tracker in xr_context.trackers:
         nickname = tracker.naming.nickname
 
@@ -440,26 +789,12 @@ def convert_empties_to_bones():
             print(f"Bone {nickname} does not exist. Skipping.")
             continue
 
-        # Convert all strips on all tracks.
-
-        had_active_action = False
-        actions_to_process = []
-
-        # Active action.
-        if animation_data.action:
-            had_active_action = True
-            actions_to_process.append(animation_data.action)
-
-        # NLA strips.
-        for track in animation_data.nla_tracks:
-            for strip in track.strips:
-                if not strip.action:
-                    print(f"Strip {strip.name} does have action. Skipping.")
-                    continue
-
-                actions_to_process.append(strip.action)
+        actions_to_process, had_active_action = _get_actions_to_process(animation_data)
 
         for i, empty_action in enumerate(actions_to_process):
+            is_active = had_active_action and i == 0
+            deferred = lazy and not is_active
+
             # Create a new action for the armature.
             # This action will hold data for all bones (trackers).
             # Skip if the action has already been created when processing a previous tracker.
@@ -470,65 +805,178 @@ def convert_empties_to_bones():
             if not arm_action:
                 arm_action = bpy.data.actions.new(name=arm_action_name)
                 arm_action.slots.new("OBJECT", "MOCAP")
+                copy_custom_properties(empty_action, arm_action)
+
+                if deferred:
+                    _defer_conversion(arm_action, "BONES", nickname, empty_action)
 
                 # If the empties had an active (non-strip) action, set it as active.
-                if had_active_action and i == 0:
+                if is_active:
                     arm.animation_data.action = arm_action
                     arm.animation_data.action_slot = arm_action.slots[0]
 
                 # Otherwise, push it down.
                 else:
-                    # Push onto new track.
-                    arm_track = arm.animation_data.nla_tracks.new()
-                    arm_track.name = arm_action.name
-                    arm_track.mute = True  # Assume all are muted.
-
-                    # Create new strip.
-                    strip = arm_track.strips.new(
-                        arm_action.name, int(arm_action.frame_range[0]), arm_action
-                    )
+                    strip = _push_down(arm.animation_data, arm_action)
                     strip.frame_end = (
                         empty_action.frame_range[1] - empty_action.frame_range[0]
                     )
 
-            # Get fcurves for arm and empty.
-            # Add copy of empty fcurve to arm with the reformatted name.
+            elif deferred:
+                _defer_conversion(arm_action, "BONES", nickname, empty_action)
 
-            arm_fcurves = anim_utils.action_ensure_channelbag_for_slot(
-                arm_action, arm_action.slots[0]
-            ).fcurves
+            if not deferred:
+                # Add copy of empty fcurve to arm with the reformatted name.
+                _copy_empty_channels(empty_action, arm_action, nickname)
+                converted_actions.append(empty_action)
 
-            empty_fcurves = anim_utils.action_get_channelbag_for_slot(
-                empty_action, empty_action.slots[0]
-            ).fcurves
+    # Clean up. Deferred takes keep their sources until they are converted.
+    for empty_action in converted_actions:
+        bpy.data.actions.remove(empty_action)
 
-            for empty_fcurve in empty_fcurves:
-                new_path = f'pose.bones["{nickname}"].{empty_fcurve.data_path}'
+    # Delete empties.
+    with TempModeContext("OBJECT"):
+        root = bpy.data.objects.get("XR Root")
+        if root:
+            delete_recursive(root)
 
-                # Remove existing fcurve if present.
-                arm_fcurve = arm_fcurves.find(new_path, index=empty_fcurve.array_index)
-                if arm_fcurve:
-                    arm_fcurves.remove(arm_fcurve)
+    invalidate_reference_index()
+    refresh_pending_conversions()
 
-                arm_fcurve = arm_fcurves.new(
-                    data_path=new_path, index=empty_fcurve.array_index
-                )
 
-                # Copy over data.
-                key_coords = []
-                for kp in empty_fcurve.keyframe_points:
-                    key_coords.append(kp.co[0])  # Time.
-                    key_coords.append(kp.co[1])  # Value.
+def convert_pending(action: bpy.types.Action):
+    """
+    Fill a take that was left empty by a lazy conversion, then release its sources if nothing else needs them.
+    """
+    pending = action.get(PENDING_PROPERTY)
+    if pending is None:
+        return
 
-                arm_fcurve.keyframe_points.add(len(key_coords) // 2)
-                arm_fcurve.keyframe_points.foreach_set("co", key_coords)
-                arm_fcurve.update()
+    sources = pending["sources"].to_dict()
+    for nickname, source_name in sources.items():
+        source = bpy.data.actions.get(source_name)
+        if not source:
+            print(f"Source action {source_name} of {action.name} is gone. Skipping.")
+            continue
 
-            # Clean up.
-            bpy.data.actions.remove(empty_action)
+        if pending["target"] == "EMPTIES":
+            _copy_bone_channels(_group_bone_fcurves(source), action, nickname)
+        else:
+            _copy_empty_channels(source, action, nickname)
 
-    # Delete empties.
-    with TempModeContext("OBJECT"):
-        root = bpy.data.objects.get("XR Root")
-        if root:
-            delete_recursive(root)
+    del action[PENDING_PROPERTY]
+    action.use_frame_range = False
+
+    if action.name in pending_conversions:
+        pending_conversions.remove(action.name)
+
+    for source_name in sources.values():
+        _source_users[source_name] = _source_users.get(source_name, 1) - 1
+        if _source_users[source_name] < 1:
+            del _source_users[source_name]
+            source = bpy.data.actions.get(source_name)
+            if source:
+                bpy.data.actions.remove(source)
+
+
+def convert_all_pending():
+    """
+    Convert every take left by a lazy conversion, blocking until done.
+    """
+    refresh_pending_conversions()
+    if pending_conversions:
+        print(f"Converting {len(pending_conversions)} pending takes.")
+
+    while pending_conversions:
+        action = bpy.data.actions.get(pending_conversions.pop(0))
+        if action:
+            convert_pending(action)
+
+
+def refresh_pending_conversions():
+    """
+    Find takes left by a lazy conversion, eg. after loading a file, and start converting them in the background.
+    Sources no take needs anymore are removed.
+    """
+    global pending_conversions, _source_users
+
+    pending_conversions = []
+    _source_users = {}
+    for action in bpy.data.actions:
+        pending = action.get(PENDING_PROPERTY)
+        if pending is None:
+            continue
+
+        pending_conversions.append(action.name)
+        for source_name in pending["sources"].values():
+            _source_users[source_name] = _source_users.get(source_name, 0) + 1
+
+    for action in list(bpy.data.actions):
+        if action.get(SOURCE_PROPERTY) and action.name not in _source_users:
+            bpy.data.actions.remove(action)
+
+    if pending_conversions and not bpy.app.timers.is_registered(
+        _pending_conversion_timer
+    ):
+        bpy.app.timers.register(_pending_conversion_timer)
+
+
+def _find_requested_conversions() -> list[bpy.types.Action]:
+    """
+    Find pending takes the user unmuted or selected in the NLA editor.
+    """
+    index = get_reference_index()
+    if index.use_bones:
+        owners = [index.armature] if index.armature else []
+    else:
+        owners = list(index.trackers.values())
+
+    requested = []
+    for owner in owners:
+        animation_data = owner.animation_data
+        if not animation_data:
+            continue
+
+        for track in animation_data.nla_tracks:
+            for strip in track.strips:
+                action = strip.action
+                if not action or PENDING_PROPERTY not in action:
+                    continue
+
+                if not track.mute or track.select or strip.select:
+                    requested.append(action)
+
+    return requested
+
+
+def _pending_conversion_timer():
+    try:
+        # Takes the user is looking at go first, within the same budget.
+        for action in reversed(_find_requested_conversions()):
+            if action.name in pending_conversions:
+                pending_conversions.remove(action.name)
+                pending_conversions.insert(0, action.name)
+
+        deadline = time.perf_counter() + PENDING_TIME_BUDGET
+        while pending_conversions and time.perf_counter() < deadline:
+            action = bpy.data.actions.get(pending_conversions.pop(0))
+            if action:
+                convert_pending(action)
+
+    # References were removed without going through the addon.
+    except ReferenceError:
+        invalidate_reference_index()
+
+    if not pending_conversions:
+        print("Finished converting pending takes.")
+        return None
+
+    return PENDING_TICK_INTERVAL
+
+
+def stop_pending_conversions():
+    """
+    Stop converting in the background. Pending takes are found again the next time the file is loaded.
+    """
+    if bpy.app.timers.is_registered(_pending_conversion_timer):
+        bpy.app.timers.unregister(_pending_conversion_timer)
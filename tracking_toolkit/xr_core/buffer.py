@@ -0,0 +1,222 @@
+import numpy as np
+
+# Each pose is stored as location (x, y, z) followed by a Blender-ordered quaternion (w, x, y, z).
+POSE_SIZE = 7
+
+# Each velocity is a linear velocity (x, y, z) followed by an angular velocity (x, y, z), both in world space.
+# Velocities the source didn't report are NaN.
+VELOCITY_SIZE = 6
+
+# Velocities only shape the curve between samples, so half precision is plenty.
+VELOCITY_DTYPE = np.float16
+
+
+class PoseBuffer:
+    """
+    Preallocated struct-of-arrays store for pose samples.
+    Storage grows in chunks, and the accessors return zero-copy views of the filled rows.
+    """
+
+    def __init__(self, roles: list[str], chunk_size: int = 4096):
+        self.roles = list(roles)
+        self.role_indices = {role: i for i, role in enumerate(self.roles)}
+        self.chunk_size = chunk_size
+
+        # One bit per tracker, packed into 64-bit words.
+        self.mask_words = max(1, (len(self.roles) + 63) // 64)
+
+        self._count = 0
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._poses = np.empty((0, len(self.roles), POSE_SIZE), dtype=np.float32)
+        self._valid = np.empty((0, self.mask_words), dtype=np.uint64)
+        self._velocities = np.empty(
+            (0, len(self.roles), VELOCITY_SIZE), dtype=VELOCITY_DTYPE
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+        Sample times in seconds, shape (N,).
+        """
+        return self._timestamps[: self._count]
+
+    @property
+    def poses(self) -> np.ndarray:
+        """
+        Poses with shape (N, trackers, 7).
+        """
+        return self._poses[: self._count]
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Packed validity bitmask with shape (N, words).
+        """
+        return self._valid[: self._count]
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """
+        Half precision velocities with shape (N, trackers, 6).
+        """
+        return self._velocities[: self._count]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory allocated by the store, including unused capacity.
+        """
+        return (
+            self._timestamps.nbytes
+            + self._poses.nbytes
+            + self._valid.nbytes
+            + self._velocities.nbytes
+        )
+
+    def valid_mask(self) -> np.ndarray:
+        """
+        Unpack the validity bitmask into a boolean array of shape (N, trackers).
+        """
+        return unpack_mask(self.valid, len(self.roles))
+
+    def _reserve(self, count: int):
+        capacity = len(self._timestamps)
+        if count <= capacity:
+            return
+
+        # Round up to a whole number of chunks.
+        new_capacity = -(-count // self.chunk_size) * self.chunk_size
+
+        self._timestamps = _grow(self._timestamps, new_capacity)
+        self._poses = _grow(self._poses, new_capacity)
+        self._valid = _grow(self._valid, new_capacity)
+        self._velocities = _grow(self._velocities, new_capacity)
+
+    def append(
+        self,
+        timestamp: float,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray,
+    ):
+        """
+        Append a single sample.
+        :param poses: Array of shape (trackers, 7).
+        :param valid: Boolean array of shape (trackers,).
+        :param velocities: Array of shape (trackers, 6).
+        """
+        self._reserve(self._count + 1)
+
+        row = self._count
+        self._timestamps[row] = timestamp
+        self._poses[row] = poses
+        self._valid[row] = pack_mask(valid, self.mask_words)
+        self._velocities[row] = velocities
+
+        self._count += 1
+
+    def extend(
+        self,
+        timestamps: np.ndarray,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray | None,
+    ):
+        """
+        Append many samples at once.
+        :param valid: Packed validity bitmask with shape (N, words), as returned by the valid accessor.
+        :param velocities: Velocities with shape (N, trackers, 6), or None if they are unknown.
+        """
+        start = self._count
+        count = start + len(timestamps)
+        self._reserve(count)
+
+        self._timestamps[start:count] = timestamps
+        self._poses[start:count] = poses
+        self._valid[start:count] = valid
+        self._velocities[start:count] = np.nan if velocities is None else velocities
+
+        self._count = count
+
+    def clear(self):
+        """
+        Forget all samples. Allocated storage is kept for the next take.
+        """
+        self._count = 0
+
+    def release(self):
+        """
+        Forget all samples and free the allocated storage.
+        """
+        self._count = 0
+        self._timestamps = self._timestamps[:0].copy()
+        self._poses = self._poses[:0].copy()
+        self._valid = self._valid[:0].copy()
+        self._velocities = self._velocities[:0].copy()
+
+
+class PoseMailbox:
+    """
+    Fixed-size slot holding only the most recent sample.
+    Used for previewing, so memory stays constant no matter how long OpenXR is connected.
+    """
+
+    def __init__(self, roles: list[str]):
+        self.roles = list(roles)
+        self.role_indices = {role: i for i, role in enumerate(self.roles)}
+
+        self.timestamp: float | None = None
+        self.poses = np.zeros((len(self.roles), POSE_SIZE), dtype=np.float32)
+        self.valid = np.zeros(len(self.roles), dtype=bool)
+        self.velocities = np.zeros((len(self.roles), VELOCITY_SIZE), dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.poses.nbytes + self.valid.nbytes + self.velocities.nbytes
+
+    def put(
+        self,
+        timestamp: float,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray,
+    ):
+        """
+        Replace the held sample.
+        """
+        self.timestamp = timestamp
+        self.poses[:] = poses
+        self.valid[:] = valid
+        self.velocities[:] = velocities
+
+    def clear(self):
+        self.timestamp = None
+        self.valid[:] = False
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    new_array = np.empty((capacity, *array.shape[1:]), dtype=array.dtype)
+    new_array[: len(array)] = array
+    return new_array
+
+
+def pack_mask(valid: np.ndarray, words: int) -> np.ndarray:
+    """
+    Pack a boolean tracker array, with shape (trackers,) or (N, trackers), into 64-bit words.
+    """
+    bits = np.zeros((*valid.shape[:-1], words * 64), dtype=bool)
+    bits[..., : valid.shape[-1]] = valid
+    return np.packbits(bits, axis=-1, bitorder="little").view(np.uint64)
+
+
+def unpack_mask(mask: np.ndarray, num_trackers: int) -> np.ndarray:
+    """
+    Unpack 64-bit mask words into a boolean array of shape (N, trackers).
+    """
+    bits = np.unpackbits(
+        np.ascontiguousarray(mask).view(np.uint8), axis=-1, bitorder="little"
+    )
+    return bits[..., :num_trackers].astype(bool)
@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+from typing import Callable
+
+
+class CaptureThread(threading.Thread):
+    """
+    Background thread that owns the OpenXR session loop.
+    Samples carry the runtime time they were located at, and are handed to the main thread through a queue.
+    The tick function returns (time, poses, valid, velocities), and may reuse its arrays between calls.
+    Blender timers only consume the results, so heavy scenes or redraws no longer delay sampling.
+    """
+
+    def __init__(
+        self,
+        tick: Callable,
+        min_interval: float = 0.0,
+        attach: Callable | None = None,
+        detach: Callable | None = None,
+    ):
+        """
+        :param attach: Called on the thread before the first tick, eg. to make a graphics context current.
+        :param detach: Called on the thread after the last tick.
+        """
+        super().__init__(name="Tracking Toolkit Capture", daemon=True)
+
+        self._tick = tick
+        self._attach = attach
+        self._detach = detach
+        self._min_interval = min_interval
+        self._stop_event = threading.Event()
+        self._samples = queue.SimpleQueue()
+
+        self.error: Exception | None = None
+
+    def run(self):
+        try:
+            if self._attach:
+                self._attach()
+            self._loop()
+        except Exception as e:
+            # Let the main thread decide what to do with the session.
+            self.error = e
+        finally:
+            if self._detach:
+                self._detach()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            tick_start = time.perf_counter()
+
+            sample = self._tick()
+
+            if sample:
+                sample_time, poses, valid, velocities = sample
+                self._samples.put(
+                    (sample_time, poses.copy(), valid.copy(), velocities.copy())
+                )
+
+            # xrWaitFrame paces the loop at the runtime's rate.
+            # Headless sessions don't block there, so throttle to avoid spinning.
+            remaining = self._min_interval - (time.perf_counter() - tick_start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def drain(self) -> list:
+        """
+        Get all samples captured since the last call, oldest first.
+        """
+        samples = []
+        while True:
+            try:
+                samples.append(self._samples.get_nowait())
+            except queue.Empty:
+                return samples
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Ask the loop to exit and wait for the current tick to finish.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
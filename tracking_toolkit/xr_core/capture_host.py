@@ -0,0 +1,80 @@
+"""
+Standalone capture host, which owns the OpenXR session and streams its samples to Tracking Toolkit.
+Capturing in its own process, or on another machine, keeps sampling steady while Blender is busy.
+
+Run it from the addon's directory, with pyopenxr installed:
+    python -m xr_core.capture_host --address 192.168.1.20
+
+Then set the addon's pose source to Remote, listening on the same port.
+"""
+
+import argparse
+import time
+
+from .remote import DEFAULT_PORT, PoseSender
+from .sources import OpenXRSource, PoseSource, SyntheticSource
+
+
+def run(source: PoseSource, sender: PoseSender, seconds: float | None = None):
+    """
+    Send every sample of a started source, until interrupted or the time runs out.
+    """
+    start = time.perf_counter()
+
+    while seconds is None or time.perf_counter() - start < seconds:
+        tick_start = time.perf_counter()
+
+        sample = source.tick()
+        if sample:
+            sender.send(*sample)
+
+        # Same pacing as the capture thread.
+        remaining = source.min_interval - (time.perf_counter() - tick_start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--address", default="127.0.0.1", help="Address of the Blender machine"
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--source", choices=("openxr", "synthetic"), default="openxr")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Use a headless OpenXR session, without an OpenGL context",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=90,
+        help="Samples per second of headless and synthetic sources",
+    )
+    parser.add_argument("--trackers", type=int, default=8, help="Synthetic trackers")
+    parser.add_argument("--seconds", type=float, help="Stop after this long")
+    args = parser.parse_args()
+
+    if args.source == "synthetic":
+        source = SyntheticSource(args.trackers, args.rate)
+    else:
+        source = OpenXRSource(args.rate, args.headless)
+
+    source.start()
+    sender = PoseSender(args.address, args.port, source.roles, source.name)
+    print(
+        f"Streaming {source.name} to {args.address}:{args.port}. Press Ctrl+C to stop."
+    )
+
+    try:
+        run(source, sender, args.seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+        source.stop()
+
+
+if __name__ == "__main__":
+    main()
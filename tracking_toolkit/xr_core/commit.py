@@ -0,0 +1,588 @@
+import datetime
+import threading
+import time
+from typing import Callable
+
+import bpy
+import numpy as np
+from bpy_extras import anim_utils
+
+from .buffer import PoseBuffer, unpack_mask
+from .reduce import simplify
+from .resample import KERNEL_HERMITE, KERNEL_MARGIN, resample
+from ..preferences import get_preferences
+from ..utils import get_context
+
+# Value of the "LINEAR" keyframe interpolation, for use with foreach_set.
+KEYFRAME_LINEAR = 1
+
+# Location, rotation and scale.
+TRANSFORM_CHANNELS = [("location", 3), ("rotation_quaternion", 4), ("scale", 3)]
+
+
+def get_fps() -> tuple[float, float]:
+    """
+    Get the recording and scene frame rates.
+    """
+    preferences = get_preferences()
+
+    scene_fps = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
+    record_fps = (
+        scene_fps if preferences.record_at_scene_fps else preferences.record_custom_fps
+    )
+
+    return record_fps, scene_fps
+
+
+def format_timecode(start_time: datetime.datetime, record_fps: float) -> str:
+    """
+    Format SMPTE timecode.
+    Also calculate the frame based on the current microsecond/scene time.
+    The frame is truncated down.
+    """
+    time_string = start_time.strftime("%H:%M:%S")
+    second_offset = start_time.microsecond / (1000 * 1000)
+    frame_offset_str = str(int(second_offset * record_fps))
+
+    # Pad to at least two digits.
+    if len(frame_offset_str) == 1:
+        frame_offset_str = f"0{frame_offset_str}"
+
+    return f"{time_string}:{frame_offset_str}"
+
+
+def create_action(obj: bpy.types.Object, action_name: str) -> bpy.types.Action:
+    """
+    Create a new action for an object.
+    If an action already exists, it is pushed down onto an NLA track and muted.
+    """
+
+    # Create animation data if unavailable.
+    if not obj.animation_data:
+        obj.animation_data_create()
+
+    # If an action already exists, push it to a new track and mute it.
+    action = obj.animation_data.action
+    if action:
+        track = obj.animation_data.nla_tracks.new()
+        track.name = action.name
+        track.strips.new(action.name, int(action.frame_range[0]), action)
+        track.mute = True
+
+    # Create new action.
+    action = bpy.data.actions.new(name=action_name)
+    obj.animation_data.action = action
+
+    # Create and select action slot.
+    obj.animation_data.action_slot = action.slots.new("OBJECT", "MOCAP")
+
+    return action
+
+
+def resample_frames(
+    timestamps: np.ndarray,
+    poses: np.ndarray,
+    valid_words: np.ndarray,
+    roles: list[str],
+    record_fps: float,
+    frame_scale: float,
+    first_frame: int,
+    end_frame: int,
+    velocities: np.ndarray | None = None,
+    kernel: str = KERNEL_HERMITE,
+) -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Resample a range of recorded frames.
+    Only the samples bracketing the range are read, so this stays cheap on long takes.
+
+    :param timestamps: Sample times in seconds. Frame 0 is at the first sample.
+    :param valid_words: Packed validity bitmask, as stored by PoseBuffer.
+    :param frame_scale: Scene frames per recorded frame.
+    :param velocities: Velocities, as stored by PoseBuffer, or None if they are unknown.
+    :param kernel: Resampling kernel, one of resample.KERNELS.
+    :returns: Dictionary of role string to (frames, locations, rotations).
+    """
+    frame_indices = np.arange(first_frame, end_frame)
+    frame_times = timestamps[0] + frame_indices / record_fps
+
+    # Samples needed to interpolate the range, including the neighbours cubic kernels read.
+    lo = max(int(np.searchsorted(timestamps, frame_times[0])) - 1 - KERNEL_MARGIN, 0)
+    hi = int(np.searchsorted(timestamps, frame_times[-1])) + 1 + KERNEL_MARGIN
+
+    locs, rots, frame_valid = resample(
+        timestamps[lo:hi],
+        poses[lo:hi],
+        unpack_mask(valid_words[lo:hi], len(roles)),
+        frame_times,
+        None if velocities is None else velocities[lo:hi],
+        kernel,
+    )
+
+    # Compensate for difference in scene and record fps.
+    frames = frame_indices * frame_scale
+
+    take = {}
+    for i, role_string in enumerate(roles):
+        mask = frame_valid[:, i]
+        if not mask.any():
+            continue
+
+        take[role_string] = (frames[mask], locs[mask, i], rots[mask, i])
+
+    return take
+
+
+def _new_fcurves(action: bpy.types.Action, data_path_prefix: str) -> list:
+    """
+    Create empty transform F-Curves for one reference, replacing existing ones.
+    """
+    channelbag = anim_utils.action_ensure_channelbag_for_slot(action, action.slots[0])
+
+    fcurves = []
+    for prop, num_components in TRANSFORM_CHANNELS:
+        data_path = f"{data_path_prefix}{prop}"
+
+        # Loop over every component (eg x, y, z, etc.)
+        for i in range(num_components):
+            fcurve = channelbag.fcurves.find(data_path, index=i)
+            if fcurve:
+                channelbag.fcurves.remove(fcurve)
+            fcurves.append(channelbag.fcurves.new(data_path, index=i))
+
+    return fcurves
+
+
+def _append_keys(
+    fcurve: bpy.types.FCurve, frames: np.ndarray, values: np.ndarray, linear: bool
+):
+    points = fcurve.keyframe_points
+    start = len(points)
+    num_keys = len(frames)
+
+    # Create the flattened array for foreach_set.
+    # The format is [frame1, value1, frame2, value2, ...].
+    # foreach_set can only write whole collections, so existing keys are read back in front of the new ones.
+    key_coords = np.empty((start + num_keys) * 2, dtype=np.float32)
+    if start:
+        points.foreach_get("co", key_coords[: start * 2])
+    key_coords[start * 2 :: 2] = frames  # Frame numbers on even elements.
+    key_coords[start * 2 + 1 :: 2] = values  # Data values on odd elements.
+
+    if linear:
+        interpolation = np.full(start + num_keys, KEYFRAME_LINEAR, dtype=np.int32)
+        if start:
+            points.foreach_get("interpolation", interpolation[:start])
+
+    # Set all keyframe coordinates at once.
+    points.add(num_keys)
+    points.foreach_set("co", key_coords)
+
+    if linear:
+        points.foreach_set("interpolation", interpolation)
+
+
+class TakeWriter:
+    """
+    Writes a take's keyframes into new actions.
+    The take can be written all at once, or in chunks while it is still being recorded.
+    """
+
+    def __init__(
+        self,
+        start_time: datetime.datetime,
+        record_fps: float,
+        scene_fps: float,
+        tolerance: float | None = None,
+        kernel: str = KERNEL_HERMITE,
+    ):
+        xr_context = get_context()
+
+        self.time_string = format_timecode(start_time, record_fps)
+        self.record_fps = record_fps
+        self.frame_scale = scene_fps / record_fps
+        self.tolerance = tolerance
+        self.kernel = kernel
+
+        # First recorded frame that hasn't been written yet.
+        self.next_frame = 0
+
+        self.keys_written = 0
+        self.keys_total = 0
+
+        self._use_bones = xr_context.use_bones
+
+        # Fall back to the default nicknames for trackers that aren't in the scene's list, eg. when recovering a take.
+        self._nicknames = {
+            naming.role_string: naming.nickname for naming in get_preferences().naming
+        }
+        self._nicknames.update(
+            {
+                tracker.naming.role_string: tracker.naming.nickname
+                for tracker in xr_context.trackers
+            }
+        )
+        self._armature_action = None
+        self._fcurves: dict[str, list | None] = {}
+
+        # Every action created for the take.
+        self.actions: list[bpy.types.Action] = []
+
+        # F-Curves left to write when write_frames() ran out of time, and the frame they end at.
+        self._pending_curves: list[tuple[str, int, int, np.ndarray, np.ndarray]] = []
+        self._pending_end = 0
+
+        print(f"Using SMPTE timecode: {self.time_string}")
+
+    def _ensure_fcurves(self, role_string: str) -> list | None:
+        """
+        Create the action and F-Curves for a tracker the first time it has data.
+        """
+        if role_string in self._fcurves:
+            return self._fcurves[role_string]
+
+        fcurves = None
+        nickname = self._nicknames.get(role_string)
+
+        if nickname is None:
+            pass
+
+        # When using bones, only one action is created for the entire armature.
+        elif self._use_bones:
+            if not self._armature_action:
+                arm = bpy.data.objects.get("XR Trackers")
+                if arm:
+                    self._armature_action = create_action(arm, self.time_string)
+                    self.actions.append(self._armature_action)
+                else:
+                    print("Could not find armature. Data was not applied.")
+
+            # Armature actions are handled a little differently.
+            if self._armature_action:
+                fcurves = _new_fcurves(
+                    self._armature_action, f'pose.bones["{nickname}"].'
+                )
+
+        # When using empties, create an action for each empty object.
+        # The action name will be prefixed with the tracker name to prevent conflicts.
+        else:
+            empty = bpy.data.objects.get(nickname)
+            if empty:
+                action = create_action(empty, f"{nickname}_{self.time_string}")
+                self.actions.append(action)
+                fcurves = _new_fcurves(action, "")
+            else:
+                print(f"No references found for {nickname}. Skipping.")
+
+        self._fcurves[role_string] = fcurves
+        return fcurves
+
+    def compute_keys(
+        self, take: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]
+    ) -> dict[str, tuple[int, list[tuple[np.ndarray, np.ndarray]]]]:
+        """
+        Turn resampled frames into the keys of each F-Curve.
+        This doesn't touch Blender data, so it can run on another thread.
+        :returns: Dictionary of role string to (number of frames, [(frames, values) of each F-Curve]).
+        """
+        keys = {}
+        for role_string, (frames, locs, rots) in take.items():
+            scales = np.ones((len(frames), 3))  # Tracked poses are never scaled.
+            channels = np.concatenate([locs, rots, scales], axis=1)
+
+            # Drop keys that linear interpolation can rebuild within the tolerance.
+            if self.tolerance is None:
+                keep = np.ones(channels.shape, dtype=bool)
+            else:
+                keep = simplify(frames, channels, self.tolerance)
+
+            keys[role_string] = (
+                len(frames),
+                [
+                    (frames[keep[:, i]], channels[keep[:, i], i])
+                    for i in range(channels.shape[1])
+                ],
+            )
+
+        return keys
+
+    def write_curve(
+        self,
+        role_string: str,
+        channel: int,
+        num_frames: int,
+        frames: np.ndarray,
+        values: np.ndarray,
+    ):
+        """
+        Append keys from compute_keys() to one of a tracker's F-Curves.
+        """
+        fcurves = self._ensure_fcurves(role_string)
+        if not fcurves:
+            return
+
+        _append_keys(
+            fcurves[channel], frames, values, linear=self.tolerance is not None
+        )
+
+        self.keys_written += len(frames)
+        self.keys_total += num_frames
+
+    def compute_curves(
+        self, take: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]
+    ) -> list[tuple[str, int, int, np.ndarray, np.ndarray]]:
+        """
+        Compute the keys of resampled frames, one F-Curve at a time.
+        This doesn't touch Blender data, so it can run on another thread.
+        :returns: List of write_curve() arguments, reversed so curves are written in order by popping them off the end.
+        """
+        curves = [
+            (role_string, channel, num_frames, frames, values)
+            for role_string, (num_frames, role_curves) in self.compute_keys(
+                take
+            ).items()
+            for channel, (frames, values) in enumerate(role_curves)
+        ]
+        curves.reverse()
+        return curves
+
+    def write(self, take: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]):
+        """
+        Append resampled frames to each tracker's F-Curves.
+        """
+        curves = self.compute_curves(take)
+        while curves:
+            self.write_curve(*curves.pop())
+
+    def resample(
+        self,
+        buffer: PoseBuffer,
+        end_frame: int,
+        chunk_frames: int | None = None,
+        progress: Callable[[float], bool] | None = None,
+    ) -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] | None:
+        """
+        Resample the recorded frames that haven't been written yet, up to end_frame.
+        This doesn't touch Blender data, so it can run on another thread.
+
+        :param chunk_frames: If set, frames are resampled this many at a time to limit memory use.
+        :param progress: Called with the fraction done after every chunk. Resampling stops if it returns False.
+        :returns: Dictionary of role string to (frames, locations, rotations), or None if stopped.
+        """
+        num_frames = end_frame - self.next_frame
+        chunk_frames = chunk_frames or num_frames
+
+        # Each chunk only reads the samples around it.
+        chunks: dict[str, list] = {}
+        for first_frame in range(self.next_frame, end_frame, chunk_frames):
+            take = resample_frames(
+                buffer.timestamps,
+                buffer.poses,
+                buffer.valid,
+                buffer.roles,
+                self.record_fps,
+                self.frame_scale,
+                first_frame,
+                min(first_frame + chunk_frames, end_frame),
+                buffer.velocities,
+                self.kernel,
+            )
+            for role_string, frame_data in take.items():
+                chunks.setdefault(role_string, []).append(frame_data)
+
+            done = (min(first_frame + chunk_frames, end_frame) - self.next_frame) / (
+                num_frames
+            )
+            if progress and not progress(done):
+                return None
+
+        # Keys are still written once per curve.
+        return {
+            role_string: tuple(np.concatenate(parts) for parts in zip(*role_chunks))
+            for role_string, role_chunks in chunks.items()
+        }
+
+    def write_frames(
+        self,
+        buffer: PoseBuffer,
+        end_frame: int,
+        chunk_frames: int | None = None,
+        deadline: float | None = None,
+    ) -> bool:
+        """
+        Resample and append the recorded frames that haven't been written yet, up to end_frame.
+        The buffer may be anything with PoseBuffer's accessors, such as a journal or raw take.
+        If an earlier call ran out of time, its frames are finished first, and this call stops there.
+
+        :param chunk_frames: If set, frames are resampled this many at a time to limit memory use.
+        :param deadline: time.perf_counter() after which to stop, checked after each F-Curve.
+        :returns: True if all frames up to the end frame were written.
+        """
+        if not self._pending_curves:
+            if end_frame <= self.next_frame:
+                return True
+
+            self._pending_curves = self.compute_curves(
+                self.resample(buffer, end_frame, chunk_frames)
+            )
+            self._pending_end = end_frame
+
+        while self._pending_curves:
+            self.write_curve(*self._pending_curves.pop())
+
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        if self._pending_curves:
+            return False
+
+        self.next_frame = self._pending_end
+        return True
+
+    def set_property(self, key: str, value):
+        """
+        Store a custom property on every action of the take.
+        """
+        for action in self.actions:
+            action[key] = value
+
+    def finish(self) -> tuple[int, int]:
+        """
+        Update all written F-Curves.
+        :returns: Tuple of (keys written, keys removed by keyframe reduction).
+        """
+        for fcurves in self._fcurves.values():
+            for fcurve in fcurves or []:
+                fcurve.update()
+
+        keys_removed = self.keys_total - self.keys_written
+        if self.tolerance is not None:
+            print(
+                f"Keyframe reduction removed {keys_removed} of {self.keys_total} keys"
+            )
+
+        return self.keys_written, keys_removed
+
+
+class CommitJob:
+    """
+    Writes the rest of a take without blocking the UI.
+    Resampling and keyframe reduction don't need Blender data, so they run on a worker thread.
+    The keys are then written on the main thread by step(), one F-Curve at a time, so each call can stay within a time budget.
+    """
+
+    def __init__(
+        self,
+        writer: TakeWriter,
+        buffer: PoseBuffer,
+        end_frame: int,
+        chunk_frames: int | None = None,
+        finalize: Callable[[], object] | None = None,
+    ):
+        """
+        :param finalize: Slow work on the whole take that doesn't touch Blender data, run on the worker after the keys. Its return value is stored in result.
+        """
+        self.writer = writer
+        self.end_frame = end_frame
+
+        self.error: Exception | None = None
+        self.cancelled = False
+
+        self.finalized = False
+        self.result = None
+        self._finalize = finalize
+
+        self._buffer = buffer
+        self._chunk_frames = chunk_frames
+        self._cancel_event = threading.Event()
+        self._resampled = 0.0
+
+        # (role string, channel, number of frames, frames, values) of every F-Curve left to write.
+        self._curves: list[tuple[str, int, int, np.ndarray, np.ndarray]] | None = None
+        self._num_curves = 0
+
+        self._thread = threading.Thread(
+            target=self._compute, name="Tracking Toolkit Commit", daemon=True
+        )
+
+    def _report(self, done: float) -> bool:
+        self._resampled = done
+        return not self._cancel_event.is_set()
+
+    def _compute(self):
+        try:
+            take = {}
+            if self.end_frame > self.writer.next_frame:
+                take = self.writer.resample(
+                    self._buffer, self.end_frame, self._chunk_frames, self._report
+                )
+            if take is None:
+                return
+
+            curves = self.writer.compute_curves(take)
+
+            if self._finalize:
+                self.result = self._finalize()
+                self.finalized = True
+
+        except Exception as e:
+            self.error = e
+            return
+
+        self._num_curves = len(curves)
+        self._resampled = 1.0
+        self._curves = curves
+
+    @property
+    def progress(self) -> float:
+        """
+        Fraction of the job that is done. Resampling and writing count for half each.
+        """
+        if self._curves is None:
+            return self._resampled / 2
+        if not self._num_curves:
+            return 1.0
+        return 0.5 + (1 - len(self._curves) / self._num_curves) / 2
+
+    def start(self):
+        self._thread.start()
+
+    def step(self, budget: float | None = None) -> bool:
+        """
+        Write computed keys on the main thread.
+        :param budget: Seconds to spend writing, or None to write everything.
+        :returns: True when the job is finished, failed, or was cancelled.
+        """
+        if self.error or self.cancelled:
+            return True
+
+        # Still computing.
+        if self._curves is None:
+            if budget is not None:
+                return False
+            self._thread.join()
+            if self._curves is None:
+                return True
+
+        deadline = None if budget is None else time.perf_counter() + budget
+        while self._curves:
+            self.writer.write_curve(*self._curves.pop())
+
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        if not self._curves:
+            self.writer.next_frame = self.end_frame
+            return True
+
+        return False
+
+    def cancel(self):
+        """
+        Stop the job. Keys that were already written are kept.
+        """
+        self.cancelled = True
+        self._cancel_event.set()
+
+        # Resampling stops after the current chunk. Wait, so the buffer can be reused or closed.
+        if self._thread.is_alive():
+            self._thread.join()
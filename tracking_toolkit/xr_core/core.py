@@ -1,33 +1,130 @@
 import ctypes
 import ctypes.wintypes
+import sys
 import time
+from dataclasses import dataclass
+from typing import Callable
 
-import bpy
-import gpu
-import bpy_extras
-import mathutils
+import numpy as np
 import xr
 from xr.utils.gl import ContextObject
 from xr.utils.gl.glfw_util import GLFWOffscreenContextProvider
 
-from .actions import default_action_data, vive_tracker_action_data
+from . import instrumentation
+from .actions import all_role_strings, default_action_data, vive_tracker_action_data
+from .buffer import POSE_SIZE, VELOCITY_SIZE
 
+# Maps an OpenXR pose (qx, qy, qz, qw, px, py, pz) to a Blender pose (px, py, pz, qw, qx, qy, qz).
+# This is the same as left-multiplying by axis_conversion("-Z", "Y", "Y", "Z"), a 90 degree turn around X.
+# Locations are a signed permutation, and rotations are premultiplied by that turn's quaternion.
+_HALF_SQRT2 = np.sqrt(0.5)
+POSE_CONVERSION = np.zeros((POSE_SIZE, POSE_SIZE), dtype=np.float32)
+POSE_CONVERSION[4, 0] = 1  # x = x
+POSE_CONVERSION[6, 1] = -1  # y = -z
+POSE_CONVERSION[5, 2] = 1  # z = y
+POSE_CONVERSION[[3, 0], 3] = _HALF_SQRT2, -_HALF_SQRT2  # qw
+POSE_CONVERSION[[0, 3], 4] = _HALF_SQRT2, _HALF_SQRT2  # qx
+POSE_CONVERSION[[1, 2], 5] = _HALF_SQRT2, -_HALF_SQRT2  # qy
+POSE_CONVERSION[[2, 1], 6] = _HALF_SQRT2, _HALF_SQRT2  # qz
 
-def _pose_to_mat(pose):
-    loc = mathutils.Vector(pose.position.as_numpy())
-    rot = mathutils.Quaternion(
-        (pose.orientation.w, pose.orientation.x, pose.orientation.y, pose.orientation.z)
+# Maps an OpenXR linear or angular velocity to Blender space, with the same turn as the poses.
+VELOCITY_CONVERSION = POSE_CONVERSION[4:, :3].copy()
+
+
+def location_dtype(structure: type) -> np.dtype:
+    """
+    Get a NumPy dtype viewing the flags and pose of an array of SpaceLocation or SpaceLocationData structs.
+    """
+    pose_offset = structure.pose.offset + xr.Posef.orientation.offset
+    return np.dtype(
+        {
+            "names": ["flags", "pose"],
+            "formats": [np.uint64, (np.float32, POSE_SIZE)],
+            "offsets": [structure.location_flags.offset, pose_offset],
+            "itemsize": ctypes.sizeof(structure),
+        }
+    )
+
+
+def velocity_dtype(structure: type) -> np.dtype:
+    """
+    Get a NumPy dtype viewing the flags and velocities of an array of SpaceVelocity or SpaceVelocityData structs.
+    """
+    return np.dtype(
+        {
+            "names": ["flags", "linear", "angular"],
+            "formats": [np.uint64, (np.float32, 3), (np.float32, 3)],
+            "offsets": [
+                structure.velocity_flags.offset,
+                structure.linear_velocity.offset,
+                structure.angular_velocity.offset,
+            ],
+            "itemsize": ctypes.sizeof(structure),
+        }
     )
-    mat = mathutils.Matrix.LocRotScale(loc, rot, (1, 1, 1))
-    # Convert OpenXR to Blender spaces.
-    mat_world = bpy_extras.io_utils.axis_conversion("-Z", "Y", "Y", "Z").to_4x4()
-    return mat_world @ mat
 
 
 use_compatibility_mode = False
 context: ContextObject | None = None
 spaces = {}
 
+# Pair of (wall clock seconds, XrTime nanoseconds) taken on the first located frame.
+time_anchor: tuple[float, int] | None = None
+runtime_name = "Unknown"
+
+
+@dataclass
+class TickContext:
+    """
+    Everything tick_xr() needs, built once in start_xr() so the hot path doesn't allocate.
+    The ctypes structures are kept here so they stay alive between ticks.
+    """
+
+    # Output column of each located space, in the order of all_role_strings.
+    columns: np.ndarray
+
+    # Reused runtime call arguments.
+    sync_info: xr.ActionsSyncInfo
+    active_action_sets: ctypes.Array
+    frame_end_info: xr.FrameEndInfo
+
+    # All action spaces, with a VIEW space for the head last.
+    space_array: ctypes.Array
+
+    # Batched location with xrLocateSpacesKHR, if the runtime supports it.
+    locate_spaces_fn: Callable | None
+    locate_info: xr.SpacesLocateInfo | None
+    locations: xr.SpaceLocations | None
+
+    # One location struct per space, and pointers to each for xrLocateSpace.
+    location_array: ctypes.Array
+    location_pointers: list
+
+    # One velocity struct per space, chained to the locations.
+    velocity_array: ctypes.Array
+    velocities_chain: xr.SpaceVelocities | None
+
+    # NumPy views of location_array and velocity_array.
+    raw_flags: np.ndarray
+    raw_poses: np.ndarray
+    raw_velocity_flags: np.ndarray
+    raw_linear: np.ndarray
+    raw_angular: np.ndarray
+
+    # Converted poses and velocities, and the output arrays returned by tick_xr().
+    converted: np.ndarray
+    converted_velocities: np.ndarray
+    poses: np.ndarray
+    valid: np.ndarray
+    velocities: np.ndarray
+
+    # Headless timing.
+    convert_time_fn: Callable | None
+    xr_time: xr.Time
+
+
+tick_context: TickContext | None = None
+
 
 def _headless_enter(self):
     self.instance = xr.create_instance(
@@ -60,11 +157,16 @@ def _headless_enter(self):
     return self
 
 
-def start_xr():
+def start_xr(headless: bool = False):
+    """
+    Start the OpenXR session.
+    :param headless: Use a headless session, for hosts whose own OpenGL would conflict with the runtime's.
+    """
     print("Starting XR Tracking")
 
-    global use_compatibility_mode
-    use_compatibility_mode = gpu.platform.backend_type_get() == "OPENGL"
+    global use_compatibility_mode, time_anchor
+    time_anchor = None
+    use_compatibility_mode = headless
 
     available_extensions = xr.enumerate_instance_extension_properties()
 
@@ -84,7 +186,7 @@ def start_xr():
         required_extensions.extend(
             [
                 xr.MND_HEADLESS_EXTENSION_NAME,
-                xr.KHR_WIN32_CONVERT_PERFORMANCE_COUNTER_TIME_EXTENSION_NAME,
+                CONVERT_TIME_EXTENSION_NAME,
             ]
         )
 
@@ -105,6 +207,13 @@ def start_xr():
         print("Using Vive trackers")
         enabled_extensions.append(xr.HTCX_VIVE_TRACKER_INTERACTION_EXTENSION_NAME)
 
+    # Locate all spaces at once when possible.
+    # This is the same function OpenXR 1.1 promoted to core, but works with 1.0 instances.
+    use_locate_spaces = xr.KHR_LOCATE_SPACES_EXTENSION_NAME in available_extensions
+    if use_locate_spaces:
+        print("Using batched space location")
+        enabled_extensions.append(xr.KHR_LOCATE_SPACES_EXTENSION_NAME)
+
     # Instantiate the headless context.
 
     global context
@@ -131,9 +240,9 @@ def start_xr():
     context.__enter__()
 
     # Save the runtime's name.
+    global runtime_name
     properties = xr.get_instance_properties(context.instance)
     runtime_name = properties.runtime_name.decode()
-    bpy.context.window_manager.XRState.runtime = runtime_name
     print(f"Using {runtime_name} as OpenXR runtime.")
 
     # Setup actions
@@ -222,31 +331,227 @@ def start_xr():
         ),
     )
 
+    global tick_context
+    tick_context = _prepare_tick_context(use_locate_spaces)
+
+
+def _get_locate_spaces_fn() -> Callable | None:
+    try:
+        return ctypes.cast(
+            xr.get_instance_proc_addr(
+                instance=context.instance,
+                name="xrLocateSpacesKHR",
+            ),
+            xr.PFN_xrLocateSpacesKHR,
+        )
+    except xr.XrException as e:
+        print(f"Batched space location unavailable ({e}). Locating spaces one by one.")
+        return None
+
 
-pc_time = ctypes.wintypes.LARGE_INTEGER()
-kernel32 = ctypes.WinDLL("kernel32")
+def _get_convert_time_fn() -> Callable:
+    return ctypes.cast(
+        xr.get_instance_proc_addr(
+            instance=context.instance,
+            name=CONVERT_TIME_FUNCTION_NAME,
+        ),
+        getattr(xr, f"PFN_{CONVERT_TIME_FUNCTION_NAME}"),
+    )
 
 
-def _get_time() -> xr.Time:
+def _prepare_tick_context(use_locate_spaces: bool) -> TickContext:
     """
-    Calculate timestamp from Windows performance counter, since we don't have info from a graphics API.
+    Build the reusable tick state for all action spaces, plus a VIEW space for the head.
     """
-    kernel32.QueryPerformanceCounter(ctypes.byref(pc_time))
+    locate_spaces_fn = _get_locate_spaces_fn() if use_locate_spaces else None
 
-    # Get native function.
-    pxrConvertWin32PerformanceCounterToTimeKHR = ctypes.cast(
-        xr.get_instance_proc_addr(
-            instance=context.instance,
-            name="xrConvertWin32PerformanceCounterToTimeKHR",
+    view_space = xr.create_reference_space(
+        session=context.session,
+        create_info=xr.ReferenceSpaceCreateInfo(
+            reference_space_type=xr.ReferenceSpaceType.VIEW,
         ),
-        xr.PFN_xrConvertWin32PerformanceCounterToTimeKHR,
     )
 
+    names = [*spaces.keys(), "head"]
+    space_array = (xr.Space * len(names))(*spaces.values(), view_space)
+
+    # Batched location fills plain location data.
+    # Single location needs full structs, since the runtime checks their type.
+    # Velocities are chained to the locations, so they are located in the same call.
+    if locate_spaces_fn:
+        location_array = (xr.SpaceLocationData * len(names))()
+        velocity_array = (xr.SpaceVelocityData * len(names))()
+        velocities_chain = xr.SpaceVelocities(
+            velocity_count=len(names),
+            velocities=ctypes.cast(
+                velocity_array, ctypes.POINTER(xr.SpaceVelocityData)
+            ),
+        )
+        locate_info = xr.SpacesLocateInfo(
+            base_space=context.space,
+            spaces=space_array,
+        )
+        locations = xr.SpaceLocations(
+            locations=location_array,
+            next=velocities_chain,
+        )
+    else:
+        location_array = (xr.SpaceLocation * len(names))(
+            *[xr.SpaceLocation() for _ in names]
+        )
+        velocity_array = (xr.SpaceVelocity * len(names))(
+            *[xr.SpaceVelocity() for _ in names]
+        )
+        velocities_chain = None
+        for location, velocity in zip(location_array, velocity_array):
+            location.next = velocity
+        locate_info = None
+        locations = None
+
+    raw = np.frombuffer(location_array, dtype=location_dtype(type(location_array[0])))
+    raw_velocities = np.frombuffer(
+        velocity_array, dtype=velocity_dtype(type(velocity_array[0]))
+    )
+
+    active_action_sets = (xr.ActiveActionSet * 1)(
+        xr.ActiveActionSet(
+            action_set=context.default_action_set,
+            subaction_path=ctypes.c_uint64(xr.NULL_PATH),
+        )
+    )
+
+    if use_compatibility_mode:
+        frame_end_info = xr.FrameEndInfo()
+    else:
+        frame_end_info = xr.FrameEndInfo(
+            environment_blend_mode=context.environment_blend_mode,
+        )
+
+    return TickContext(
+        columns=np.array([all_role_strings.index(name) for name in names]),
+        sync_info=xr.ActionsSyncInfo(active_action_sets=active_action_sets),
+        active_action_sets=active_action_sets,
+        frame_end_info=frame_end_info,
+        space_array=space_array,
+        locate_spaces_fn=locate_spaces_fn,
+        locate_info=locate_info,
+        locations=locations,
+        location_array=location_array,
+        location_pointers=[ctypes.pointer(location) for location in location_array],
+        velocity_array=velocity_array,
+        velocities_chain=velocities_chain,
+        raw_flags=raw["flags"],
+        raw_poses=raw["pose"],
+        raw_velocity_flags=raw_velocities["flags"],
+        raw_linear=raw_velocities["linear"],
+        raw_angular=raw_velocities["angular"],
+        converted=np.zeros((len(names), POSE_SIZE), dtype=np.float32),
+        converted_velocities=np.zeros((len(names), VELOCITY_SIZE), dtype=np.float32),
+        poses=np.zeros((len(all_role_strings), POSE_SIZE), dtype=np.float32),
+        valid=np.zeros(len(all_role_strings), dtype=bool),
+        velocities=np.zeros((len(all_role_strings), VELOCITY_SIZE), dtype=np.float32),
+        convert_time_fn=_get_convert_time_fn() if use_compatibility_mode else None,
+        xr_time=xr.Time(),
+    )
+
+
+def _locate_spaces(xr_time: int):
+    """
+    Locate all spaces, including the head, into the tick context's location array.
+    """
+    if tick_context.locate_spaces_fn:
+        # One runtime call for every space.
+        tick_context.locate_info.time = xr_time
+        result = xr.check_result(
+            tick_context.locate_spaces_fn(
+                context.session,
+                ctypes.byref(tick_context.locate_info),
+                ctypes.byref(tick_context.locations),
+            )
+        )
+        if result.is_exception():
+            raise result
+
+        return
+
+    # Runtimes without XR_KHR_locate_spaces get one call per space.
+    for space, location in zip(
+        tick_context.space_array, tick_context.location_pointers
+    ):
+        result = xr.check_result(
+            xr.raw_functions.xrLocateSpace(space, context.space, xr_time, location)
+        )
+        if result.is_exception():
+            raise result
+
+
+def _convert_poses():
+    """
+    Convert located OpenXR poses and velocities into the Blender space output arrays.
+    Velocities the runtime didn't report are NaN, so resampling can fall back to interpolating the poses.
+    """
+    np.matmul(tick_context.raw_poses, POSE_CONVERSION, out=tick_context.converted)
+
+    converted_velocities = tick_context.converted_velocities
+    np.matmul(
+        tick_context.raw_linear, VELOCITY_CONVERSION, out=converted_velocities[:, :3]
+    )
+    np.matmul(
+        tick_context.raw_angular, VELOCITY_CONVERSION, out=converted_velocities[:, 3:]
+    )
+
+    velocity_flags = tick_context.raw_velocity_flags
+    converted_velocities[
+        (velocity_flags & xr.SPACE_VELOCITY_LINEAR_VALID_BIT) == 0, :3
+    ] = np.nan
+    converted_velocities[
+        (velocity_flags & xr.SPACE_VELOCITY_ANGULAR_VALID_BIT) == 0, 3:
+    ] = np.nan
+
+    columns = tick_context.columns
+    tick_context.poses[columns] = tick_context.converted
+    tick_context.velocities[columns] = converted_velocities
+    tick_context.valid[columns] = (
+        tick_context.raw_flags & xr.SPACE_LOCATION_POSITION_VALID_BIT
+    ) != 0
+
+
+# Headless sessions read the OS clock, and convert it with the platform's extension.
+if sys.platform == "win32":
+    CONVERT_TIME_EXTENSION_NAME = (
+        xr.KHR_WIN32_CONVERT_PERFORMANCE_COUNTER_TIME_EXTENSION_NAME
+    )
+    CONVERT_TIME_FUNCTION_NAME = "xrConvertWin32PerformanceCounterToTimeKHR"
+
+    os_time = ctypes.wintypes.LARGE_INTEGER()
+    kernel32 = ctypes.WinDLL("kernel32")
+
+    def _read_os_time():
+        kernel32.QueryPerformanceCounter(ctypes.byref(os_time))
+
+else:
+    CONVERT_TIME_EXTENSION_NAME = xr.KHR_CONVERT_TIMESPEC_TIME_EXTENSION_NAME
+    CONVERT_TIME_FUNCTION_NAME = "xrConvertTimespecTimeToTimeKHR"
+
+    os_time = xr.timespec()
+
+    def _read_os_time():
+        os_time.tv_sec, os_time.tv_nsec = divmod(
+            time.clock_gettime_ns(time.CLOCK_MONOTONIC), 1_000_000_000
+        )
+
+
+def _get_time() -> xr.Time:
+    """
+    Calculate timestamp from the OS clock, since we don't have info from a graphics API.
+    """
+    _read_os_time()
+
     # Query time.
-    xr_time = xr.Time()
-    result = pxrConvertWin32PerformanceCounterToTimeKHR(
+    xr_time = tick_context.xr_time
+    result = tick_context.convert_time_fn(
         context.instance,
-        ctypes.pointer(pc_time),
+        ctypes.byref(os_time),
         ctypes.byref(xr_time),
     )
     result = xr.check_result(result)
@@ -278,13 +583,30 @@ def _poll_xr():
     return None
 
 
-def tick_xr():
-    active_action_set = xr.ActiveActionSet(
-        action_set=context.default_action_set,
-        subaction_path=ctypes.c_uint64(xr.NULL_PATH),
-    )
+def xr_time_to_wall(xr_time: int) -> float:
+    """
+    Convert an XrTime in nanoseconds to wall clock seconds, using the anchor from the first located frame.
+    """
+    if not time_anchor:
+        return time.time()
+
+    wall_anchor, xr_anchor = time_anchor
+    return wall_anchor + (xr_time - xr_anchor) / 1e9
+
 
+def tick_xr() -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+    """
+    Poll and locate all tracked devices.
+    The returned arrays are reused, so they are only valid until the next tick.
+    :returns: Tuple of (XrTime in nanoseconds, poses, valid, velocities) or None if nothing was located.
+    Poses have shape (len(all_role_strings), 7) and valid is a boolean array of the same length.
+    Velocities have shape (len(all_role_strings), 6).
+    """
+    global time_anchor
+
+    stage_start = instrumentation.start()
     frame_state = _poll_xr()
+    instrumentation.record("wait_frame", stage_start)
 
     # Skip if state is invalid/not ready.
     if not frame_state:
@@ -292,72 +614,57 @@ def tick_xr():
 
     xr.begin_frame(context.session)
 
+    frame_end_info = tick_context.frame_end_info
+
     # Headless 'frame'.
     if use_compatibility_mode:
-        xr_time = _get_time()
+        sample_time = _get_time().value
 
-        xr.end_frame(
-            context.session,
-            frame_end_info=xr.FrameEndInfo(
-                display_time=xr_time,
-            ),
-        )
+        frame_end_info.display_time = sample_time
+        xr.end_frame(context.session, frame_end_info=frame_end_info)
 
     # OpenGL frame.
     else:
-        xr_time = frame_state.predicted_display_time
+        sample_time = frame_state.predicted_display_time
 
-        context.render_layers = []
         context.graphics.make_current()
-        xr.end_frame(
-            context.session,
-            frame_end_info=xr.FrameEndInfo(
-                display_time=xr_time,
-                environment_blend_mode=context.environment_blend_mode,
-                layers=context.render_layers,
-            ),
-        )
+        frame_end_info.display_time = sample_time
+        xr.end_frame(context.session, frame_end_info=frame_end_info)
 
     if context.session_state == xr.SessionState.FOCUSED:
+        stage_start = instrumentation.start()
         try:
             xr.sync_actions(
                 session=context.session,
-                sync_info=xr.ActionsSyncInfo(
-                    count_active_action_sets=1,
-                    active_action_sets=[active_action_set],
-                ),
+                sync_info=tick_context.sync_info,
             )
         except Exception as e:
             print(f"XR exception occurred: {e}. Skipping frame.")
             return None
 
-        poses = {}
-        for space_name in spaces.keys():
-            space = spaces[space_name]
-            space_location = xr.locate_space(
-                space=space,
-                base_space=context.space,
-                time=xr_time,
-            )
+        instrumentation.record("sync_actions", stage_start)
 
-            if space_location.location_flags & xr.SPACE_LOCATION_POSITION_VALID_BIT:
-                poses[space_name] = _pose_to_mat(space_location.pose)
+        stage_start = instrumentation.start()
+        _locate_spaces(sample_time)
+        instrumentation.record("locate_spaces", stage_start)
 
-        # Get HMD pose
-        view_state, views = xr.locate_views(
-            session=context.session,
-            view_locate_info=xr.ViewLocateInfo(
-                view_configuration_type=context.view_configuration_type,
-                display_time=xr_time,
-                space=context.space,
-            ),
-        )
-        poses["head"] = _pose_to_mat(views[xr.utils.Eye.LEFT.value].pose)
+        stage_start = instrumentation.start()
+        _convert_poses()
+        instrumentation.record("convert_poses", stage_start)
 
-        if len(poses) == 0:
+        if not tick_context.valid.any():
             return None
 
-        return poses
+        # Runtime clocks have an arbitrary epoch, so remember where it lines up with the wall clock.
+        if not time_anchor:
+            time_anchor = (time.time(), sample_time)
+
+        return (
+            sample_time,
+            tick_context.poses,
+            tick_context.valid,
+            tick_context.velocities,
+        )
 
     # Delay to avoid overloading system.
     time.sleep(0.001)
@@ -365,8 +672,27 @@ def tick_xr():
     return None
 
 
+def attach_graphics():
+    """
+    Make the OpenGL context current on the calling thread.
+    """
+    if context and not use_compatibility_mode:
+        context.graphics.make_current()
+
+
+def detach_graphics():
+    """
+    Release the OpenGL context from the calling thread, so another thread can make it current.
+    A context can only be current on one thread at a time.
+    """
+    if context and not use_compatibility_mode:
+        context.graphics.done_current()
+
+
 def stop_xr():
-    global context
+    global context, tick_context
+
+    tick_context = None
 
     if not context:
         return
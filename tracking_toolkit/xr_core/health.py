@@ -0,0 +1,183 @@
+import time
+
+import numpy as np
+
+from .buffer import unpack_mask
+
+# An interval this many times longer than expected is a gap. The samples that should have been in it were dropped.
+GAP_FACTOR = 1.5
+
+# Number of recent samples the live monitor looks at.
+WINDOW_SIZE = 1024
+
+# Validity masks of stored takes are unpacked this many samples at a time.
+COUNT_CHUNK_SIZE = 65536
+
+# Name of the custom property takes' actions get their quality summary in.
+QUALITY_PROPERTY = "capture_quality"
+
+
+def _count_valid(valid_words: np.ndarray, num_trackers: int) -> np.ndarray:
+    """
+    Count the samples each tracker was located in, without unpacking the whole take at once.
+    """
+    counts = np.zeros(num_trackers, dtype=np.int64)
+    for start in range(0, len(valid_words), COUNT_CHUNK_SIZE):
+        chunk = unpack_mask(valid_words[start : start + COUNT_CHUNK_SIZE], num_trackers)
+        counts += np.count_nonzero(chunk, axis=0)
+    return counts
+
+
+def summarize(
+    timestamps: np.ndarray,
+    valid_counts: np.ndarray,
+    roles: list[str],
+    expected_rate: float | None,
+    min_rate: float,
+    max_invalid: float,
+) -> dict:
+    """
+    Summarize the health of some samples.
+
+    :param timestamps: Sample times in seconds.
+    :param valid_counts: Number of samples each tracker was located in.
+    :param expected_rate: Samples per second the capture asked for.
+        If None, the typical interval between samples is used.
+    :param min_rate: Lowest fraction of the expected rate that isn't flagged.
+    :param max_invalid: Highest fraction of invalid samples a tracker can have without being flagged.
+    :returns: Dictionary of simple values, so it can be stored as a custom property.
+    """
+    num_samples = len(timestamps)
+    intervals = np.diff(timestamps)
+    duration = float(timestamps[-1] - timestamps[0]) if num_samples else 0.0
+
+    achieved_rate = (num_samples - 1) / duration if duration else 0.0
+    if not expected_rate:
+        median_interval = float(np.median(intervals)) if len(intervals) else 0.0
+        expected_rate = 1 / median_interval if median_interval else achieved_rate
+
+    if len(intervals) and expected_rate:
+        expected_interval = 1 / expected_rate
+        late = intervals > GAP_FACTOR * expected_interval
+        gaps = int(np.count_nonzero(late))
+        dropped = int(np.round(intervals[late] / expected_interval).sum()) - gaps
+        jitter = float(intervals.std())
+        max_interval = float(intervals.max())
+    else:
+        gaps = dropped = 0
+        jitter = max_interval = 0.0
+
+    # Trackers that were never located aren't part of the take.
+    invalid = {
+        role: 1 - int(count) / num_samples
+        for role, count in zip(roles, valid_counts)
+        if count
+    }
+
+    problems = []
+    if expected_rate and achieved_rate < min_rate * expected_rate:
+        problems.append(f"rate {achieved_rate:.1f}/{expected_rate:.1f} Hz")
+    for role, fraction in invalid.items():
+        if fraction > max_invalid:
+            problems.append(f"{role} invalid {fraction:.0%}")
+
+    return {
+        "samples": num_samples,
+        "duration": duration,
+        "expected_rate": float(expected_rate),
+        "achieved_rate": achieved_rate,
+        "jitter_ms": jitter * 1e3,
+        "max_interval_ms": max_interval * 1e3,
+        "gaps": gaps,
+        "dropped_samples": dropped,
+        "invalid": invalid,
+        "flagged": bool(problems),
+        "problems": ", ".join(problems),
+    }
+
+
+def summarize_take(
+    source, expected_rate: float | None, min_rate: float, max_invalid: float
+) -> dict:
+    """
+    Summarize a whole take.
+    :param source: Anything with PoseBuffer's accessors, such as a journal or raw take.
+    """
+    return summarize(
+        source.timestamps,
+        _count_valid(source.valid, len(source.roles)),
+        source.roles,
+        expected_rate,
+        min_rate,
+        max_invalid,
+    )
+
+
+class HealthMonitor:
+    """
+    Live capture health over the most recent samples.
+    Also counts how often the tick timer fired late, since Blender gives no feedback about it.
+    """
+
+    def __init__(self, roles: list[str], window: int = WINDOW_SIZE):
+        self.roles = list(roles)
+
+        self._timestamps = np.zeros(window)
+        self._valid = np.zeros((window, len(self.roles)), dtype=bool)
+        self._next = 0
+        self.count = 0
+
+        self.late_ticks = 0
+        self._last_tick: float | None = None
+
+    def add(self, timestamp: float, valid: np.ndarray):
+        self._timestamps[self._next] = timestamp
+        self._valid[self._next] = valid
+        self._next = (self._next + 1) % len(self._timestamps)
+        self.count += 1
+
+    def tick(self, interval: float):
+        """
+        Note that the tick timer fired, having asked to be called after the interval.
+        """
+        now = time.perf_counter()
+        if self._last_tick is not None and now - self._last_tick > (
+            GAP_FACTOR * interval
+        ):
+            self.late_ticks += 1
+        self._last_tick = now
+
+    def reset(self):
+        self._next = 0
+        self.count = 0
+        self.late_ticks = 0
+        self._last_tick = None
+
+    def summary(
+        self, expected_rate: float | None, min_rate: float, max_invalid: float
+    ) -> dict | None:
+        """
+        Summarize the samples in the window, like summarize().
+        :returns: The summary, or None if there aren't enough samples yet.
+        """
+        if self.count < 2:
+            return None
+
+        window = len(self._timestamps)
+        if self.count < window:
+            timestamps = self._timestamps[: self.count]
+            valid = self._valid[: self.count]
+        else:
+            timestamps = np.roll(self._timestamps, -self._next)
+            valid = self._valid
+
+        summary = summarize(
+            timestamps,
+            np.count_nonzero(valid, axis=0),
+            self.roles,
+            expected_rate,
+            min_rate,
+            max_invalid,
+        )
+        summary["late_ticks"] = self.late_ticks
+        return summary
@@ -0,0 +1,199 @@
+import csv
+import threading
+import time
+
+import numpy as np
+
+# Number of recent measurements kept per stage.
+WINDOW_SIZE = 1024
+
+# Log-spaced histogram bins from 1 microsecond to 1 second.
+BIN_EDGES = np.logspace(-6, 0, 25)
+
+# Stages are shown in this order. Others are listed after them.
+STAGE_ORDER = [
+    "wait_frame",
+    "sync_actions",
+    "locate_spaces",
+    "convert_poses",
+    "publish",
+    "tick_timer",
+    "update_tracker_list",
+    "stream_commit",
+    "apply_poses",
+    "depsgraph",
+    "latency",
+    "prediction",
+]
+
+enabled = False
+
+
+class RollingStats:
+    """
+    Ring buffer of the most recent measurements of one stage, in seconds.
+    """
+
+    def __init__(self, size: int = WINDOW_SIZE):
+        self._values = np.zeros(size)
+        self._next = 0
+        self.count = 0  # Total measurements, including ones that rolled out.
+
+    def add(self, value: float):
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self.count += 1
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Measurements still in the window, oldest first.
+        """
+        if self.count < len(self._values):
+            return self._values[: self.count]
+        return np.roll(self._values, -self._next)
+
+    def summary(self) -> dict[str, float]:
+        values = self.values
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "count": self.count,
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+        }
+
+    def histogram(self) -> np.ndarray:
+        """
+        Counts of the window's measurements in each of BIN_EDGES' bins.
+        Measurements outside the range are put in the first or last bin.
+        """
+        values = np.clip(self.values, BIN_EDGES[0], BIN_EDGES[-1])
+        counts, _ = np.histogram(values, BIN_EDGES)
+        return counts
+
+
+# Stages are timed on the capture thread while the UI draws them, so the known ones always exist.
+# Others are added under the lock, which is also held while the UI takes its snapshot.
+stages: dict[str, RollingStats] = {stage: RollingStats() for stage in STAGE_ORDER}
+_stages_lock = threading.Lock()
+
+# When the latest poses were written to the references, for measuring depsgraph evaluation.
+_applied_at = 0
+
+
+def set_enabled(value: bool):
+    global enabled, _applied_at
+
+    enabled = value
+    _applied_at = 0
+
+
+def start() -> int:
+    """
+    Start timing a stage.
+    :returns: A start time to pass to record(), or 0 if instrumentation is disabled.
+    """
+    return time.perf_counter_ns() if enabled else 0
+
+
+def record(stage: str, start_ns: int):
+    """
+    Finish timing a stage started with start().
+    """
+    if not start_ns:
+        return
+
+    add(stage, (time.perf_counter_ns() - start_ns) / 1e9)
+
+
+def add(stage: str, seconds: float):
+    """
+    Add a measurement directly, eg. a latency.
+    """
+    stats = stages.get(stage)
+    if not stats:
+        with _stages_lock:
+            stats = stages.setdefault(stage, RollingStats())
+    stats.add(seconds)
+
+
+def mark_applied():
+    """
+    Note that poses were just written to the references.
+    """
+    global _applied_at
+    if enabled:
+        _applied_at = time.perf_counter_ns()
+
+
+def record_evaluated():
+    """
+    Called after the depsgraph is evaluated, to time how long it took for written poses to be evaluated.
+    """
+    global _applied_at
+    if _applied_at:
+        record("depsgraph", _applied_at)
+        _applied_at = 0
+
+
+def reset():
+    with _stages_lock:
+        for stats in stages.values():
+            stats.clear()
+
+
+def sorted_stages() -> list[tuple[str, RollingStats]]:
+    """
+    Get a snapshot of the stages that have measurements, in display order.
+    """
+    with _stages_lock:
+        measured = [(stage, stats) for stage, stats in stages.items() if stats.count]
+
+    order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+    return sorted(measured, key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+
+def export_csv(path: str):
+    """
+    Write every stage's summary and histogram to a CSV file. Times are in milliseconds.
+    """
+    bin_labels = [
+        f"bin_{low * 1e3:.4g}-{high * 1e3:.4g}_ms"
+        for low, high in zip(BIN_EDGES[:-1], BIN_EDGES[1:])
+    ]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "stage",
+                "count",
+                "mean_ms",
+                "p50_ms",
+                "p95_ms",
+                "p99_ms",
+                "max_ms",
+                *bin_labels,
+            ]
+        )
+
+        for stage, stats in sorted_stages():
+            summary = stats.summary()
+            writer.writerow(
+                [
+                    stage,
+                    summary["count"],
+                    *(
+                        f"{summary[key] * 1e3:.6f}"
+                        for key in ("mean", "p50", "p95", "p99", "max")
+                    ),
+                    *stats.histogram(),
+                ]
+            )
@@ -0,0 +1,313 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from .buffer import POSE_SIZE, VELOCITY_SIZE, pack_mask
+
+JOURNAL_EXTENSION = ".ttkjournal"
+JOURNAL_MAGIC = b"TTKJRNL1"
+JOURNAL_VERSION = 2
+
+# Version 1 journals have no velocities, but can still be recovered.
+SUPPORTED_VERSIONS = (1, 2)
+
+# Records start after a fixed header, which holds the record count and JSON metadata.
+HEADER_SIZE = 4096
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("metadata_size", "<u4"),
+        ("count", "<u8"),
+    ]
+)
+
+# The file is extended by this many records at a time.
+GROW_RECORDS = 1 << 14
+
+# How often the writer flushes records and the count to disk, in seconds.
+FLUSH_INTERVAL = 0.5
+
+
+def record_dtype(
+    num_trackers: int, mask_words: int, version: int = JOURNAL_VERSION
+) -> np.dtype:
+    """
+    Get the fixed-size record layout for one sample.
+    """
+    fields = [
+        ("timestamp", "<f8"),
+        ("poses", "<f4", (num_trackers, POSE_SIZE)),
+        ("valid", "<u8", (mask_words,)),
+    ]
+    if version >= 2:
+        fields.append(("velocities", "<f2", (num_trackers, VELOCITY_SIZE)))
+
+    return np.dtype(fields)
+
+
+class TakeJournal:
+    """
+    Memory-mapped file of fixed-size sample records.
+    The accessors match PoseBuffer, so a journal can be committed the same way as the in-RAM buffer.
+    Only the records covered by the header count are trusted when reopening, so a crash loses at most the last flush.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        metadata: dict,
+        writable: bool,
+        version: int = JOURNAL_VERSION,
+    ):
+        self.path = path
+        self.metadata = metadata
+        self.roles = list(metadata["roles"])
+        self.role_indices = {role: i for i, role in enumerate(self.roles)}
+        self.mask_words = max(1, (len(self.roles) + 63) // 64)
+        self.dtype = record_dtype(len(self.roles), self.mask_words, version)
+        self.writable = writable
+
+        self._lock = threading.Lock()
+        self._count = 0
+        self._records = None
+        self._header = np.memmap(
+            path, dtype=HEADER_DTYPE, mode="r+" if writable else "r", shape=1
+        )
+
+    @classmethod
+    def create(cls, path: str, roles: list[str], metadata: dict) -> "TakeJournal":
+        """
+        Create a new, empty journal file.
+        """
+        metadata = {**metadata, "roles": list(roles)}
+        metadata_bytes = json.dumps(metadata).encode("utf-8")
+        if HEADER_DTYPE.itemsize + len(metadata_bytes) > HEADER_SIZE:
+            raise ValueError("Journal metadata does not fit in the header")
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = JOURNAL_MAGIC
+        header["version"] = JOURNAL_VERSION
+        header["metadata_size"] = len(metadata_bytes)
+
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(metadata_bytes)
+            f.truncate(HEADER_SIZE)
+
+        journal = cls(path, metadata, writable=True)
+        journal._map(GROW_RECORDS)
+        return journal
+
+    @classmethod
+    def open(cls, path: str) -> "TakeJournal":
+        """
+        Open an existing journal for reading.
+        """
+        with open(path, "rb") as f:
+            header = np.frombuffer(
+                f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE, count=1
+            )
+            if header["magic"][0] != JOURNAL_MAGIC:
+                raise ValueError(f"{path} is not a take journal")
+            version = int(header["version"][0])
+            if version not in SUPPORTED_VERSIONS:
+                raise ValueError(f"Unsupported journal version {version} in {path}")
+            metadata = json.loads(f.read(int(header["metadata_size"][0])))
+
+        journal = cls(path, metadata, writable=False, version=version)
+
+        # Records past the count may be partially written, and records past the end of the file don't exist.
+        available = (os.path.getsize(path) - HEADER_SIZE) // journal.dtype.itemsize
+        journal._count = min(int(header["count"][0]), available)
+        if journal._count:
+            journal._map(journal._count)
+
+        return journal
+
+    def _map(self, capacity: int):
+        # Mapping past the end extends the file. The previous map stays valid for any views still using it.
+        self._records = np.memmap(
+            self.path,
+            dtype=self.dtype,
+            mode="r+" if self.writable else "r",
+            offset=HEADER_SIZE,
+            shape=capacity,
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _filled(self) -> np.ndarray:
+        with self._lock:
+            if self._records is None:
+                return np.empty(0, dtype=self.dtype)
+            return self._records[: self._count]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._filled()["timestamp"]
+
+    @property
+    def poses(self) -> np.ndarray:
+        return self._filled()["poses"]
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._filled()["valid"]
+
+    @property
+    def velocities(self) -> np.ndarray | None:
+        """
+        Velocities, or None for journals written before they were recorded.
+        """
+        if "velocities" not in self.dtype.names:
+            return None
+        return self._filled()["velocities"]
+
+    @property
+    def nbytes(self) -> int:
+        return self._count * self.dtype.itemsize
+
+    def append(self, samples: list):
+        """
+        Write a batch of (timestamp, poses, valid, velocities) samples after the existing records.
+        """
+        count = self._count + len(samples)
+        if count > len(self._records):
+            with self._lock:
+                self._map(-(-count // GROW_RECORDS) * GROW_RECORDS)
+
+        timestamps, poses, valid, velocities = zip(*samples)
+        rows = self._records[self._count : count]
+        rows["timestamp"] = timestamps
+        rows["poses"] = np.stack(poses)
+        rows["valid"] = [pack_mask(v, self.mask_words) for v in valid]
+        rows["velocities"] = np.stack(velocities)
+
+        # Publish the new records to readers.
+        with self._lock:
+            self._count = count
+
+    def flush(self):
+        """
+        Write the records to disk, then the count that makes them visible when recovering.
+        """
+        if self._records is not None:
+            self._records.flush()
+
+        self._header["count"] = self._count
+        self._header.flush()
+
+    def close(self):
+        self._records = None
+        self._header = None
+
+
+class JournalWriter(threading.Thread):
+    """
+    Background thread that appends samples to a journal and periodically flushes it.
+    Disk writes happen here, so a slow drive never delays the Blender timers.
+    """
+
+    def __init__(self, journal: TakeJournal):
+        super().__init__(name="Tracking Toolkit Journal", daemon=True)
+
+        self.journal = journal
+        self._stop_event = threading.Event()
+        self._samples = queue.SimpleQueue()
+
+        self.error: Exception | None = None
+
+        # Samples of the batch that failed to be written.
+        self._failed: list = []
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of samples waiting to be written.
+        """
+        return self._samples.qsize()
+
+    def put(
+        self,
+        timestamp: float,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray,
+    ):
+        """
+        Queue a sample. The arrays are copied, so the caller may reuse them.
+        """
+        self._samples.put((timestamp, poses.copy(), valid.copy(), velocities.copy()))
+
+    def _drain(self) -> list:
+        samples = []
+        while True:
+            try:
+                samples.append(self._samples.get_nowait())
+            except queue.Empty:
+                return samples
+
+    def drain_unwritten(self) -> list:
+        """
+        Get the samples that never made it into the journal, oldest first.
+        Only call this once the writer has stopped.
+        """
+        samples = self._failed + self._drain()
+        self._failed = []
+        return samples
+
+    def run(self):
+        last_flush = time.perf_counter()
+
+        while True:
+            stopping = self._stop_event.wait(0.05)
+
+            samples = []
+            try:
+                samples = self._drain()
+                if samples:
+                    self.journal.append(samples)
+                    samples = []
+
+                now = time.perf_counter()
+                if stopping or now - last_flush > FLUSH_INTERVAL:
+                    self.journal.flush()
+                    last_flush = now
+
+            except Exception as e:
+                # Records only count once a whole batch is written, so the failed batch can be kept whole.
+                self._failed = samples
+                self.error = e
+                return
+
+            if stopping:
+                return
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Write everything that was queued, then wait for the final flush.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def find_journals(directory: str) -> list[str]:
+    """
+    List the journal files in a directory, newest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    paths = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(JOURNAL_EXTENSION)
+    ]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
@@ -0,0 +1,256 @@
+import json
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .buffer import POSE_SIZE, VELOCITY_SIZE
+from .pose_reader import (
+    DEFAULT_NAME,
+    HEADER_STRUCT,
+    MAGIC,
+    SLOT_ALIGNMENT,
+    SLOT_HEADER_STRUCT,
+    VERSION,
+    slot_layout,
+)
+
+# The layout is documented in pose_reader.py, which readers can use on their own.
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("header_size", "<u4"),
+        ("num_trackers", "<u4"),
+        ("mask_words", "<u4"),
+        ("slot_count", "<u4"),
+        ("slot_size", "<u4"),
+        ("roles_offset", "<u4"),
+        ("roles_size", "<u4"),
+        ("slots_offset", "<u4"),
+        ("closed", "<u4"),
+        ("write_count", "<u8"),
+        ("session", "<u8"),
+    ]
+)
+
+# Samples kept for readers that poll slower than the runtime, about 3 seconds at 90 Hz.
+SLOT_COUNT = 256
+
+# Seconds to watch existing shared memory for new samples, before deciding its publisher is gone.
+# Runtimes publish many times within this, so only a publisher that stopped sampling looks stale.
+STALE_CHECK_SECONDS = 0.25
+
+
+def slot_dtype(num_trackers: int) -> np.dtype:
+    mask_words, poses_offset, velocities_offset, slot_size = slot_layout(num_trackers)
+    return np.dtype(
+        {
+            "names": [
+                "sequence",
+                "index",
+                "sample_time",
+                "wall_time",
+                "valid",
+                "poses",
+                "velocities",
+            ],
+            "formats": [
+                "<u8",
+                "<u8",
+                "<i8",
+                "<f8",
+                ("<u8", (mask_words,)),
+                ("<f4", (num_trackers, POSE_SIZE)),
+                ("<f4", (num_trackers, VELOCITY_SIZE)),
+            ],
+            "offsets": [
+                0,
+                8,
+                16,
+                24,
+                SLOT_HEADER_STRUCT.size,
+                poses_offset,
+                velocities_offset,
+            ],
+            "itemsize": slot_size,
+        }
+    )
+
+
+def _is_publishing(memory: shared_memory.SharedMemory) -> bool:
+    """
+    Check whether another publisher is still writing samples to existing shared memory.
+    """
+    header = HEADER_STRUCT.unpack_from(memory.buf)
+    closed, write_count = header[10], header[11]
+    if closed:
+        return False
+
+    time.sleep(STALE_CHECK_SECONDS)
+    return HEADER_STRUCT.unpack_from(memory.buf)[11] != write_count
+
+
+def _refuse_memory(memory: shared_memory.SharedMemory, reason: str):
+    """
+    Let go of shared memory that belongs to someone else, without removing it.
+    """
+    # Attaching registers the memory to be removed when this process exits.
+    if os.name == "posix":
+        resource_tracker.unregister(memory._name, "shared_memory")
+
+    memory.close()
+    raise RuntimeError(f"Shared memory {memory.name} {reason}")
+
+
+def _open_memory(name: str, size: int) -> shared_memory.SharedMemory:
+    """
+    Create the shared memory, replacing any left behind by an earlier session.
+    Memory that another program or a running publisher is using is never replaced.
+    """
+    try:
+        return shared_memory.SharedMemory(name, create=True, size=size)
+    except FileExistsError:
+        pass
+
+    memory = shared_memory.SharedMemory(name)
+
+    # An empty magic is a publisher that stopped before it finished setting up.
+    magic = (
+        bytes(memory.buf[: len(MAGIC)]) if memory.size >= HEADER_STRUCT.size else b""
+    )
+    if magic not in (MAGIC, bytes(len(MAGIC))):
+        _refuse_memory(
+            memory, "is used by another program. Choose another name to publish to."
+        )
+    if magic == MAGIC and _is_publishing(memory):
+        _refuse_memory(
+            memory,
+            "is still being published by another session. "
+            "Stop publishing there, or choose another name.",
+        )
+
+    # Left behind by a crash. Readers that still have it open keep the old memory.
+    if os.name == "posix":
+        memory.close()
+        memory.unlink()
+        return shared_memory.SharedMemory(name, create=True, size=size)
+
+    # Windows only frees the memory once every handle is closed, so a reader still has it open.
+    # The new session id tells the reader to reopen.
+    if memory.size < size:
+        memory.close()
+        raise RuntimeError(
+            f"Shared memory {name} is too small and still open in another process. "
+            "Close the readers and reconnect."
+        )
+    return memory
+
+
+class PosePublisher:
+    """
+    Writes each sample to shared memory, where other local processes can poll it with pose_reader.py.
+    Publishing only copies into a ring of slots, so it never waits on readers.
+    There must only be one publishing thread.
+    """
+
+    def __init__(
+        self, roles: list[str], name: str = DEFAULT_NAME, slot_count: int = SLOT_COUNT
+    ):
+        self.roles = list(roles)
+        self.name = name
+
+        roles_json = json.dumps(self.roles).encode()
+        mask_words, _, _, slot_size = slot_layout(len(self.roles))
+        roles_offset = HEADER_DTYPE.itemsize
+        slots_offset = (
+            -(-(roles_offset + len(roles_json)) // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+        )
+        size = slots_offset + slot_count * slot_size
+
+        self._memory = _open_memory(name, size)
+        self._memory.buf[:size] = bytes(size)
+        self._memory.buf[roles_offset : roles_offset + len(roles_json)] = roles_json
+
+        self._slot_count = slot_count
+        self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._memory.buf)
+        slots = np.ndarray(
+            slot_count,
+            dtype=slot_dtype(len(self.roles)),
+            buffer=self._memory.buf,
+            offset=slots_offset,
+        )
+
+        # Views of each field, which are much faster to assign to than fields of a slot.
+        self._fields = {name: slots[name] for name in slots.dtype.names}
+
+        # Masks are packed straight into the slot, in the same bit order as buffer.pack_mask.
+        self._mask_bytes = self._fields["valid"].view(np.uint8)
+        self._mask_size = (len(self.roles) + 7) // 8
+
+        header = self._header
+        header["version"] = VERSION
+        header["header_size"] = HEADER_DTYPE.itemsize
+        header["num_trackers"] = len(self.roles)
+        header["mask_words"] = mask_words
+        header["slot_count"] = slot_count
+        header["slot_size"] = slot_size
+        header["roles_offset"] = roles_offset
+        header["roles_size"] = len(roles_json)
+        header["slots_offset"] = slots_offset
+        header["session"] = time.time_ns()
+
+        # Readers check the magic, so it is written last.
+        header["magic"] = MAGIC
+
+        self.write_count = 0
+
+    def publish(
+        self,
+        sample_time: int,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray,
+        wall_time: float,
+    ):
+        index = self.write_count
+        slot = index % self._slot_count
+        fields = self._fields
+
+        # Odd while writing, so readers retry instead of seeing half a sample.
+        sequence = fields["sequence"]
+        sequence[slot] += 1
+
+        fields["index"][slot] = index
+        fields["sample_time"][slot] = sample_time
+        fields["wall_time"][slot] = wall_time
+        self._mask_bytes[slot, : self._mask_size] = np.packbits(
+            valid, bitorder="little"
+        )
+        fields["poses"][slot] = poses
+        fields["velocities"][slot] = velocities
+
+        sequence[slot] += 1
+
+        self.write_count = index + 1
+        self._header["write_count"] = self.write_count
+
+    def close(self):
+        """
+        Tell readers the session is over, and give back the memory.
+        """
+        if not self._memory:
+            return
+
+        self._header["closed"] = 1
+
+        # The memory can't be closed while arrays still point into it.
+        self._header = None
+        self._fields = None
+        self._mask_bytes = None
+
+        self._memory.close()
+        if os.name == "posix":
+            self._memory.unlink()
+        self._memory = None
@@ -0,0 +1,207 @@
+"""
+Reader of the live poses that Tracking Toolkit publishes to shared memory.
+Only needs the standard library, so it can be copied into other tools.
+
+    reader = PoseReader()
+    while not reader.closed:
+        sample = reader.latest()
+
+The memory holds a header, the role strings, and a ring of sample slots. Everything is little endian.
+
+Header (HEADER_STRUCT):
+    magic           8 bytes, MAGIC
+    version         uint32, VERSION
+    header_size     uint32
+    num_trackers    uint32
+    mask_words      uint32, 64-bit words in each validity mask
+    slot_count      uint32
+    slot_size       uint32
+    roles_offset    uint32, of the roles as UTF-8 JSON
+    roles_size      uint32
+    slots_offset    uint32
+    closed          uint32, 1 once the publisher has stopped
+    write_count     uint64, samples published so far. The newest is in slot (write_count - 1) % slot_count.
+    session         uint64, changes each time the publisher starts. Readers should reopen if it does.
+
+Slot (see slot_layout()):
+    sequence        uint64, odd while the slot is being written
+    index           uint64, number of the sample in the slot
+    sample_time     int64, nanoseconds on the pose source's clock
+    wall_time       float64, time.time() of the sample on the publishing machine
+    valid           uint64 mask words, bit i is set if tracker i was located
+    poses           float32 (x, y, z, qw, qx, qy, qz) per tracker, in Blender world space
+    velocities      float32 (vx, vy, vz, wx, wy, wz) per tracker, NaN if unknown
+
+Slots are guarded by a seqlock: a copy is only good if the sequence was even and unchanged around it.
+The publisher writes the odd sequence, the slot, the even sequence, then write_count, in that order.
+"""
+
+import json
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+
+DEFAULT_NAME = "tracking_toolkit_poses"
+
+MAGIC = b"TTKPOSE1"
+VERSION = 1
+
+HEADER_STRUCT = struct.Struct("<8s10IQQ")
+SLOT_HEADER_STRUCT = struct.Struct("<QQqd")
+
+# Slots start on cache lines, so writing one never touches its neighbours.
+SLOT_ALIGNMENT = 64
+
+# Attempts to copy a slot while it is being written, before giving up until the next poll.
+MAX_RETRIES = 100
+
+
+def slot_layout(num_trackers: int) -> tuple[int, int, int, int]:
+    """
+    Get the offsets of a slot's fields after its header.
+    :returns: (mask words, poses offset, velocities offset, slot size)
+    """
+    mask_words = (num_trackers + 63) // 64
+    poses_offset = SLOT_HEADER_STRUCT.size + mask_words * 8
+    velocities_offset = poses_offset + num_trackers * 7 * 4
+    end = velocities_offset + num_trackers * 6 * 4
+    slot_size = -(-end // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+    return mask_words, poses_offset, velocities_offset, slot_size
+
+
+class Sample(NamedTuple):
+    index: int
+    sample_time: int
+    wall_time: float
+    valid: tuple[bool, ...]
+    poses: tuple[tuple[float, ...], ...]
+    velocities: tuple[tuple[float, ...], ...]
+
+
+class PoseReader:
+    """
+    Polls the poses published by Tracking Toolkit. Never blocks the publisher.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        try:
+            self._memory = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # Before Python 3.13, attaching also removes the memory when this process exits.
+            self._memory = shared_memory.SharedMemory(name)
+            if os.name == "posix":
+                resource_tracker.unregister(self._memory._name, "shared_memory")
+
+        buffer = self._memory.buf
+        (
+            magic,
+            version,
+            _,
+            self.num_trackers,
+            self._mask_words,
+            self._slot_count,
+            self._slot_size,
+            roles_offset,
+            roles_size,
+            self._slots_offset,
+            _,
+            _,
+            self.session,
+        ) = HEADER_STRUCT.unpack_from(buffer)
+
+        if magic != MAGIC or version != VERSION:
+            self._memory.close()
+            raise ValueError(f"{name} is not a version {VERSION} pose publisher")
+
+        self.roles = json.loads(bytes(buffer[roles_offset : roles_offset + roles_size]))
+
+        _, poses_offset, velocities_offset, _ = slot_layout(self.num_trackers)
+        self._poses_struct = struct.Struct(f"<{self.num_trackers * 7}f")
+        self._poses_offset = poses_offset
+        self._velocities_struct = struct.Struct(f"<{self.num_trackers * 6}f")
+        self._velocities_offset = velocities_offset
+        self._mask_struct = struct.Struct(f"<{self._mask_words}Q")
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the publisher stopped or restarted. Open a new reader to follow a restarted publisher.
+        """
+        header = HEADER_STRUCT.unpack_from(self._memory.buf)
+        return bool(header[10]) or header[12] != self.session
+
+    @property
+    def write_count(self) -> int:
+        return HEADER_STRUCT.unpack_from(self._memory.buf)[11]
+
+    def read(self, index: int) -> Sample | None:
+        """
+        Get a sample by its number, or None if it was overwritten or not published yet.
+        """
+        buffer = self._memory.buf
+        start = self._slots_offset + (index % self._slot_count) * self._slot_size
+
+        for _ in range(MAX_RETRIES):
+            sequence = struct.unpack_from("<Q", buffer, start)[0]
+            if sequence % 2:
+                continue
+
+            data = bytes(buffer[start : start + self._slot_size])
+            if struct.unpack_from("<Q", buffer, start)[0] != sequence:
+                continue
+
+            _, slot_index, sample_time, wall_time = SLOT_HEADER_STRUCT.unpack_from(data)
+            if slot_index != index or not sequence:
+                return None
+
+            return self._unpack(data, slot_index, sample_time, wall_time)
+
+        return None
+
+    def _unpack(
+        self, data: bytes, index: int, sample_time: int, wall_time: float
+    ) -> Sample:
+        mask = self._mask_struct.unpack_from(data, SLOT_HEADER_STRUCT.size)
+        valid = tuple(
+            bool(mask[i // 64] >> (i % 64) & 1) for i in range(self.num_trackers)
+        )
+
+        poses = self._poses_struct.unpack_from(data, self._poses_offset)
+        velocities = self._velocities_struct.unpack_from(data, self._velocities_offset)
+
+        return Sample(
+            index,
+            sample_time,
+            wall_time,
+            valid,
+            tuple(poses[i : i + 7] for i in range(0, len(poses), 7)),
+            tuple(velocities[i : i + 6] for i in range(0, len(velocities), 6)),
+        )
+
+    def latest(self) -> Sample | None:
+        """
+        Get the newest sample, or None if nothing has been published yet.
+        """
+        write_count = self.write_count
+        if not write_count:
+            return None
+        return self.read(write_count - 1)
+
+    def read_since(self, index: int) -> list[Sample]:
+        """
+        Get the samples published after the one numbered index, oldest first.
+        Samples that were already overwritten are skipped, so pass -1 to get everything still in the ring.
+        """
+        write_count = self.write_count
+        first = max(index + 1, write_count - self._slot_count)
+
+        samples = []
+        for i in range(first, write_count):
+            sample = self.read(i)
+            if sample:
+                samples.append(sample)
+        return samples
+
+    def close(self):
+        self._memory.close()
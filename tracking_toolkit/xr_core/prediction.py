@@ -0,0 +1,73 @@
+import numpy as np
+
+# Below this rotation angle, the axis of the angular velocity is too unstable to normalize.
+SMALL_ANGLE = 1e-6
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Multiply arrays of (w, x, y, z) quaternions, like a @ b with mathutils.
+    """
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack(
+        [
+            aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+        ],
+        axis=-1,
+    )
+
+
+def normalize(q: np.ndarray) -> np.ndarray:
+    """
+    Normalize arrays of quaternions.
+    Zero quaternions, such as those of trackers that were never located, are left as they are.
+    """
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    return q / np.where(norm > 0, norm, 1)
+
+
+def rotation_from_angular(angular: np.ndarray, duration: float) -> np.ndarray:
+    """
+    Get the (w, x, y, z) quaternions of turning at constant angular velocities for a duration.
+    :param angular: Angular velocities in radians per second, with shape (..., 3).
+    """
+    rotation_vector = angular * duration
+    angle = np.linalg.norm(rotation_vector, axis=-1)
+
+    # sin(angle / 2) / angle, which approaches 1/2 for small angles.
+    safe_angle = np.where(angle > SMALL_ANGLE, angle, 1)
+    scale = np.where(angle > SMALL_ANGLE, np.sin(angle / 2) / safe_angle, 0.5)
+
+    return np.concatenate(
+        [np.cos(angle / 2)[..., np.newaxis], rotation_vector * scale[..., np.newaxis]],
+        axis=-1,
+    )
+
+
+def predict_poses(
+    poses: np.ndarray, velocities: np.ndarray, duration: float
+) -> np.ndarray:
+    """
+    Extrapolate poses forward in time, assuming constant linear and angular velocities.
+    Angular velocities are in world space, so their rotation is applied before the pose's.
+
+    :param poses: Poses with shape (..., 7).
+    :param velocities: Velocities with shape (..., 6). Unknown (NaN) velocities keep the pose still.
+    :param duration: Seconds to predict ahead.
+    :returns: New array of predicted poses.
+    """
+    velocities = np.nan_to_num(velocities)
+
+    predicted = np.empty_like(poses)
+    predicted[..., :3] = poses[..., :3] + velocities[..., :3] * duration
+
+    rotation = quaternion_multiply(
+        rotation_from_angular(velocities[..., 3:], duration), poses[..., 3:]
+    )
+    predicted[..., 3:] = normalize(rotation)
+
+    return predicted
@@ -0,0 +1,253 @@
+import json
+import os
+
+import numpy as np
+
+from .buffer import POSE_SIZE, VELOCITY_SIZE, pack_mask, unpack_mask
+
+RAW_TAKE_EXTENSION = ".ttktake"
+RAW_TAKE_MAGIC = b"TTKTAKE1"
+RAW_TAKE_VERSION = 2
+
+# Version 1 takes have no velocities, but can still be re-baked.
+SUPPORTED_VERSIONS = (1, 2)
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("metadata_size", "<u4"),
+        ("count", "<u8"),
+        ("num_trackers", "<u4"),
+        ("mask_words", "<u4"),
+        ("position_scale", "<f8"),
+    ]
+)
+
+# Columns start on this boundary, so each one can be memory-mapped on its own.
+COLUMN_ALIGNMENT = 64
+
+# Positions are stored as integer multiples of this, in meters.
+POSITION_SCALE = 1e-5
+POSITION_LIMIT = np.iinfo(np.int32).max * POSITION_SCALE
+
+# Quaternion components are in [-1, 1], and stored in full int16 range.
+ROTATION_SCALE = np.iinfo(np.int16).max
+
+# Samples are converted this many at a time, so writing never needs the whole take in memory.
+CHUNK_SIZE = 1 << 16
+
+
+def _align(offset: int) -> int:
+    return -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def _column_layout(
+    count: int,
+    num_trackers: int,
+    mask_words: int,
+    start: int,
+    version: int = RAW_TAKE_VERSION,
+) -> dict[str, tuple[int, np.dtype, tuple]]:
+    """
+    Get the offset, type, and shape of every column.
+    Newer columns come last, so older versions keep their layout.
+    """
+    columns = {
+        "timestamps": (np.dtype("<f8"), (count,)),
+        "positions": (np.dtype("<i4"), (count, num_trackers, 3)),
+        "rotations": (np.dtype("<i2"), (count, num_trackers, 4)),
+        "valid": (np.dtype("<u8"), (count, mask_words)),
+    }
+    if version >= 2:
+        columns["velocities"] = (
+            np.dtype("<f2"),
+            (count, num_trackers, VELOCITY_SIZE),
+        )
+
+    layout = {}
+    offset = _align(start)
+    for name, (dtype, shape) in columns.items():
+        layout[name] = (offset, dtype, shape)
+        offset = _align(offset + dtype.itemsize * int(np.prod(shape)))
+
+    return layout
+
+
+def write_raw_take(path: str, source, metadata: dict):
+    """
+    Write the original samples of a take to a compact columnar file.
+    Trackers that were never located are left out.
+
+    :param source: PoseBuffer or TakeJournal holding the samples.
+    :param metadata: JSON-serializable information about the take, such as the runtime and time anchor.
+    """
+    timestamps = source.timestamps
+    poses = source.poses
+    valid = source.valid
+    velocities = source.velocities
+    count = len(timestamps)
+
+    # Find the trackers that were located at least once.
+    located = np.zeros(valid.shape[1], dtype=np.uint64)
+    for start in range(0, count, CHUNK_SIZE):
+        located |= np.bitwise_or.reduce(valid[start : start + CHUNK_SIZE], axis=0)
+    used = np.flatnonzero(unpack_mask(located[np.newaxis], len(source.roles))[0])
+
+    roles = [source.roles[i] for i in used]
+    mask_words = max(1, (len(roles) + 63) // 64)
+
+    metadata = {**metadata, "roles": roles}
+    metadata_bytes = json.dumps(metadata).encode("utf-8")
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = RAW_TAKE_MAGIC
+    header["version"] = RAW_TAKE_VERSION
+    header["metadata_size"] = len(metadata_bytes)
+    header["count"] = count
+    header["num_trackers"] = len(roles)
+    header["mask_words"] = mask_words
+    header["position_scale"] = POSITION_SCALE
+
+    layout = _column_layout(
+        count, len(roles), mask_words, HEADER_DTYPE.itemsize + len(metadata_bytes)
+    )
+
+    def column_chunks(name: str):
+        for start in range(0, count, CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+
+            if name == "timestamps":
+                yield timestamps[start:stop]
+
+            elif name == "positions":
+                positions = poses[start:stop, used, :3]
+                positions = np.clip(positions, -POSITION_LIMIT, POSITION_LIMIT)
+                yield np.round(positions / POSITION_SCALE)
+
+            elif name == "rotations":
+                rotations = np.clip(poses[start:stop, used, 3:], -1, 1)
+                yield np.round(rotations * ROTATION_SCALE)
+
+            elif name == "velocities":
+                if velocities is None:
+                    yield np.full(
+                        (min(stop, count) - start, len(used), VELOCITY_SIZE), np.nan
+                    )
+                else:
+                    yield velocities[start:stop, used]
+
+            else:
+                bits = unpack_mask(valid[start:stop], len(source.roles))
+                yield pack_mask(bits[:, used], mask_words)
+
+    # Write to a temporary file first, so a failed write never leaves a truncated take behind.
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(metadata_bytes)
+
+        for name, (offset, dtype, _) in layout.items():
+            f.seek(offset)
+            for chunk in column_chunks(name):
+                f.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+
+        # Pad out the last column.
+        f.truncate(_align(f.tell()))
+
+    os.replace(temp_path, path)
+
+
+class QuantizedPoses:
+    """
+    Lazily dequantized view of the stored poses.
+    Only the slices that are read are converted, so multi-gigabyte takes never have to fit in memory.
+    """
+
+    def __init__(
+        self, positions: np.ndarray, rotations: np.ndarray, position_scale: float
+    ):
+        self._positions = positions
+        self._rotations = rotations
+        self._position_scale = position_scale
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def shape(self) -> tuple:
+        return (*self._positions.shape[:2], POSE_SIZE)
+
+    def __getitem__(self, key) -> np.ndarray:
+        positions = self._positions[key]
+        rotations = self._rotations[key].astype(np.float32)
+
+        # Renormalize to remove the quantization error.
+        norms = np.linalg.norm(rotations, axis=-1, keepdims=True)
+        rotations /= np.where(norms > 0, norms, 1)
+
+        poses = np.empty((*positions.shape[:-1], POSE_SIZE), dtype=np.float32)
+        poses[..., :3] = positions * self._position_scale
+        poses[..., 3:] = rotations
+        return poses
+
+
+class RawTake:
+    """
+    Memory-mapped raw take file.
+    The accessors match PoseBuffer, so a raw take can be committed the same way as a live one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            header = np.frombuffer(
+                f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE, count=1
+            )[0]
+            if header["magic"] != RAW_TAKE_MAGIC:
+                raise ValueError(f"{path} is not a raw take")
+            if header["version"] not in SUPPORTED_VERSIONS:
+                raise ValueError(
+                    f"Unsupported raw take version {header['version']} in {path}"
+                )
+            self.metadata = json.loads(f.read(int(header["metadata_size"])))
+
+        self.roles = list(self.metadata["roles"])
+        self.role_indices = {role: i for i, role in enumerate(self.roles)}
+        self.mask_words = int(header["mask_words"])
+
+        count = int(header["count"])
+        layout = _column_layout(
+            count,
+            int(header["num_trackers"]),
+            self.mask_words,
+            HEADER_DTYPE.itemsize + int(header["metadata_size"]),
+            int(header["version"]),
+        )
+
+        columns = {}
+        for name, (offset, dtype, shape) in layout.items():
+            # Empty columns can't be mapped.
+            if int(np.prod(shape)) == 0:
+                columns[name] = np.empty(shape, dtype=dtype)
+            else:
+                columns[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=offset, shape=shape
+                )
+
+        self.timestamps = columns["timestamps"]
+        self.valid = columns["valid"]
+        self.velocities = columns.get("velocities")  # None for version 1 takes.
+        self.poses = QuantizedPoses(
+            columns["positions"], columns["rotations"], float(header["position_scale"])
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def close(self):
+        self.timestamps = None
+        self.valid = None
+        self.velocities = None
+        self.poses = None
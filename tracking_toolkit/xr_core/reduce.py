@@ -0,0 +1,94 @@
+import numpy as np
+
+# Keys at this interval are always kept.
+# This bounds how deep the splitting gets, which keeps long takes fast, and costs very few extra keys.
+WINDOW_SIZE = 1024
+
+
+def simplify(
+    frames: np.ndarray,
+    values: np.ndarray,
+    tolerance: float,
+    window_size: int = WINDOW_SIZE,
+) -> np.ndarray:
+    """
+    Error-bounded keyframe reduction using Ramer-Douglas-Peucker, run on every channel at once.
+    With linear interpolation between the kept keys, no dropped key is further than the tolerance from the curve.
+
+    :param frames: Key times with shape (N,), sorted.
+    :param values: Key values with shape (N,) or (N, channels).
+    :param tolerance: Maximum allowed vertical distance to the simplified curve.
+    :returns: Boolean mask of the keys to keep, with the same shape as values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, np.newaxis]
+
+    num_keys, num_channels = values.shape
+    keep = np.zeros((num_channels, num_keys), dtype=bool)
+
+    if num_keys <= 2:
+        keep[:] = True
+    else:
+        # Lay the channels end to end.
+        # Segments never cross a kept key, so keeping each channel's ends keeps them independent.
+        keep[:, ::window_size] = True
+        keep[:, -1] = True
+
+        flat_keep = keep.reshape(-1)
+        _split(
+            np.tile(np.asarray(frames, dtype=np.float64), num_channels),
+            values.T.reshape(-1),
+            flat_keep,
+            tolerance,
+        )
+
+    keep = keep.T
+    return keep[:, 0] if squeeze else keep
+
+
+def _split(frames: np.ndarray, values: np.ndarray, keep: np.ndarray, tolerance: float):
+    """
+    Keep splitting segments at their worst key until all are within tolerance.
+    Every segment is split in the same pass. The keep mask is updated in place.
+    """
+    # Keys inside segments that may still need splitting.
+    # Once a segment is within tolerance, its keys are never looked at again.
+    active = np.flatnonzero(~keep)
+
+    while len(active):
+        kept = np.flatnonzero(keep)
+
+        # Kept keys around each active key.
+        segment = np.searchsorted(kept, active, side="right") - 1
+        start = kept[segment]
+        end = kept[segment + 1]
+
+        # Distance from the line between the segment's kept keys.
+        span = frames[end] - frames[start]
+        factor = np.divide(
+            frames[active] - frames[start],
+            span,
+            out=np.zeros(len(active)),
+            where=span != 0,
+        )
+        line = values[start] + (values[end] - values[start]) * factor
+        error = np.abs(values[active] - line)
+
+        # Worst key of each segment. Active keys are sorted, so segments are contiguous runs.
+        run_starts = np.flatnonzero(np.diff(segment, prepend=-1))
+        run_max = np.maximum.reduceat(error, run_starts)
+        run_lengths = np.diff(run_starts, append=len(active))
+        segment_max = np.repeat(run_max, run_lengths)
+
+        splits = segment_max > tolerance
+        if not splits.any():
+            return
+
+        # Keep only the first worst key in each segment that is out of tolerance.
+        worst = np.flatnonzero((error == segment_max) & splits)
+        _, first = np.unique(segment[worst], return_index=True)
+        keep[active[worst[first]]] = True
+
+        active = active[splits & ~keep[active]]
@@ -0,0 +1,370 @@
+import json
+import socket
+import time
+import zlib
+
+import numpy as np
+
+from .buffer import POSE_SIZE, VELOCITY_SIZE, pack_mask, unpack_mask
+
+# Samples are sent over UDP, since a late sample is worth less than the next one.
+# Nothing waits on retransmissions, and a sample fits in one datagram.
+DEFAULT_PORT = 9870
+PROTOCOL_VERSION = 1
+
+POSE_MAGIC = b"TTKP"
+ROLES_MAGIC = b"TTKR"
+
+# A pose packet holds one sample. The header is followed by:
+#   validity mask, as little endian uint64 words (see buffer.pack_mask)
+#   poses of the valid trackers only, as float32 (x, y, z, qw, qx, qy, qz)
+#   velocities of the valid trackers only, as float16 (vx, vy, vz, wx, wy, wz)
+# roles_id is the CRC32 of the JSON in the host's roles packet.
+POSE_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u2"),
+        ("num_trackers", "<u2"),
+        ("roles_id", "<u4"),
+        ("sequence", "<u4"),
+        ("sample_time", "<i8"),
+    ]
+)
+
+# A roles packet says which trackers the columns of pose packets are.
+# The header is followed by UTF-8 JSON with the host's "name" and "roles".
+ROLES_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u2"),
+        ("num_trackers", "<u2"),
+        ("roles_id", "<u4"),
+    ]
+)
+
+# Seconds between roles packets, so receivers can join at any time.
+# Pose packets are ignored until the roles packet they refer to arrives.
+ROLES_INTERVAL = 1.0
+
+# Largest UDP payload.
+MAX_PACKET_SIZE = 65507
+
+# A sample this far behind the newest one means the host restarted with a new clock, rather than arrived late.
+RESTART_NS = 1_000_000_000
+
+
+def encode_roles(roles: list[str], name: str) -> tuple[int, bytes]:
+    """
+    Build the roles packet of a host.
+    :param name: Name of the host's source, such as its runtime.
+    :returns: (roles id, packet)
+    """
+    payload = json.dumps({"name": name, "roles": list(roles)}).encode()
+    roles_id = zlib.crc32(payload)
+
+    header = np.zeros((), dtype=ROLES_HEADER_DTYPE)
+    header["magic"] = ROLES_MAGIC
+    header["version"] = PROTOCOL_VERSION
+    header["num_trackers"] = len(roles)
+    header["roles_id"] = roles_id
+
+    return roles_id, header.tobytes() + payload
+
+
+def decode_roles(packet: bytes) -> tuple[int, str, list[str]]:
+    """
+    Read a roles packet.
+    :returns: (roles id, name, roles)
+    """
+    if len(packet) < ROLES_HEADER_DTYPE.itemsize:
+        raise ValueError("Roles packet is truncated")
+
+    header = np.frombuffer(packet, dtype=ROLES_HEADER_DTYPE, count=1)[0]
+    if header["version"] != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {header['version']}")
+
+    payload = packet[ROLES_HEADER_DTYPE.itemsize :]
+    if zlib.crc32(payload) != header["roles_id"]:
+        raise ValueError("Roles packet is corrupt")
+
+    data = json.loads(payload)
+    if len(data["roles"]) != header["num_trackers"]:
+        raise ValueError("Roles packet has the wrong number of trackers")
+
+    return int(header["roles_id"]), data["name"], data["roles"]
+
+
+def encode_sample(
+    roles_id: int,
+    sequence: int,
+    sample_time: int,
+    poses: np.ndarray,
+    valid: np.ndarray,
+    velocities: np.ndarray,
+) -> bytes:
+    """
+    Build the pose packet of a sample. Only the valid trackers' poses are sent.
+    """
+    header = np.zeros((), dtype=POSE_HEADER_DTYPE)
+    header["magic"] = POSE_MAGIC
+    header["version"] = PROTOCOL_VERSION
+    header["num_trackers"] = len(valid)
+    header["roles_id"] = roles_id
+    header["sequence"] = sequence
+    header["sample_time"] = sample_time
+
+    mask_words = (len(valid) + 63) // 64
+    return b"".join(
+        (
+            header.tobytes(),
+            pack_mask(valid, mask_words).astype("<u8").tobytes(),
+            poses[valid].astype("<f4").tobytes(),
+            velocities[valid].astype("<f2").tobytes(),
+        )
+    )
+
+
+def decode_header(packet: bytes) -> np.void:
+    """
+    Read the header of a pose packet, without the rest.
+    """
+    if len(packet) < POSE_HEADER_DTYPE.itemsize:
+        raise ValueError("Pose packet is truncated")
+
+    header = np.frombuffer(packet, dtype=POSE_HEADER_DTYPE, count=1)[0]
+    if header["version"] != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {header['version']}")
+
+    return header
+
+
+def decode_sample(
+    packet: bytes, header: np.void
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the trackers of a pose packet.
+    :returns: (valid, poses, velocities), with poses and velocities only for the valid trackers.
+    """
+    num_trackers = int(header["num_trackers"])
+    mask_words = (num_trackers + 63) // 64
+
+    offset = POSE_HEADER_DTYPE.itemsize
+    mask = np.frombuffer(packet, dtype="<u8", count=mask_words, offset=offset)
+    valid = unpack_mask(mask[np.newaxis], num_trackers)[0]
+    num_valid = int(np.count_nonzero(valid))
+    offset += mask.nbytes
+
+    expected = offset + num_valid * (POSE_SIZE * 4 + VELOCITY_SIZE * 2)
+    if len(packet) != expected:
+        raise ValueError(f"Pose packet is {len(packet)} bytes, expected {expected}")
+
+    poses = np.frombuffer(
+        packet, dtype="<f4", count=num_valid * POSE_SIZE, offset=offset
+    )
+    offset += poses.nbytes
+    velocities = np.frombuffer(
+        packet, dtype="<f2", count=num_valid * VELOCITY_SIZE, offset=offset
+    )
+
+    return (
+        valid,
+        poses.reshape(num_valid, POSE_SIZE),
+        velocities.reshape(num_valid, VELOCITY_SIZE),
+    )
+
+
+class PoseSender:
+    """
+    Streams a source's samples to a receiver.
+    Sending never blocks or fails the host, even if nothing is listening yet.
+    """
+
+    def __init__(self, address: str, port: int, roles: list[str], name: str):
+        self.address = (address, port)
+        self.roles_id, self._roles_packet = encode_roles(roles, name)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sequence = 0
+        self._roles_sent: float | None = None
+
+        self.errors = 0
+
+    def send(
+        self,
+        sample_time: int,
+        poses: np.ndarray,
+        valid: np.ndarray,
+        velocities: np.ndarray,
+    ):
+        now = time.monotonic()
+        if self._roles_sent is None or now - self._roles_sent >= ROLES_INTERVAL:
+            self._roles_sent = now
+            self._send(self._roles_packet)
+
+        self._send(
+            encode_sample(
+                self.roles_id, self._sequence, sample_time, poses, valid, velocities
+            )
+        )
+        self._sequence = (self._sequence + 1) % 2**32
+
+    def _send(self, packet: bytes):
+        try:
+            self._socket.sendto(packet, self.address)
+        except OSError as e:
+            if not self.errors:
+                print(f"OpenXR Remote failed to send to {self.address}: {e}")
+            self.errors += 1
+
+    def close(self):
+        self._socket.close()
+
+
+class PoseReceiver:
+    """
+    Receives samples from a PoseSender, and maps the host's trackers onto known roles.
+    Sample times stay on the host's clock, and keep moving forward if the host restarts.
+    """
+
+    def __init__(self, address: str, port: int, roles: list[str]):
+        self.roles = list(roles)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((address, port))
+        self._socket.setblocking(False)
+
+        # Column in self.roles of each of a host's trackers, by roles id. -1 for unknown roles.
+        self._columns: dict[int, np.ndarray] = {}
+
+        # Added to host times, so they continue across restarts.
+        self._time_offset = 0
+        self._last_sequence: int | None = None
+
+        self._poses = np.zeros((len(self.roles), POSE_SIZE), dtype=np.float32)
+        self._valid = np.zeros(len(self.roles), dtype=bool)
+        self._velocities = np.full(
+            (len(self.roles), VELOCITY_SIZE), np.nan, dtype=np.float32
+        )
+
+        # (wall clock seconds, sample time in nanoseconds) when the first sample arrived.
+        self.time_anchor: tuple[float, int] | None = None
+        self.last_time: int | None = None
+
+        self.received = 0
+        self.lost = 0
+        self.rejected = 0
+
+    def _reject(self, error: ValueError):
+        if not self.rejected:
+            print(f"OpenXR Remote ignored a packet: {error}")
+        self.rejected += 1
+
+    def _read_roles(self, packet: bytes):
+        roles_id, name, roles = decode_roles(packet)
+        if roles_id in self._columns:
+            return
+
+        columns = np.array(
+            [self.roles.index(r) if r in self.roles else -1 for r in roles],
+            dtype=np.intp,
+        )
+        self._columns[roles_id] = columns
+
+        print(f"OpenXR Remote receiving {len(roles)} trackers from {name}.")
+        unknown = [r for r, c in zip(roles, columns) if c < 0]
+        if unknown:
+            print(f"OpenXR Remote ignoring unknown trackers: {', '.join(unknown)}")
+
+    def _host_to_local(self, host_time: int) -> int | None:
+        """
+        Map a host time onto the receiver's timeline, or None if the sample is stale.
+        """
+        sample_time = host_time + self._time_offset
+        if self.last_time is None or sample_time > self.last_time:
+            return sample_time
+
+        if self.last_time - sample_time < RESTART_NS:
+            # Arrived late or twice.
+            return None
+
+        # The host restarted with a new clock, so continue from the current time.
+        print("OpenXR Remote host restarted.")
+        wall_anchor, time_anchor = self.time_anchor
+        now = time_anchor + round((time.time() - wall_anchor) * 1e9)
+        self._time_offset = max(now, self.last_time + 1) - host_time
+        self._last_sequence = None
+        return host_time + self._time_offset
+
+    def receive(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        """
+        Read every packet that has arrived without blocking, and get the newest sample.
+        Like a runtime, only the newest sample is returned if several arrived since the last call.
+        The returned arrays are reused, so they are only valid until the next call.
+        """
+        newest = None
+
+        while True:
+            try:
+                packet = self._socket.recv(MAX_PACKET_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows reports unreachable ports of earlier datagrams here.
+                continue
+
+            try:
+                magic = packet[:4]
+                if magic == ROLES_MAGIC:
+                    self._read_roles(packet)
+                    continue
+                if magic != POSE_MAGIC:
+                    raise ValueError("Unknown packet type")
+
+                header = decode_header(packet)
+            except ValueError as e:
+                self._reject(e)
+                continue
+
+            # Wait for the host to say which trackers these are.
+            if int(header["roles_id"]) not in self._columns:
+                continue
+
+            sample_time = self._host_to_local(int(header["sample_time"]))
+            if sample_time is None:
+                continue
+
+            if self.time_anchor is None:
+                self.time_anchor = (time.time(), sample_time)
+
+            sequence = int(header["sequence"])
+            if self._last_sequence is not None:
+                self.lost += (sequence - self._last_sequence - 1) % 2**32
+            self._last_sequence = sequence
+
+            self.last_time = sample_time
+            self.received += 1
+            newest = (packet, header, sample_time)
+
+        if newest is None:
+            return None
+
+        packet, header, sample_time = newest
+        try:
+            valid, poses, velocities = decode_sample(packet, header)
+        except ValueError as e:
+            self._reject(e)
+            return None
+
+        columns = self._columns[int(header["roles_id"])]
+        located = columns[valid]
+        known = located >= 0
+
+        self._valid[:] = False
+        self._valid[located[known]] = True
+        self._poses[located[known]] = poses[known]
+        self._velocities[located[known]] = velocities[known]
+
+        return sample_time, self._poses, self._valid, self._velocities
+
+    def close(self):
+        self._socket.close()
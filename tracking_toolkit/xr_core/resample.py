@@ -0,0 +1,340 @@
+import numpy as np
+
+from .prediction import (
+    SMALL_ANGLE,
+    normalize,
+    quaternion_multiply,
+    rotation_from_angular,
+)
+
+# Below this angle, slerp falls back to a plain lerp to avoid dividing by ~0.
+SLERP_EPSILON = 0.0001
+
+# Resampling kernels, as stored in the preferences.
+# Linear: straight lines and slerp between the two samples around each frame.
+# Hermite: Hermite curves through the recorded velocities.
+#   Where a sample has no velocity, the tangent is estimated from its neighbours like Catmull-Rom,
+#   so positions of takes without velocities are the same as with Catmull-Rom. Rotations still differ.
+# Catmull-Rom: Catmull-Rom splines through neighbouring samples, and squad for rotations.
+KERNEL_LINEAR = "LINEAR"
+KERNEL_HERMITE = "HERMITE"
+KERNEL_CATMULL_ROM = "CATMULL_ROM"
+KERNELS = (KERNEL_LINEAR, KERNEL_HERMITE, KERNEL_CATMULL_ROM)
+
+# Samples cubic kernels read on either side of the pair around each frame.
+KERNEL_MARGIN = 1
+
+# Flips the vector part of (w, x, y, z) quaternions.
+CONJUGATE = np.array([1, -1, -1, -1])
+
+
+def count_frames(duration: float, record_fps: float) -> int:
+    """
+    Get the number of recorded frames that fit in a duration, including the frame at time 0.
+    """
+    return int(np.floor(duration * record_fps + 1e-9)) + 1
+
+
+def canonicalize(q: np.ndarray) -> np.ndarray:
+    """
+    Normalize arrays of (w, x, y, z) quaternions in place and flip them so w >= 0, like Matrix.decompose() returns them.
+    The rotations don't change.
+    """
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    np.negative(q, out=q, where=q[..., :1] < 0)
+    return q
+
+
+def lerp(a: np.ndarray, b: np.ndarray, factor: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate between arrays of vectors.
+    """
+    return a + (b - a) * factor[..., np.newaxis]
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, factor: np.ndarray) -> np.ndarray:
+    """
+    Spherically interpolate between arrays of (w, x, y, z) quaternions.
+    The shortest path is always taken, like mathutils.Quaternion.slerp.
+    """
+    cos_half = np.sum(q0 * q1, axis=-1)
+
+    # Flip to the same hemisphere.
+    q1 = np.where((cos_half < 0)[..., np.newaxis], -q1, q1)
+    cos_half = np.abs(cos_half)
+
+    use_slerp = cos_half < 1 - SLERP_EPSILON
+    angle = np.arccos(np.clip(cos_half, -1, 1))
+    sin_angle = np.sin(angle)
+
+    # Only divide where slerp is used, the rest are overwritten by lerp factors.
+    safe_sin = np.where(use_slerp, sin_angle, 1)
+    w0 = np.where(use_slerp, np.sin((1 - factor) * angle) / safe_sin, 1 - factor)
+    w1 = np.where(use_slerp, np.sin(factor * angle) / safe_sin, factor)
+
+    return q0 * w0[..., np.newaxis] + q1 * w1[..., np.newaxis]
+
+
+def hermite_basis(factor: np.ndarray) -> tuple[np.ndarray, ...]:
+    """
+    Get the cubic Hermite weights of the start value, start tangent, end value, and end tangent.
+    """
+    factor2 = factor * factor
+    factor3 = factor2 * factor
+    return (
+        2 * factor3 - 3 * factor2 + 1,
+        factor3 - 2 * factor2 + factor,
+        -2 * factor3 + 3 * factor2,
+        factor3 - factor2,
+    )
+
+
+def _rotation_vector(q: np.ndarray) -> np.ndarray:
+    """
+    Get the axis times angle of arrays of (w, x, y, z) quaternions, taking the shortest path.
+    """
+    q = np.where(q[..., :1] < 0, -q, q)
+    sin_half = np.linalg.norm(q[..., 1:], axis=-1)
+    angle = 2 * np.arctan2(sin_half, q[..., 0])
+
+    # angle / sin(angle / 2), which approaches 2 for small angles.
+    safe_sin = np.where(sin_half > SMALL_ANGLE, sin_half, 1)
+    scale = np.where(sin_half > SMALL_ANGLE, angle / safe_sin, 2)
+    return q[..., 1:] * scale[..., np.newaxis]
+
+
+def differences(
+    before: np.ndarray, after: np.ndarray, duration: np.ndarray
+) -> np.ndarray:
+    """
+    Estimate the velocities at samples from the poses on either side of them, like Catmull-Rom tangents.
+    Angular velocities are in world space, like the ones the runtime reports.
+
+    :param before: Poses with shape (..., 7).
+    :param after: Poses of the same shape.
+    :param duration: Time between the two poses. Where it is 0, the velocities are 0.
+    :returns: Velocities with shape (..., 6).
+    """
+    safe_duration = np.where(duration > 0, duration, 1)[..., np.newaxis]
+
+    linear = (after[..., :3] - before[..., :3]) / safe_duration
+    delta = quaternion_multiply(after[..., 3:], before[..., 3:] * CONJUGATE)
+    angular = _rotation_vector(delta) / safe_duration
+
+    return np.concatenate([linear, angular], axis=-1)
+
+
+def hermite(
+    p0: np.ndarray,
+    p1: np.ndarray,
+    v0: np.ndarray,
+    v1: np.ndarray,
+    factor: np.ndarray,
+    span: np.ndarray,
+) -> np.ndarray:
+    """
+    Interpolate between arrays of vectors along cubic curves that match the velocities at both ends.
+    :param span: Time between the two ends, which scales the velocities into tangents.
+    """
+    h00, h10, h01, h11 = hermite_basis(factor)
+    span = span[..., np.newaxis]
+    return (
+        p0 * h00[..., np.newaxis]
+        + v0 * (span * h10[..., np.newaxis])
+        + p1 * h01[..., np.newaxis]
+        + v1 * (span * h11[..., np.newaxis])
+    )
+
+
+def hermite_rotation(
+    q0: np.ndarray,
+    q1: np.ndarray,
+    w0: np.ndarray,
+    w1: np.ndarray,
+    factor: np.ndarray,
+    span: np.ndarray,
+) -> np.ndarray:
+    """
+    Interpolate between arrays of (w, x, y, z) quaternions, matching world space angular velocities at both ends.
+    The rotation from q0 to q1 is interpolated as a rotation vector, which is exact for turns around one axis.
+    The shortest path is always taken, like slerp().
+    """
+    delta = quaternion_multiply(q1, q0 * CONJUGATE)
+
+    _, h10, h01, h11 = hermite_basis(factor)
+    span = span[..., np.newaxis]
+    rotation_vector = (
+        _rotation_vector(delta) * h01[..., np.newaxis]
+        + w0 * (span * h10[..., np.newaxis])
+        + w1 * (span * h11[..., np.newaxis])
+    )
+
+    rotation = quaternion_multiply(rotation_from_angular(rotation_vector, 1.0), q0)
+    return normalize(rotation)
+
+
+def _mirror(q: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """
+    Get the rotations as far from arrays of (w, x, y, z) quaternions as the others, but on the opposite side.
+    """
+    return quaternion_multiply(quaternion_multiply(q, other * CONJUGATE), q)
+
+
+def _squad_control(before: np.ndarray, q: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """
+    Get the inner control points of squad at arrays of (w, x, y, z) quaternions, from their neighbours.
+    """
+    inverse = q * CONJUGATE
+    to_before = _rotation_vector(quaternion_multiply(inverse, before))
+    to_after = _rotation_vector(quaternion_multiply(inverse, after))
+    return quaternion_multiply(
+        q, rotation_from_angular(-(to_before + to_after) / 4, 1.0)
+    )
+
+
+def squad(
+    before: np.ndarray,
+    q0: np.ndarray,
+    q1: np.ndarray,
+    after: np.ndarray,
+    factor: np.ndarray,
+) -> np.ndarray:
+    """
+    Interpolate between arrays of (w, x, y, z) quaternions along a smooth spline through their neighbours.
+    This is the rotation counterpart of a Catmull-Rom spline, and assumes evenly spaced samples.
+    """
+    # Flip to the same hemisphere, so the control points are on the same side.
+    q1 = np.where((np.sum(q0 * q1, axis=-1) < 0)[..., np.newaxis], -q1, q1)
+
+    rotation = slerp(
+        slerp(q0, q1, factor),
+        slerp(_squad_control(before, q0, q1), _squad_control(q0, q1, after), factor),
+        2 * factor * (1 - factor),
+    )
+    return normalize(rotation)
+
+
+def resample(
+    timestamps: np.ndarray,
+    poses: np.ndarray,
+    valid: np.ndarray,
+    frame_times: np.ndarray,
+    velocities: np.ndarray | None = None,
+    kernel: str = KERNEL_HERMITE,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Resample a whole take at the given frame times, for all trackers at once.
+    Each frame uses the pair of samples bracketing it, and cubic kernels also use the samples on either side of them.
+
+    Runtimes may report either sign of a rotation, and every kernel takes the shortest path whatever the signs.
+    Samples and resampled rotations are normalized and flipped so w >= 0, as the per-pose conversion got them from Matrix.decompose().
+
+    :param timestamps: Sample times with shape (N,), relative to the same origin as frame_times.
+    :param poses: Poses with shape (N, trackers, 7).
+    :param valid: Boolean validity with shape (N, trackers).
+    :param frame_times: Times to sample at with shape (F,).
+    :param velocities: Velocities with shape (N, trackers, 6), NaN where unknown.
+    :param kernel: One of KERNELS.
+    :returns: Tuple of (locations (F, trackers, 3), rotations (F, trackers, 4), valid (F, trackers)).
+    """
+    # Index of the first sample at or after each frame.
+    next_idx = np.searchsorted(timestamps, frame_times, side="left")
+    next_idx = np.clip(next_idx, 0, len(timestamps) - 1)
+    prev_idx = np.maximum(next_idx - 1, 0)
+
+    prev_time = timestamps[prev_idx]
+    next_time = timestamps[next_idx]
+    span = next_time - prev_time
+
+    # Frames before the first sample (and duplicate stamps) get the next sample as-is.
+    factor = np.divide(
+        frame_times - prev_time,
+        span,
+        out=np.zeros_like(frame_times),
+        where=span != 0,
+    )
+    factor = np.where(next_idx == 0, 0, factor)
+
+    prev_poses = poses[prev_idx].astype(np.float64)
+    next_poses = poses[next_idx].astype(np.float64)
+    canonicalize(prev_poses[..., 3:])
+    canonicalize(next_poses[..., 3:])
+    frame_valid = valid[prev_idx] & valid[next_idx]
+
+    # Broadcast over trackers.
+    factor = np.broadcast_to(factor[:, np.newaxis], prev_poses.shape[:2])
+
+    if kernel == KERNEL_LINEAR:
+        locs = lerp(prev_poses[..., :3], next_poses[..., :3], factor)
+        rots = slerp(prev_poses[..., 3:], next_poses[..., 3:], factor)
+        return locs, canonicalize(rots), frame_valid
+
+    # Samples on either side of the pair.
+    # Past the ends of the take, or where the tracker was lost, the pair's own samples are used instead.
+    trackers = np.arange(poses.shape[1])
+    before_idx = np.maximum(prev_idx - 1, 0)[:, np.newaxis]
+    after_idx = np.minimum(next_idx + 1, len(timestamps) - 1)[:, np.newaxis]
+    before_idx = np.where(
+        valid[before_idx, trackers], before_idx, prev_idx[:, np.newaxis]
+    )
+    after_idx = np.where(valid[after_idx, trackers], after_idx, next_idx[:, np.newaxis])
+
+    before_poses = poses[before_idx, trackers].astype(np.float64)
+    after_poses = poses[after_idx, trackers].astype(np.float64)
+    canonicalize(before_poses[..., 3:])
+    canonicalize(after_poses[..., 3:])
+
+    prev_tangents = differences(
+        before_poses, next_poses, next_time[:, np.newaxis] - timestamps[before_idx]
+    )
+    next_tangents = differences(
+        prev_poses, after_poses, timestamps[after_idx] - prev_time[:, np.newaxis]
+    )
+
+    # Recorded velocities replace the estimates wherever the source reported them.
+    if kernel == KERNEL_HERMITE and velocities is not None:
+        prev_velocities = velocities[prev_idx].astype(np.float64)
+        next_velocities = velocities[next_idx].astype(np.float64)
+        prev_tangents = np.where(
+            np.isfinite(prev_velocities), prev_velocities, prev_tangents
+        )
+        next_tangents = np.where(
+            np.isfinite(next_velocities), next_velocities, next_tangents
+        )
+
+    span = np.broadcast_to(span[:, np.newaxis], factor.shape)
+    locs = hermite(
+        prev_poses[..., :3],
+        next_poses[..., :3],
+        prev_tangents[..., :3],
+        next_tangents[..., :3],
+        factor,
+        span,
+    )
+
+    if kernel == KERNEL_CATMULL_ROM:
+        prev_rots = prev_poses[..., 3:]
+        next_rots = next_poses[..., 3:]
+
+        # Missing neighbours are mirrored, so squad doesn't bend towards the pair's own samples.
+        has_before = (before_idx != prev_idx[:, np.newaxis])[..., np.newaxis]
+        has_after = (after_idx != next_idx[:, np.newaxis])[..., np.newaxis]
+        before_rots = np.where(
+            has_before, before_poses[..., 3:], _mirror(prev_rots, next_rots)
+        )
+        after_rots = np.where(
+            has_after, after_poses[..., 3:], _mirror(next_rots, prev_rots)
+        )
+
+        rots = squad(before_rots, prev_rots, next_rots, after_rots, factor)
+    else:
+        rots = hermite_rotation(
+            prev_poses[..., 3:],
+            next_poses[..., 3:],
+            prev_tangents[..., 3:],
+            next_tangents[..., 3:],
+            factor,
+            span,
+        )
+
+    return locs, canonicalize(rots), frame_valid
@@ -0,0 +1,434 @@
+import abc
+import math
+import time
+
+import numpy as np
+
+from .actions import all_role_strings
+from .buffer import POSE_SIZE, VELOCITY_SIZE, unpack_mask
+from .journal import JOURNAL_EXTENSION, TakeJournal
+from .raw_take import RawTake
+from .remote import DEFAULT_PORT, PoseReceiver
+
+# Seconds between polls of the remote receiver on the capture thread.
+POLL_INTERVAL = 0.001
+
+
+class PoseSource(abc.ABC):
+    """
+    Something that produces pose samples for the recorder.
+    tick() returns (time in nanoseconds, poses, valid, velocities), or None if there is no new sample.
+    Poses have shape (len(roles), 7), and valid is a boolean array of the same length.
+    Velocities have shape (len(roles), 6). Velocities a source doesn't know are NaN.
+    The returned arrays may be reused, so they are only valid until the next tick.
+    """
+
+    # Shown in the UI as the runtime.
+    name = "Unknown"
+
+    def __init__(self, roles: list[str]):
+        self.roles = list(roles)
+
+        # (wall clock seconds, sample time in nanoseconds) of a moment on the source's clock.
+        self.time_anchor: tuple[float, int] | None = None
+
+    @property
+    def min_interval(self) -> float:
+        """
+        Shortest time between ticks on the capture thread.
+        Sources that block until the next sample don't need to be throttled.
+        """
+        return 0.0
+
+    def start(self):
+        pass
+
+    def attach_thread(self):
+        """
+        Called on a thread before it starts ticking the source.
+        """
+        pass
+
+    def detach_thread(self):
+        """
+        Called on a thread once it stops ticking the source, so another thread can take over.
+        """
+        pass
+
+    @abc.abstractmethod
+    def tick(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        pass
+
+    def stop(self):
+        pass
+
+    def current_time(self) -> int | None:
+        """
+        Estimate the current time on the source's clock, in nanoseconds.
+        """
+        if not self.time_anchor:
+            return None
+
+        wall_anchor, time_anchor = self.time_anchor
+        return time_anchor + round((time.time() - wall_anchor) * 1e9)
+
+    def time_to_wall(self, sample_time: int) -> float:
+        """
+        Convert a sample time in nanoseconds to wall clock seconds.
+        """
+        if not self.time_anchor:
+            return time.time()
+
+        wall_anchor, time_anchor = self.time_anchor
+        return wall_anchor + (sample_time - time_anchor) / 1e9
+
+
+class OpenXRSource(PoseSource):
+    """
+    Live poses from the OpenXR runtime.
+    """
+
+    def __init__(self, headless_rate: float = 90, headless: bool = False):
+        """
+        :param headless_rate: Samples per second in a headless session.
+        :param headless: Use a headless session. Blender on OpenGL needs this, since a second OpenGL context crashes it.
+        """
+        super().__init__(all_role_strings)
+
+        self.headless_rate = headless_rate
+        self.headless = headless
+        self._core = None
+
+    @property
+    def name(self) -> str:
+        return self._core.runtime_name if self._core else "Unknown"
+
+    @property
+    def min_interval(self) -> float:
+        # Headless sessions have no display to pace xrWaitFrame, so they are throttled instead.
+        if self._core and self._core.use_compatibility_mode:
+            return 1.0 / self.headless_rate
+        return 0.0
+
+    @property
+    def time_anchor(self) -> tuple[float, int] | None:
+        return self._core.time_anchor if self._core else None
+
+    @time_anchor.setter
+    def time_anchor(self, _):
+        # The anchor is owned by the core module.
+        pass
+
+    def start(self):
+        # Imported here, so the other sources work without pyopenxr or a headset.
+        from . import core
+
+        self._core = core
+        core.start_xr(self.headless)
+
+    def attach_thread(self):
+        # The session's OpenGL context moves with the thread that ends frames.
+        self._core.attach_graphics()
+
+    def detach_thread(self):
+        self._core.detach_graphics()
+
+    def tick(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        return self._core.tick_xr()
+
+    def stop(self):
+        if self._core:
+            self._core.stop_xr()
+
+
+def _synthetic_roles(num_trackers: int) -> list[str]:
+    """
+    Use real role strings while they last, so synthetic trackers look like real ones.
+    """
+    roles = all_role_strings[:num_trackers]
+    roles += [f"synthetic_{i}" for i in range(len(roles), num_trackers)]
+    return roles
+
+
+class SyntheticSource(PoseSource):
+    """
+    Deterministic moving trackers, for testing without a headset.
+    Each tracker bobs and spins at its own speed. The same seed always gives the same take.
+    """
+
+    name = "Synthetic"
+
+    def __init__(
+        self,
+        num_trackers: int = 8,
+        rate: float = 90,
+        jitter: float = 0.0,
+        dropout: float = 0.0,
+        seed: int = 0,
+        realtime: bool = True,
+    ):
+        """
+        :param rate: Samples per second.
+        :param jitter: Standard deviation of sample timing, in seconds. Clamped to keep samples in order.
+        :param dropout: Chance of each tracker not being located in a sample.
+        :param realtime: If False, every tick returns the next sample immediately, as fast as possible.
+        """
+        super().__init__(_synthetic_roles(num_trackers))
+
+        self.rate = rate
+        self.jitter = jitter
+        self.dropout = dropout
+        self.seed = seed
+        self.realtime = realtime
+
+        rng = np.random.default_rng(seed)
+        self._centers = rng.uniform(-2, 2, (num_trackers, 3))
+        self._centers[:, 2] = rng.uniform(0.2, 1.8, num_trackers)
+        self._frequencies = rng.uniform(0.2, 1.5, (num_trackers, 1))
+        self._phases = rng.uniform(0, 2 * math.pi, (num_trackers, 1))
+        self._amplitudes = rng.uniform(0.05, 0.5, (num_trackers, 3))
+
+        axes = rng.normal(size=(num_trackers, 3))
+        self._axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+        self._spins = rng.uniform(-2, 2, num_trackers)
+
+        self._poses = np.zeros((num_trackers, POSE_SIZE), dtype=np.float32)
+        self._valid = np.ones(num_trackers, dtype=bool)
+        self._velocities = np.zeros((num_trackers, VELOCITY_SIZE), dtype=np.float32)
+
+        # Spinning around a fixed axis has a constant angular velocity.
+        self._velocities[:, 3:] = self._axes * self._spins[:, np.newaxis]
+
+        self._index = -1
+        self._start = 0.0
+        self._epoch = 0
+
+    @property
+    def min_interval(self) -> float:
+        return 1.0 / self.rate if self.realtime else 0.0
+
+    def start(self):
+        self._index = -1
+        self._start = time.perf_counter()
+        self._epoch = time.monotonic_ns()
+        self.time_anchor = (time.time(), self._epoch)
+
+    def sample_time(self, index: int) -> float:
+        """
+        Get the time of a sample in seconds since the start, including jitter.
+        """
+        offset = 0.0
+        if self.jitter:
+            rng = np.random.default_rng((self.seed, index, 0))
+            limit = 0.45 / self.rate
+            offset = float(np.clip(rng.normal(0, self.jitter), -limit, limit))
+
+        return index / self.rate + offset
+
+    def evaluate(self, t: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the exact poses and velocities at a time in seconds since the start.
+        The returned arrays are reused, so they are only valid until the next call.
+        """
+        angular_frequencies = 2 * math.pi * self._frequencies
+        angles = angular_frequencies * t + self._phases
+        self._poses[:, :3] = self._centers + self._amplitudes * np.sin(angles)
+        self._velocities[:, :3] = (
+            self._amplitudes * angular_frequencies * np.cos(angles)
+        )
+
+        half_spin = self._spins * t / 2
+        self._poses[:, 3] = np.cos(half_spin)
+        self._poses[:, 4:] = self._axes * np.sin(half_spin)[:, np.newaxis]
+
+        return self._poses, self._velocities
+
+    def sample(self, index: int) -> tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate a sample. The same index always gives the same sample.
+        """
+        t = self.sample_time(index)
+        self.evaluate(t)
+
+        if self.dropout:
+            rng = np.random.default_rng((self.seed, index, 1))
+            self._valid[:] = rng.random(len(self.roles)) >= self.dropout
+
+        return self._epoch + round(t * 1e9), self._poses, self._valid, self._velocities
+
+    def tick(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        if self.realtime:
+            # Like a runtime, only the newest sample is returned.
+            index = int((time.perf_counter() - self._start) * self.rate)
+            if index <= self._index:
+                return None
+        else:
+            index = self._index + 1
+
+        self._index = index
+        return self.sample(index)
+
+
+class ReplaySource(PoseSource):
+    """
+    Plays back a raw take or journal, in real time or as fast as possible.
+    """
+
+    name = "Replay"
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        if path.endswith(JOURNAL_EXTENSION):
+            self._take = TakeJournal.open(path)
+        else:
+            self._take = RawTake(path)
+
+        if len(self._take) == 0:
+            raise ValueError(f"{path} has no samples")
+
+        super().__init__(self._take.roles)
+
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+
+        timestamps = self._take.timestamps
+        self._duration = float(timestamps[-1] - timestamps[0])
+        self._rate = (len(timestamps) - 1) / self._duration if self._duration else 0
+
+        # Each loop lasts one sample interval longer than the take, so its first sample follows the last one.
+        self._loop_duration = self._duration + (1 / self._rate if self._rate else 0)
+
+        self._poses = np.zeros((len(self.roles), POSE_SIZE), dtype=np.float32)
+        self._valid = np.zeros(len(self.roles), dtype=bool)
+
+        # Takes from before velocities were recorded replay without them.
+        self._velocities = np.full(
+            (len(self.roles), VELOCITY_SIZE), np.nan, dtype=np.float32
+        )
+
+        self._index = -1
+        self._loop_index = 0
+        self._start = 0.0
+        self._epoch = 0
+
+    @property
+    def min_interval(self) -> float:
+        if self.realtime and self._rate:
+            return 1.0 / self._rate
+        return 0.0
+
+    @property
+    def finished(self) -> bool:
+        return not self.loop and self._index >= len(self._take) - 1
+
+    def start(self):
+        self._index = -1
+        self._loop_index = 0
+        self._start = time.perf_counter()
+        self._epoch = time.monotonic_ns()
+        self.time_anchor = (time.time(), self._epoch)
+
+    def _find_due(self) -> tuple[int, int]:
+        """
+        Find the newest sample that should have played by now.
+        :returns: (loop, index of the sample in the take)
+        """
+        timestamps = self._take.timestamps
+        elapsed = time.perf_counter() - self._start
+
+        loop_index = 0
+        if self.loop and self._loop_duration:
+            loop_index, elapsed = divmod(elapsed, self._loop_duration)
+
+        index = int(np.searchsorted(timestamps, timestamps[0] + elapsed, "right")) - 1
+        return int(loop_index), index
+
+    def tick(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        num_samples = len(self._take)
+
+        if self.realtime:
+            # A whole loop may pass between ticks, so the loop is compared as well as the index.
+            loop_index, index = self._find_due()
+            if (loop_index, index) == (self._loop_index, self._index):
+                return None
+        else:
+            loop_index = self._loop_index
+            index = self._index + 1
+            if index >= num_samples:
+                if not self.loop:
+                    return None
+                loop_index += 1
+                index = 0
+
+        self._loop_index = loop_index
+        self._index = index
+
+        timestamps = self._take.timestamps
+        self._poses[:] = self._take.poses[index]
+        self._valid[:] = unpack_mask(self._take.valid[index], len(self.roles))
+        if self._take.velocities is not None:
+            self._velocities[:] = self._take.velocities[index]
+
+        # Keep time moving forward when looping.
+        sample_time = self._epoch + round(
+            (loop_index * self._loop_duration + timestamps[index] - timestamps[0]) * 1e9
+        )
+        return sample_time, self._poses, self._valid, self._velocities
+
+    def stop(self):
+        self._take.close()
+
+
+class RemoteSource(PoseSource):
+    """
+    Poses streamed from a capture host in another process or on another machine, see capture_host.py.
+    Trackers are matched by role, so the roles are fixed before the host is heard from.
+    """
+
+    name = "Remote"
+
+    def __init__(
+        self,
+        address: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        roles: list[str] | None = None,
+    ):
+        """
+        :param address: Address to listen on. Use 0.0.0.0 to receive from other machines.
+        :param roles: Roles to receive. Defaults to every OpenXR role.
+        """
+        super().__init__(roles or all_role_strings)
+
+        self.address = address
+        self.port = port
+        self._receiver = None
+
+    @property
+    def min_interval(self) -> float:
+        # Receiving never blocks, so poll often enough to see each sample on its own.
+        return POLL_INTERVAL
+
+    @property
+    def time_anchor(self) -> tuple[float, int] | None:
+        return self._receiver.time_anchor if self._receiver else None
+
+    @time_anchor.setter
+    def time_anchor(self, _):
+        # The anchor is set by the receiver when the first sample arrives.
+        pass
+
+    def start(self):
+        self._receiver = PoseReceiver(self.address, self.port, self.roles)
+        print(f"OpenXR Remote listening on {self.address}:{self.port}.")
+
+    def tick(self) -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+        return self._receiver.receive()
+
+    def stop(self):
+        if self._receiver:
+            print(
+                f"OpenXR Remote received {self._receiver.received} samples, "
+                f"{self._receiver.lost} lost in transit."
+            )
+            self._receiver.close()
+            self._receiver = None
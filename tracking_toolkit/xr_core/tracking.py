@@ -1,20 +1,78 @@
 import datetime
+import os
+import tempfile
+import time
 
 import bpy
+import gpu
 import mathutils
-from bpy_extras import anim_utils
-
-from .actions import vive_role_strings
-from .core import start_xr, tick_xr, stop_xr
+import numpy as np
+
+from . import instrumentation
+from .actions import all_role_strings, reformat_role_string, vive_role_strings
+from .buffer import PoseBuffer, PoseMailbox
+from .capture import CaptureThread
+from .commit import CommitJob, TakeWriter, get_fps
+from .health import QUALITY_PROPERTY, HealthMonitor, summarize_take
+from .journal import JOURNAL_EXTENSION, JournalWriter, TakeJournal, find_journals
+from .pose_publisher import PosePublisher
+from .prediction import predict_poses
+from .raw_take import RAW_TAKE_EXTENSION, RawTake, write_raw_take
+from .resample import KERNEL_MARGIN, count_frames
+from .sources import (
+    OpenXRSource,
+    PoseSource,
+    RemoteSource,
+    ReplaySource,
+    SyntheticSource,
+)
 from ..preferences import get_preferences
-from ..utils import get_context, get_state
+from ..utils import (
+    ReferenceIndex,
+    get_context,
+    get_reference_index,
+    get_state,
+    invalidate_reference_index,
+)
+
+# Streaming commits write this much of the take at a time, spending at most the budget per tick.
+STREAM_CHUNK_SECONDS = 1.0
+STREAM_TIME_BUDGET = 0.005
+
+# Appending a chunk rewrites every existing key of an F-Curve, so the cost grows with the take.
+# Streaming stops once F-Curves could hold this many keys, 5 minutes at 60 FPS, and the rest is written when stopping.
+STREAM_MAX_KEYS = 18000
+
+# Takes stored on disk are resampled this much at a time.
+STORED_CHUNK_SECONDS = 60.0
+
+# Background commits resample this much of the take at a time, and write keys for at most the budget per tick.
+COMMIT_CHUNK_SECONDS = 10.0
+COMMIT_TIME_BUDGET = 0.01
+COMMIT_TICK_INTERVAL = 0.02
 
 # Shared variables
-data_buffer = []
+data_buffer = PoseBuffer(all_role_strings)  # Only filled while recording.
+latest_poses = PoseMailbox(
+    all_role_strings
+)  # Always holds the newest sample for previews.
 should_stop = False
-
-
-def _update_tracker_list(poses):
+capture_thread: CaptureThread | None = None
+pose_source: PoseSource | None = None
+take_writer: TakeWriter | None = None
+commit_job: CommitJob | None = None  # Take being written in the background.
+commit_journal: TakeJournal | None = None  # Journal of the take being written.
+journal_writer: JournalWriter | None = None
+pose_publisher: PosePublisher | None = None  # Shares live poses with other processes.
+orphaned_journals: list[str] = []  # Journals left behind by a crash.
+health_monitor = HealthMonitor(all_role_strings)
+last_take_quality: dict | None = None  # Quality summary of the last committed take.
+last_take_report: list[tuple[str, str]] = (
+    []
+)  # (report type, message) about the last committed take.
+
+
+def _update_tracker_list(located_roles: list[str]):
     xr_context = get_context()
     xr_state = get_state()
 
@@ -22,19 +80,20 @@ def _update_tracker_list(poses):
         return
 
     # Check if trackers changed.
-    new_trackers = poses.keys()
+    new_trackers = located_roles
     current_tracker_roles = [
         tracker.naming.role_string for tracker in xr_context.trackers
     ]
     if set(new_trackers) != set(current_tracker_roles):
 
-        for i, role_string in enumerate(poses.keys()):
+        for i, role_string in enumerate(located_roles):
             # Don't touch existing.
             if role_string in current_tracker_roles:
                 continue
 
             # Apply default nicknames to this new tracker.
-            nickname = "unknown"
+            # Roles without preferences (eg. from synthetic sources) get their reformatted role string.
+            nickname = reformat_role_string(role_string)
             for n in get_preferences().naming:
                 if n.role_string == role_string:
                     nickname = str(n.nickname)
@@ -49,6 +108,7 @@ def _update_tracker_list(poses):
             tracker.type = (
                 "tracker"
                 if role_string in vive_role_strings
+                or role_string not in all_role_strings
                 else "hmd" if role_string == "head" else "controller"
             )
             tracker.index = i
@@ -57,81 +117,519 @@ def _update_tracker_list(poses):
 def _xr_tick_timer():
     global data_buffer, should_stop
 
-    poses = tick_xr()
-    if poses:
-        _update_tracker_list(poses)
-        data_buffer.append([datetime.datetime.now(), poses])
+    tick_start = instrumentation.start()
 
-    # Calculate recording FPS.
-    # It may be a good idea to move this math outside the timer.
+    record_fps, _ = get_fps()
+
+    # With a capture thread, the timer only consumes what was sampled in the background.
+    if capture_thread:
+        if capture_thread.error:
+            print(f"OpenXR capture thread stopped: {capture_thread.error}")
+            stop_preview()
+            return None
+
+        samples = capture_thread.drain()
 
-    preferences = get_preferences()
-    if preferences.record_at_scene_fps:
-        framerate = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
     else:
-        framerate = preferences.record_custom_fps
+        # Without a capture thread, a late timer means late samples.
+        health_monitor.tick(1.0 / record_fps)
+
+        sample = _tick_source()
+        samples = [sample] if sample else []
+
+    if journal_writer and journal_writer.error:
+        _fall_back_from_journal()
+
+    if samples:
+        _, _, valid = samples[-1]
+        stage_start = instrumentation.start()
+        _update_tracker_list([data_buffer.roles[i] for i in np.flatnonzero(valid)])
+        instrumentation.record("update_tracker_list", stage_start)
 
-    return 1.0 / framerate
+        for xr_time, poses, valid, velocities in samples:
+            # Store runtime time in seconds. The resampler only needs relative times.
+            _append_sample(xr_time / 1e9, poses, valid, velocities)
+
+    if _is_capturing() and get_preferences().use_streaming_commit:
+        stage_start = instrumentation.start()
+        _stream_commit()
+        instrumentation.record("stream_commit", stage_start)
+
+    instrumentation.record("tick_timer", tick_start)
+    return 1.0 / record_fps
+
+
+def _is_capturing() -> bool:
+    """
+    Check if samples should be kept for the current take.
+    Samples taken during the countdown are only previewed.
+    """
+    xr_state = get_state()
+    return xr_state.recording and xr_state.countdown < 1
+
+
+def _append_sample(
+    timestamp: float, poses: np.ndarray, valid: np.ndarray, velocities: np.ndarray
+):
+    """
+    Publish a sample to the preview mailbox, and store it in the columnar buffer while recording.
+    """
+    latest_poses.put(timestamp, poses, valid, velocities)
+    health_monitor.add(timestamp, valid)
+
+    if not _is_capturing():
+        return
+
+    # Journaled takes are written to disk in the background instead of being kept in RAM.
+    if journal_writer:
+        journal_writer.put(timestamp, poses, valid, velocities)
+    else:
+        data_buffer.append(timestamp, poses, valid, velocities)
+
+
+def _get_take_source() -> PoseBuffer | TakeJournal:
+    """
+    Get where the current take's samples are stored.
+    """
+    if journal_writer:
+        return journal_writer.journal
+    return data_buffer
 
 
 def _clear_buffer():
-    global data_buffer
+    global data_buffer, take_writer
     data_buffer.clear()
+    take_writer = None
+
+
+def get_buffer_usage() -> tuple[int, int]:
+    """
+    Get the number of buffered samples and the memory used to hold them, in bytes.
+    Journaled samples are on disk, so only the ones waiting to be written count toward memory.
+    """
+    num_bytes = data_buffer.nbytes + latest_poses.nbytes
+
+    if journal_writer:
+        journal = journal_writer.journal
+        num_bytes += journal_writer.pending * journal.dtype.itemsize
+        return len(journal) + journal_writer.pending, num_bytes
+
+    return len(data_buffer), num_bytes
+
 
+def _get_journal_directory() -> str:
+    """
+    Journals are kept next to the blend file, or in the temporary directory if it was never saved.
+    """
+    if bpy.data.filepath:
+        return os.path.dirname(bpy.data.filepath)
+    return tempfile.gettempdir()
+
+
+def _start_journal():
+    global journal_writer
+
+    record_fps, _ = get_fps()
+    stem = bpy.path.display_name_from_filepath(bpy.data.filepath) or "untitled"
+    file_name = f"{stem}_{datetime.datetime.now():%Y%m%d_%H%M%S}{JOURNAL_EXTENSION}"
+    path = os.path.join(_get_journal_directory(), file_name)
+
+    metadata = {
+        "record_fps": record_fps,
+        "expected_rate": _get_expected_rate(),
+        "runtime": get_state().runtime,
+        "time_anchor": pose_source.time_anchor,
+    }
+
+    try:
+        journal = TakeJournal.create(path, data_buffer.roles, metadata)
+    except OSError as e:
+        print(f"OpenXR Could not create take journal, recording in memory: {e}")
+        return
 
-def _get_buffer() -> list[tuple[datetime.datetime, dict[str, mathutils.Matrix]]]:
-    global data_buffer
-    return data_buffer.copy()
+    journal_writer = JournalWriter(journal)
+    journal_writer.start()
 
+    print(f"OpenXR Journaling take to {path}")
 
-def _get_latest_poses() -> dict[str, mathutils.Matrix] | None:
-    global data_buffer
-    if len(data_buffer) == 0:
+
+def _stop_journal() -> TakeJournal | None:
+    """
+    Write all queued samples and stop the journal writer.
+    :returns: The journal, which is still readable.
+    """
+    global journal_writer
+
+    if not journal_writer:
         return None
 
-    return data_buffer[-1][1]
+    journal_writer.stop()
+    journal = journal_writer.journal
+    journal_writer = None
 
+    return journal
 
-def _apply_poses():
-    # Don't preview when playing, since a previous recording may interfere
-    if bpy.context.screen.is_animation_playing:
+
+def _remove_journal(journal: TakeJournal):
+    journal.close()
+    try:
+        os.remove(journal.path)
+    except OSError as e:
+        print(f"OpenXR Could not remove take journal {journal.path}: {e}")
+
+
+def _fall_back_from_journal():
+    """
+    Move the take into memory after the journal failed, so recording can continue.
+    The journal is removed, since its samples are now in the take and it would only be recovered twice.
+    """
+    global journal_writer
+
+    print(f"OpenXR Take journal failed, recording in memory: {journal_writer.error}")
+
+    journal_writer.stop()
+    journal = journal_writer.journal
+    unwritten = journal_writer.drain_unwritten()
+    journal_writer = None
+
+    data_buffer.extend(
+        journal.timestamps, journal.poses, journal.valid, journal.velocities
+    )
+    for sample in unwritten:
+        data_buffer.append(*sample)
+
+    _remove_journal(journal)
+    refresh_orphaned_journals()
+
+
+def refresh_orphaned_journals():
+    """
+    Look for journals of takes that were never committed.
+    """
+    global orphaned_journals
+
+    # Journals of the take being recorded, and of the take being written in the background.
+    active_paths = set()
+    if journal_writer:
+        active_paths.add(journal_writer.journal.path)
+    if commit_journal:
+        active_paths.add(commit_journal.path)
+
+    orphaned_journals = [
+        path
+        for path in find_journals(_get_journal_directory())
+        if path not in active_paths
+    ]
+
+
+def recover_take(path: str) -> tuple[int, int]:
+    """
+    Rebuild the actions of a take from its journal, then remove the journal.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction).
+    """
+    journal = TakeJournal.open(path)
+    timestamps = journal.timestamps
+
+    if len(timestamps) == 0:
+        print(f"OpenXR Journal {path} has no samples")
+        _remove_journal(journal)
+        refresh_orphaned_journals()
+        return 0, 0
+
+    # Use the same clock anchor as the original session, so the take gets the same timecode.
+    time_anchor = journal.metadata.get("time_anchor")
+    if time_anchor:
+        wall_anchor, xr_anchor = time_anchor
+        start_wall = wall_anchor + float(timestamps[0]) - xr_anchor / 1e9
+    else:
+        start_wall = os.path.getmtime(path)
+
+    print(f"OpenXR Recovering {len(timestamps)} samples from {path}")
+    key_stats = _write_stored_take(
+        journal,
+        start_wall,
+        journal.metadata["record_fps"],
+        journal.metadata.get("expected_rate"),
+    )
+
+    del timestamps
+    _remove_journal(journal)
+    refresh_orphaned_journals()
+
+    print("Done")
+    return key_stats
+
+
+def _write_stored_take(
+    source: TakeJournal | RawTake,
+    start_wall: float,
+    record_fps: float,
+    expected_rate: float | None,
+) -> tuple[int, int]:
+    """
+    Write a take that was stored on disk into new actions.
+    :param expected_rate: Samples per second the take was captured at, if known.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction).
+    """
+    _, scene_fps = get_fps()
+    writer = TakeWriter(
+        datetime.datetime.fromtimestamp(start_wall),
+        record_fps,
+        scene_fps,
+        _get_tolerance(),
+        get_preferences().resample_kernel,
+    )
+
+    timestamps = source.timestamps
+    total_duration = float(timestamps[-1] - timestamps[0])
+    num_frames = count_frames(total_duration, record_fps)
+
+    # Resample in chunks, so long takes never have to be loaded all at once.
+    chunk_frames = max(1, round(STORED_CHUNK_SECONDS * record_fps))
+    writer.write_frames(source, num_frames, chunk_frames)
+
+    _store_take_quality(
+        writer, summarize_take(source, expected_rate, *_get_health_thresholds())
+    )
+    return writer.finish()
+
+
+def _get_raw_take_directory() -> str | None:
+    """
+    Get the absolute directory raw takes are saved to.
+    Relative paths need the blend file to be saved.
+    """
+    directory = get_preferences().raw_take_directory
+    if directory.startswith("//") and not bpy.data.filepath:
+        return None
+    return bpy.path.abspath(directory)
+
+
+def _get_raw_take_target(
+    source: PoseBuffer | TakeJournal, record_fps: float
+) -> tuple[str, dict] | None:
+    """
+    Get where to save the raw take, and its metadata.
+    :returns: Tuple of (path, metadata), or None if raw takes can't be saved.
+    """
+    directory = _get_raw_take_directory()
+    if not directory:
+        print("OpenXR Save the blend file to keep raw takes next to it")
+        return None
+
+    timestamps = source.timestamps
+    start_wall = pose_source.time_to_wall(int(timestamps[0] * 1e9))
+
+    stem = bpy.path.display_name_from_filepath(bpy.data.filepath) or "untitled"
+    start_time = datetime.datetime.fromtimestamp(start_wall)
+    file_name = f"{stem}_{start_time:%Y%m%d_%H%M%S}{RAW_TAKE_EXTENSION}"
+    path = os.path.join(directory, file_name)
+
+    metadata = {
+        "runtime": get_state().runtime,
+        "time_anchor": pose_source.time_anchor,
+        "start_wall": start_wall,
+        "record_fps": record_fps,
+        "expected_rate": _get_expected_rate(),
+    }
+    return path, metadata
+
+
+def _write_raw_take(source: PoseBuffer | TakeJournal, path: str, metadata: dict):
+    """
+    Write the original samples of a take, so it can be re-baked later.
+    This doesn't touch Blender data, so it can run on another thread.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_raw_take(path, source, metadata)
+    except OSError as e:
+        print(f"OpenXR Could not save raw take to {path}: {e}")
         return
 
-    pose_data = _get_latest_poses()
-    if not pose_data:
+    print(f"OpenXR Saved raw take to {path}")
+
+
+def _save_raw_take(source: PoseBuffer | TakeJournal, record_fps: float):
+    """
+    Keep the original samples of a take, so it can be re-baked later.
+    """
+    target = _get_raw_take_target(source, record_fps)
+    if target:
+        _write_raw_take(source, *target)
+
+
+def rebake_take(path: str, record_fps: float) -> tuple[int, int]:
+    """
+    Resample a raw take at any frame rate into new actions.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction).
+    """
+    raw_take = RawTake(path)
+
+    if len(raw_take) == 0:
+        print(f"OpenXR Raw take {path} has no samples")
+        return 0, 0
+
+    print(f"OpenXR Re-baking {len(raw_take)} samples from {path} at {record_fps} FPS")
+    key_stats = _write_stored_take(
+        raw_take,
+        raw_take.metadata["start_wall"],
+        record_fps,
+        raw_take.metadata.get("expected_rate"),
+    )
+    raw_take.close()
+
+    print("Done")
+    return key_stats
+
+
+def _get_expected_rate() -> float | None:
+    """
+    Get the samples per second the capture asks for.
+    :returns: The rate, or None if the runtime paces the capture thread.
+    """
+    if capture_thread:
+        interval = pose_source.min_interval
+        return 1.0 / interval if interval else None
+
+    record_fps, _ = get_fps()
+    return record_fps
+
+
+def _get_health_thresholds() -> tuple[float, float]:
+    preferences = get_preferences()
+    return preferences.health_min_rate, preferences.health_max_invalid
+
+
+def get_live_health() -> dict | None:
+    """
+    Get the capture health of the most recent samples.
+    :returns: The summary, or None if not enough samples arrived yet.
+    """
+    return health_monitor.summary(_get_expected_rate(), *_get_health_thresholds())
+
+
+def _store_take_quality(writer: TakeWriter, quality: dict):
+    """
+    Store the health summary of a take on the take's actions, so bad takes can be found later.
+    """
+    global last_take_quality
+
+    writer.set_property(QUALITY_PROPERTY, quality)
+    last_take_quality = quality
+
+    if quality["flagged"]:
+        print(f"OpenXR Take is below the quality threshold: {quality['problems']}")
+
+
+def _pose_to_matrix(pose: np.ndarray) -> mathutils.Matrix:
+    return mathutils.Matrix.LocRotScale(pose[:3], mathutils.Quaternion(pose[3:]), None)
+
+
+def _apply_bone_poses(index: ReferenceIndex, poses: np.ndarray):
+    """
+    Compute the basis of every tracker bone, then write all bones in one batch.
+    """
+    armature = index.armature
+    if not armature:
         return
 
-    xr_context = get_context()
+    bones = armature.pose.bones
+    num_bones = len(bones)
+
+    locs = np.empty(num_bones * 3, dtype=np.float32)
+    rots = np.empty(num_bones * 4, dtype=np.float32)
+    bones.foreach_get("location", locs)
+    bones.foreach_get("rotation_quaternion", rots)
+    locs = locs.reshape(num_bones, 3)
+    rots = rots.reshape(num_bones, 4)
+
+    for role_string, bone in index.trackers.items():
+        i = latest_poses.role_indices.get(role_string)
+        if i is None or not latest_poses.valid[i]:
+            continue
+
+        # Same as setting bone.matrix, which solves for the basis given the parent's pose.
+        base = index.rest_offsets[role_string]
+        if bone.parent:
+            base = bone.parent.matrix @ base
+
+        basis = base.inverted_safe() @ _pose_to_matrix(poses[i])
+        loc, rot, _ = basis.decompose()
+
+        j = index.bone_indices[role_string]
+        locs[j] = loc
+        rots[j] = rot
+
+    bones.foreach_set("location", locs.ravel())
+    bones.foreach_set("rotation_quaternion", rots.ravel())
+
+    # Batched writes skip property updates, so tag the pose for re-evaluation.
+    armature.update_tag(refresh={"DATA"})
+
 
-    for role_string in pose_data.keys():
-        pose = pose_data[role_string]
+def _apply_empty_poses(index: ReferenceIndex, poses: np.ndarray):
+    for role_string, obj in index.trackers.items():
+        i = latest_poses.role_indices.get(role_string)
+        if i is None or not latest_poses.valid[i]:
+            continue
 
-        # Apply bone transforms.
-        if xr_context.use_bones:
-            armature = bpy.data.objects.get("XR Trackers")
-            if not armature:
-                return
+        obj.matrix_world = _pose_to_matrix(poses[i])
 
-            bones = armature.pose.bones
-            for bone in bones:
-                if not bone.get("role_string") == role_string:
-                    continue
 
-                if not bone.get("ref_type") == "tracker":
-                    continue
+def _get_preview_poses() -> np.ndarray:
+    """
+    Get the poses to preview.
+    With pose prediction, they are extrapolated from the latest sample to now, up to the prediction horizon.
+    """
+    preferences = get_preferences()
+    if not preferences.use_pose_prediction or not pose_source:
+        return latest_poses.poses
+
+    now = pose_source.current_time()
+    if now is None:
+        return latest_poses.poses
+
+    horizon = min(
+        max(now / 1e9 - latest_poses.timestamp, 0.0), preferences.prediction_horizon
+    )
+    if instrumentation.enabled:
+        instrumentation.add("prediction", horizon)
+
+    return predict_poses(latest_poses.poses, latest_poses.velocities, horizon)
+
+
+def _apply_poses():
+    # Don't preview when playing, since a previous recording may interfere
+    if bpy.context.screen.is_animation_playing:
+        return
 
-                bone.matrix = pose
+    if latest_poses.timestamp is None:
+        return
 
-        # Apply empty transforms.
+    stage_start = instrumentation.start()
+    index = get_reference_index()
+    poses = _get_preview_poses()
+
+    try:
+        if index.use_bones:
+            _apply_bone_poses(index, poses)
         else:
-            for obj in bpy.data.objects:
-                if not obj.get("role_string") == role_string:
-                    continue
+            _apply_empty_poses(index, poses)
+
+    # References were removed without going through the addon.
+    except ReferenceError:
+        invalidate_reference_index()
+        return
 
-                if not obj.get("ref_type") == "tracker":
-                    continue
+    if stage_start:
+        instrumentation.record("apply_poses", stage_start)
+        instrumentation.mark_applied()
 
-                obj.matrix_world = pose
+        # Time from the runtime's sample (or display) time until the pose is on the reference.
+        now = pose_source.current_time() if pose_source else None
+        if now is not None:
+            instrumentation.add("latency", (now / 1e9) - latest_poses.timestamp)
 
 
 def _pose_vis_timer():
@@ -139,251 +637,289 @@ def _pose_vis_timer():
     return 1.0 / 60  # 60hz
 
 
-def _create_action(obj: bpy.types.Object, action_name: str):
+def _get_tolerance() -> float | None:
+    preferences = get_preferences()
+    if preferences.use_keyframe_reduction:
+        return preferences.keyframe_reduction_tolerance
+    return None
+
+
+def _get_take_writer() -> TakeWriter:
     """
-    Create a new action for an object.
-    If an action already exists, it is pushed down onto an NLA track and muted.
+    Get the writer for the current take, creating it from the first recorded sample.
     """
+    global take_writer
 
-    # Create animation data if unavailable.
-    if not obj.animation_data:
-        obj.animation_data_create()
+    if not take_writer:
+        record_fps, scene_fps = get_fps()
 
-    # If an action already exists, push it to a new track and mute it.
-    action = obj.animation_data.action
-    if action:
-        track = obj.animation_data.nla_tracks.new()
-        track.name = action.name
-        track.strips.new(action.name, int(action.frame_range[0]), action)
-        track.mute = True
+        # Samples are on the runtime's monotonic clock, which is only converted to wall time for naming.
+        start_time = datetime.datetime.fromtimestamp(
+            pose_source.time_to_wall(int(_get_take_source().timestamps[0] * 1e9))
+        )
+        take_writer = TakeWriter(
+            start_time,
+            record_fps,
+            scene_fps,
+            _get_tolerance(),
+            get_preferences().resample_kernel,
+        )
 
-    # Create new action.
-    action = bpy.data.actions.new(name=action_name)
-    obj.animation_data.action = action
+    return take_writer
 
-    # Create and select action slot.
-    obj.animation_data.action_slot = action.slots.new("OBJECT", "MOCAP")
 
-    return action
+def _stream_commit():
+    """
+    Write completed chunks of the take into its actions while still recording.
+    Only a small amount of time is spent per tick, so stopping only has to write the tail.
+    """
+    global take_writer
 
+    source = _get_take_source()
+    if len(source) < KERNEL_MARGIN + 2:
+        return
 
-def _insert_action():
-    xr_context = get_context()
-    preferences = get_preferences()
+    writer = _get_take_writer()
+    timestamps = source.timestamps
+
+    # Cubic kernels read the sample after each frame's pair, so frames in the newest intervals
+    # still change when more samples arrive. Only frames before that sample are final.
+    cutoff = float(timestamps[-1 - KERNEL_MARGIN] - timestamps[0])
+    completed = int(np.ceil(cutoff * writer.record_fps - 1e-9))
+    chunk_size = max(1, round(STREAM_CHUNK_SECONDS * writer.record_fps))
+
+    # The budget is checked after each F-Curve, so a chunk may take several ticks.
+    deadline = time.perf_counter() + STREAM_TIME_BUDGET
+    try:
+        while (
+            completed - writer.next_frame >= chunk_size
+            and writer.next_frame + chunk_size <= STREAM_MAX_KEYS
+            and time.perf_counter() < deadline
+        ):
+            if not writer.write_frames(
+                source, writer.next_frame + chunk_size, deadline=deadline
+            ):
+                break
 
-    pose_data = _get_buffer()
+    # The actions were removed (eg. by undo). Start over, and write everything when stopping.
+    except ReferenceError:
+        print("OpenXR Streamed actions were removed. The take will be written on stop.")
+        take_writer = None
 
-    num_samples = len(pose_data)
-    if num_samples == 0:
-        print(f"OpenXR Found no samples to process")
-        return
 
-    # Calculate recording FPS.
-    scene_fps = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
-    record_fps = (
-        scene_fps if preferences.record_at_scene_fps else preferences.record_custom_fps
-    )
+def _insert_action(background: bool = False) -> tuple[int, int] | None:
+    """
+    Resample the recorded take and write it into new actions.
+    When streaming, only the frames that haven't been written yet are resampled.
+    :param background: Write the take with a commit job, without blocking the UI.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction), or None if written in the background.
+    """
+    global take_writer, commit_job, commit_journal
+
+    # Everything queued for the journal must be on disk before it is read back.
+    journal = _stop_journal()
+    source = journal or data_buffer
 
-    start_time = pose_data[0][0]
-    end_time = pose_data[-1][0]
-    total_duration = (end_time - start_time).total_seconds()
-    total_frames = round(total_duration * record_fps)
-    source_times = [(t - start_time).total_seconds() for t, _ in pose_data]
+    # Zero-copy views of the recorded samples.
+    timestamps = source.timestamps
+
+    num_samples = len(timestamps)
+    if num_samples == 0:
+        print(f"OpenXR Found no samples to process")
+        if journal:
+            _remove_journal(journal)
+        return 0, 0
 
-    # The samples might not be at the correct interval. Here, we go through each frame and linearly interpolate.
+    writer = _get_take_writer()
+    total_duration = float(timestamps[-1] - timestamps[0])
+    num_frames = count_frames(total_duration, writer.record_fps)
 
     print("OpenXR Converting samples...")
-    print(f"Frames: {total_frames}")
-    print(f"Samples: {len(pose_data)}")
+    print(f"Frames: {num_frames}")
+    print(f"Samples: {num_samples}")
     print(f"Duration: {total_duration}")
 
-    animation_data = {}
-    current_time = 0
-    frame = 0
-    min_index = 0  # Checkpoint the "closest index" to avoid recalculations.
+    # Finish the chunk that streaming ran out of time in.
+    writer.write_frames(source, writer.next_frame)
 
-    while current_time <= total_duration:
-        # Get closest sample.
+    if writer.next_frame:
+        print(f"Already streamed: {writer.next_frame} frames")
 
-        closest_idx = None
-        for i in range(min_index, len(source_times)):
-            if source_times[i] >= current_time:
-                closest_idx = i
-                min_index = i
-                break
+    # Now insert the remaining data
+    print("OpenXR Inserting data...")
+
+    del timestamps
+
+    # Summarizing and saving the whole take are slow, so the job's worker does them.
+    # Everything that comes from Blender data is read here first.
+    health_thresholds = _get_health_thresholds()
+    expected_rate = _get_expected_rate()
+    raw_take = None
+    if get_preferences().save_raw_takes:
+        raw_take = _get_raw_take_target(source, writer.record_fps)
+
+    def finalize() -> dict:
+        if raw_take:
+            _write_raw_take(source, *raw_take)
+        return summarize_take(source, expected_rate, *health_thresholds)
+
+    chunk_frames = max(1, round(COMMIT_CHUNK_SECONDS * writer.record_fps))
+    job = CommitJob(writer, source, num_frames, chunk_frames, finalize)
+    job.start()
+    take_writer = None
+
+    if background:
+        commit_job = job
+        commit_journal = journal
+        bpy.app.timers.register(_commit_job_timer)
+        return None
 
-        if closest_idx is None:
-            break  # We reached the end.
+    job.step()
+    return _finish_commit(job, source, journal)
 
-        # Interpolate the poses to be even with the framerate.
-        # This is because the Blender timer might not have gone off at the correct interval.
 
-        # Calculate lerp factor.
-        factor = 0
-        if closest_idx == 0:
-            prev_sample = pose_data[0][1]
-            next_sample = pose_data[0][1]
+def _finish_commit(
+    job: CommitJob, source: PoseBuffer | TakeJournal, journal: TakeJournal | None
+) -> tuple[int, int] | None:
+    """
+    Finish the take's actions once its commit job stopped, and store or clean up its samples.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction), or None if the job didn't finish.
+    """
+    writer = job.writer
+
+    if job.error or job.cancelled:
+        if job.error:
+            print(f"OpenXR Could not write take: {job.error}")
         else:
-            prev_time = source_times[closest_idx - 1]
-            next_time = source_times[closest_idx]
+            print("OpenXR Writing take canceled")
 
-            if prev_time != next_time:  # Prevent division by 0.
-                factor = (current_time - prev_time) / (next_time - prev_time)
+        # Leave what was written in a usable state.
+        try:
+            writer.finish()
+        except ReferenceError:
+            pass
 
-            prev_sample = pose_data[closest_idx - 1][1]
-            next_sample = pose_data[closest_idx][1]
+        # Keep the samples, so the whole take can still be recovered or re-baked.
+        if journal:
+            journal.close()
+            refresh_orphaned_journals()
+        elif get_preferences().save_raw_takes and not job.finalized:
+            _save_raw_take(source, writer.record_fps)
 
-        for name, next_pose in next_sample.items():
-            # Get the tracker.
-            tracker_object = None
-            for tracker in get_context().trackers:
-                if tracker.naming.role_string == name:
-                    tracker_object = tracker
-                    break
+        return None
 
-            if not tracker_object:
-                continue
+    _store_take_quality(writer, job.result)
+    key_stats = writer.finish()
 
-            # Initialize data structure for this object if it's the first time we see it.
-            if name not in animation_data:
-                animation_data[name] = {
-                    "tracker": tracker_object,
-                    "frames": [],
-                    "locs": [],
-                    "rots": [],
-                    "scales": [],
-                }
+    # The take is safely in the actions now.
+    if journal:
+        _remove_journal(journal)
 
-            # Lerp pose.
+    print("Done")
+    return key_stats
 
-            if name not in prev_sample:
-                continue
-            prev_pose = prev_sample[name]
 
-            loc0, rot0, sca0 = prev_pose.decompose()
-            loc1, rot1, sca1 = next_pose.decompose()
+def _end_commit_job() -> tuple[int, int] | None:
+    """
+    Finish the background commit job after it stopped.
+    """
+    global commit_job, commit_journal
 
-            loc_final = loc0.lerp(loc1, factor)
-            rot_final = rot0.slerp(rot1, factor)  # Slerp for rotation.
-            sca_final = sca0.lerp(sca1, factor)
+    job, journal = commit_job, commit_journal
+    commit_job = None
+    commit_journal = None
 
-            lerp_pose = mathutils.Matrix.LocRotScale(loc_final, rot_final, sca_final)
+    if bpy.app.timers.is_registered(_commit_job_timer):
+        bpy.app.timers.unregister(_commit_job_timer)
 
-            # Decompose the matrix and append data.
-            loc, rot, scale = lerp_pose.decompose()
+    key_stats = _finish_commit(job, journal or data_buffer, journal)
+    _clear_buffer()
+    _report_take(key_stats)
 
-            data = animation_data[name]
-            data["frames"].append(frame)
-            data["locs"].extend(loc)
-            data["rots"].extend(rot)
-            data["scales"].extend(scale)
+    print("OpenXR Recording Stopped")
+    return key_stats
 
-        # Increment.
-        current_time += 1 / record_fps
-        frame += 1 * (
-            scene_fps / record_fps
-        )  # Compensate for difference in scene and record fps
 
-    # Now insert or replace the data
-    print("OpenXR Inserting data...")
+def _report_take(key_stats: tuple[int, int] | None):
+    """
+    Collect what the user should know about the take that was just committed.
+    Background commits finish without an operator to report to, so the panel shows these.
+    """
+    global last_take_report
 
-    # Format SMPTE timecode.
-    # Also calculate the frame based on the current microsecond/scene time.
-    # The frame is truncated down.
+    last_take_report = []
+    if not key_stats:
+        return
 
-    time_string = start_time.strftime("%H:%M:%S")
-    second_offset = start_time.microsecond / (1000 * 1000)
-    frame_offset_str = str(int(second_offset * record_fps))
+    if get_preferences().use_keyframe_reduction:
+        keys_written, keys_removed = key_stats
+        last_take_report.append(
+            (
+                "INFO",
+                f"Keyframe reduction removed {keys_removed} of {keys_written + keys_removed} keys.",
+            )
+        )
 
-    # Pad to at least two digits.
-    if len(frame_offset_str) == 1:
-        frame_offset_str = f"0{frame_offset_str}"
+    quality = last_take_quality
+    if quality and quality["flagged"]:
+        last_take_report.append(
+            ("WARNING", f"Take is below quality threshold: {quality['problems']}")
+        )
 
-    time_string += f":{frame_offset_str}"
+    for _, message in last_take_report:
+        print(f"OpenXR {message}")
 
-    print(f"Using SMPTE timecode: {time_string}")
 
-    action = None
+def _commit_job_timer():
+    try:
+        finished = commit_job.step(COMMIT_TIME_BUDGET)
 
-    for tracker_name, data in animation_data.items():
-        print(">", tracker_name)
+    # The actions were removed (eg. by undo) while writing.
+    except ReferenceError as e:
+        commit_job.error = e
+        finished = True
 
-        tracker = data["tracker"]
-        nickname = tracker.naming.nickname
-        num_keys = len(data["frames"])
+    # Update the progress bar.
+    for area in bpy.context.screen.areas:
+        area.tag_redraw()
 
-        # Create actions.
+    if not finished:
+        return COMMIT_TICK_INTERVAL
 
-        # When using bones, only one action is created for the entire armature.
-        if xr_context.use_bones:
-            if not action:  # We are in a loop, so ensure it's only created once.
-                arm = bpy.data.objects.get("XR Trackers")
-                if not arm:
-                    print("Could not find armature. Data was not applied.")
+    _end_commit_job()
 
-                action = _create_action(arm, time_string)
+    # Show the take's report in place of the progress bar.
+    for area in bpy.context.screen.areas:
+        area.tag_redraw()
 
-        # When using empties, create an action for each empty object.
-        # The action name will be prefixed with the tracker name to prevent conflicts.
-        else:
-            empty = bpy.data.objects.get(nickname)
-            if not empty:
-                print(f"No references found for {nickname}. Skipping.")
-                continue
+    return None
 
-            action = _create_action(empty, f"{nickname}_{time_string}")
-
-        # Determine the property names for the fcurve channels we will put animation data into.
-        # Armature actions are handled a little differently.
-        if xr_context.use_bones:
-            data_path_prefix = f'pose.bones["{nickname}"]'
-            fcurve_props = [
-                (f"{data_path_prefix}.location", 3, data["locs"]),
-                (f"{data_path_prefix}.rotation_quaternion", 4, data["rots"]),
-                (f"{data_path_prefix}.scale", 3, data["scales"]),
-            ]
-        else:
-            fcurve_props = [
-                ("location", 3, data["locs"]),
-                ("rotation_quaternion", 4, data["rots"]),
-                ("scale", 3, data["scales"]),
-            ]
-
-        # Efficiently insert animation data by directly inserting it into the fcurves.
-        for data_path, num_components, values in fcurve_props:
-            # Loop over every component (eg x, y, z, etc.)/
-            for i in range(num_components):
-                # Get or create the F-Curve.
-                channelbag = anim_utils.action_ensure_channelbag_for_slot(
-                    action, action.slots[0]
-                )
-                fcurve = channelbag.fcurves.find(data_path, index=i)
-                if fcurve:
-                    channelbag.fcurves.remove(fcurve)
-                fcurve = channelbag.fcurves.new(data_path, index=i)
-
-                # Fill with points.
-                fcurve.keyframe_points.add(num_keys)
-
-                # Create the flattened list for foreach_set.
-                # The format is [frame1, value1, frame2, value2, ...].
-
-                # Allocate array elements.
-                key_coords = [0.0] * (num_keys * 2)
-
-                # We slice the values list to get the data for the current component (axis).
-                component_values = values[i::num_components]
-
-                key_coords[0::2] = data["frames"]  # Frame numbers on even elements.
-                key_coords[1::2] = component_values  # Data values on odd elements.
-
-                # Set all keyframe coordinates at once.
-                fcurve.keyframe_points.foreach_set("co", key_coords)
-
-                # Update the fcurve to apply changes.
-                fcurve.update()
 
-    print("Done")
+def wait_for_commit():
+    """
+    Write the rest of the take being committed in the background, blocking until it is done.
+    """
+    if not commit_job:
+        return
+
+    try:
+        commit_job.step()
+    except ReferenceError as e:
+        commit_job.error = e
+
+    _end_commit_job()
+
+
+def cancel_commit():
+    """
+    Stop writing the take being committed in the background.
+    Keys that were already written are kept, and so are the take's samples.
+    """
+    if not commit_job:
+        return
+
+    commit_job.cancel()
+    _end_commit_job()
 
 
 def _xr_countdown_timer():
@@ -404,6 +940,11 @@ def _xr_countdown_timer():
     if xr_state.countdown < 1:
         print("OpenXR Recording Started")
         _clear_buffer()
+        health_monitor.reset()
+
+        if get_preferences().use_take_journal:
+            _start_journal()
+
         return None
 
     print(f"OpenXR recording starting in {xr_state.countdown}s")
@@ -411,9 +952,18 @@ def _xr_countdown_timer():
 
 
 def start_recording():
+    global last_take_report
+
     xr_context = get_context()
     xr_state = get_state()
 
+    # The buffer still holds the last take.
+    if commit_job:
+        print("OpenXR Wait for the last take to be written before recording")
+        return
+
+    last_take_report = []
+
     # Get timer delay.
     delay_val = xr_context.timer
     if delay_val == "CUSTOM":
@@ -432,24 +982,164 @@ def start_recording():
     print("OpenXR Countdown Started")
 
 
-def stop_recording():
+def stop_recording(background: bool = False) -> tuple[int, int] | None:
+    """
+    Stop recording and commit the take.
+    :param background: Write the take without blocking the UI. Preview keeps running meanwhile.
+    :returns: Tuple of (keys written, keys removed by keyframe reduction), or None if nothing was recorded or the take is written in the background.
+    """
     xr_state = get_state()
 
     xr_state.recording = False
 
     if xr_state.countdown > 0:
-        return  # Recording was probably canceled.
+        return None  # Recording was probably canceled.
+
+    key_stats = _insert_action(background)
+    if commit_job:
+        return None
 
-    _insert_action()
     _clear_buffer()
+    _report_take(key_stats)
 
     print("OpenXR Recording Stopped")
+    return key_stats
+
+
+def _start_capture_thread():
+    global capture_thread
+
+    # The source is ticked from the thread until it stops.
+    pose_source.detach_thread()
+
+    capture_thread = CaptureThread(
+        _tick_source,
+        pose_source.min_interval,
+        pose_source.attach_thread,
+        pose_source.detach_thread,
+    )
+    capture_thread.start()
+
+
+def _start_publisher(roles: list[str]):
+    global pose_publisher
+
+    name = get_preferences().pose_publisher_name
+    try:
+        pose_publisher = PosePublisher(roles, name)
+    except (OSError, RuntimeError) as e:
+        # Other processes are only a bonus, so the preview goes on without them.
+        print(f"OpenXR failed to publish poses to shared memory {name}: {e}")
+        return
+
+    print(f"OpenXR Publishing poses to shared memory {name}")
+
+
+def _stop_publisher():
+    global pose_publisher
+
+    if not pose_publisher:
+        return
+
+    pose_publisher.close()
+    pose_publisher = None
+
+
+def _tick_source() -> tuple[int, np.ndarray, np.ndarray, np.ndarray] | None:
+    """
+    Get the next sample of the pose source, and publish it to other processes as soon as it is taken.
+    """
+    sample = pose_source.tick()
+
+    if sample and pose_publisher:
+        stage_start = instrumentation.start()
+        sample_time = sample[0]
+        pose_publisher.publish(*sample, pose_source.time_to_wall(sample_time))
+        instrumentation.record("publish", stage_start)
 
+    return sample
 
-def start_preview():
+
+def _stop_capture_thread():
+    global capture_thread
+
+    if not capture_thread:
+        return
+
+    capture_thread.stop()
+    capture_thread = None
+
+    # Take the source back, so it can be stopped from the main thread.
+    pose_source.attach_thread()
+
+
+def _use_roles(roles: list[str]):
+    """
+    Resize the buffers if the source has different trackers than the last one.
+    """
+    global data_buffer, latest_poses, health_monitor
+
+    if roles == data_buffer.roles:
+        return
+
+    data_buffer = PoseBuffer(roles)
+    latest_poses = PoseMailbox(roles)
+    health_monitor = HealthMonitor(roles)
+
+
+def _create_source() -> PoseSource:
+    """
+    Create the pose source chosen in the preferences.
+    """
+    preferences = get_preferences()
+
+    if preferences.pose_source == "SYNTHETIC":
+        return SyntheticSource(
+            preferences.synthetic_trackers,
+            preferences.synthetic_rate,
+            preferences.synthetic_jitter,
+            preferences.synthetic_dropout,
+        )
+
+    if preferences.pose_source == "REPLAY":
+        return ReplaySource(
+            bpy.path.abspath(preferences.replay_path), loop=preferences.replay_loop
+        )
+
+    if preferences.pose_source == "REMOTE":
+        return RemoteSource(preferences.remote_address, preferences.remote_port)
+
+    # The runtime's OpenGL context would conflict with Blender's.
+    headless = gpu.platform.backend_type_get() == "OPENGL"
+    return OpenXRSource(preferences.headless_capture_rate, headless)
+
+
+def start_preview(source: PoseSource | None = None):
+    """
+    Start sampling poses.
+    :param source: Where poses come from. Defaults to the source chosen in the preferences.
+    """
+    global pose_source
+
+    if source is None:
+        source = _create_source()
+
+    _use_roles(source.roles)
     _clear_buffer()
-    start_xr()
-    get_state().enabled = True
+    health_monitor.reset()
+
+    source.start()
+    pose_source = source
+
+    if get_preferences().use_pose_publisher:
+        _start_publisher(source.roles)
+
+    xr_state = get_state()
+    xr_state.runtime = source.name
+    xr_state.enabled = True
+
+    if get_preferences().use_capture_thread:
+        _start_capture_thread()
 
     if not bpy.app.timers.is_registered(_xr_tick_timer):
         bpy.app.timers.register(_xr_tick_timer)
@@ -461,6 +1151,8 @@ def start_preview():
 
 
 def stop_preview():
+    global take_writer, pose_source
+
     if bpy.app.timers.is_registered(_xr_tick_timer):
         bpy.app.timers.unregister(_xr_tick_timer)
 
@@ -470,8 +1162,34 @@ def stop_preview():
     if bpy.app.timers.is_registered(_xr_tick_timer):
         bpy.app.timers.unregister(_xr_tick_timer)
 
-    stop_xr()
-    _clear_buffer()
+    # The take must be written while its source is still known.
+    wait_for_commit()
+
+    # The thread must be done with the session before it is destroyed.
+    _stop_capture_thread()
+    _stop_publisher()
+
+    if pose_source:
+        pose_source.stop()
+
+    # Leave a partially streamed take in a usable state.
+    if take_writer:
+        try:
+            take_writer.finish()
+        except ReferenceError:
+            pass
+        take_writer = None
+
+    # Keep the journal of an interrupted take, so it can be recovered.
+    journal = _stop_journal()
+    if journal:
+        journal.close()
+        refresh_orphaned_journals()
+
+    # Give back the memory from the last take.
+    data_buffer.release()
+    latest_poses.clear()
+    pose_source = None
 
     xr_state = get_state()
     xr_state.enabled = False